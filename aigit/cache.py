@@ -0,0 +1,193 @@
+"""Content-addressed on-disk cache for AI responses."""
+
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from pathlib import Path
+
+from aigit.config import CONFIG_DIR, get_config
+
+CACHE_DIR = CONFIG_DIR / "cache"
+
+# Share of writes that prune regardless of size, so expired entries and
+# other processes' writes are accounted for eventually
+PRUNE_PROBABILITY = 0.02
+
+_disabled = False
+
+# Approximate bytes stored in each store directory, tracked between prunes
+_sizes: dict[Path, int] = {}
+_sizes_lock = threading.Lock()
+
+
+def disable() -> None:
+    """Disable the cache for the rest of this process."""
+    global _disabled
+    _disabled = True
+
+
+def enable() -> None:
+    """Undo disable(), for the next command run by the daemon."""
+    global _disabled
+    _disabled = False
+
+
+def is_enabled() -> bool:
+    """Check whether cached responses may be used."""
+    return not _disabled and bool(get_config("cache"))
+
+
+def make_key(**parts) -> str:
+    """Build a cache key by hashing everything that affects the response."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _entry_path(key: str) -> Path:
+    return CACHE_DIR / key[:2] / f"{key}.json"
+
+
+def get(key: str) -> str | None:
+    """Get a cached response, or None on a miss."""
+    if not is_enabled():
+        return None
+
+    path = _entry_path(key)
+    try:
+        max_age = _max_age_seconds()
+        if max_age and time.time() - path.stat().st_mtime > max_age:
+            path.unlink(missing_ok=True)
+            return None
+
+        with open(path, encoding="utf-8") as f:
+            entry = json.load(f)
+
+        # Mark as recently used for LRU eviction
+        os.utime(path)
+    except (OSError, ValueError):
+        return None
+
+    return entry.get("response")
+
+
+def put(key: str, response: str) -> None:
+    """Store a response in the cache."""
+    if not is_enabled():
+        return
+
+    path = _entry_path(key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"created": time.time(), "response": response}, f)
+    os.replace(tmp, path)
+
+    track_write(CACHE_DIR, path)
+
+
+def track_write(directory: Path, path: Path) -> None:
+    """Account for a file written to a store directory, pruning it when needed.
+
+    A full scan happens on the first write in the process, on a small
+    fraction of writes, and when the running total passes `cache_max_mb`,
+    rather than on every write.
+    """
+    try:
+        size = path.stat().st_size
+    except OSError:
+        size = 0
+    max_bytes = _max_bytes()
+
+    with _sizes_lock:
+        total = _sizes.get(directory)
+        # Other threads keep counting while the first scan runs
+        _sizes[directory] = (total or 0) + size
+    if total is None or random.random() < PRUNE_PROBABILITY or (max_bytes and total + size > max_bytes):
+        prune(directory)
+
+
+def _max_age_seconds() -> float:
+    """Entries unused for longer than this are evicted (0 disables)."""
+    days = get_config("cache_max_age_days")
+    return float(days) * 86400 if days else 0
+
+
+def _max_bytes() -> float:
+    return float(get_config("cache_max_mb") or 0) * 1024 * 1024
+
+
+def _iter_entries(directory: Path = None):
+    directory = directory or CACHE_DIR
+    if not directory.exists():
+        return
+    for shard in directory.iterdir():
+        if shard.is_dir():
+            yield from shard.glob("*.json")
+
+
+def prune(directory: Path = None) -> None:
+    """Evict expired entries, then least recently used ones over the size limit.
+
+    Works on any store laid out like the cache (<dir>/<2 chars>/<key>.json).
+    """
+    directory = directory or CACHE_DIR
+    max_age = _max_age_seconds()
+    max_bytes = _max_bytes()
+    now = time.time()
+
+    entries = []
+    for path in _iter_entries(directory):
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        if max_age and now - st.st_mtime > max_age:
+            path.unlink(missing_ok=True)
+        else:
+            entries.append((st.st_mtime, st.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    if max_bytes and total > max_bytes:
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    with _sizes_lock:
+        _sizes[directory] = total
+
+
+def stats() -> dict:
+    """Get cache statistics."""
+    sizes = []
+    oldest = None
+    for path in _iter_entries():
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        sizes.append(st.st_size)
+        oldest = st.st_mtime if oldest is None else min(oldest, st.st_mtime)
+
+    return {
+        "entries": len(sizes),
+        "size_bytes": sum(sizes),
+        "oldest_access": oldest,
+        "path": str(CACHE_DIR),
+    }
+
+
+def clear() -> int:
+    """Remove every cached response. Returns the number of entries removed."""
+    removed = 0
+    for path in list(_iter_entries()):
+        path.unlink(missing_ok=True)
+        removed += 1
+    with _sizes_lock:
+        _sizes.pop(CACHE_DIR, None)
+    return removed
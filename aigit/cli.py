@@ -1,33 +1,133 @@
 """Main CLI entry point for aigit."""
 
+import atexit
+import importlib
+import sys
+
 import typer
-from rich.console import Console
+from typer._click.shell_completion import CompletionItem
+from typer._click.utils import make_default_short_help
+from typer.core import TyperGroup
+
+# Command name -> (module, function, help). Modules are imported on first
+# use, so `aigit config ...` and shell completion never load the AI, git or
+# GitHub stacks.
+COMMANDS = {
+    "commit": ("aigit.commands.commit", "commit_command", "Generate AI commit message and create commit"),
+    "branch": ("aigit.commands.branch", "branch_command", "Generate AI branch name and create branch"),
+    "pr": (
+        "aigit.commands.pr",
+        "pr_command",
+        "Create PR with AI-generated title and description\n\n"
+        "The branch is pushed once you confirm the PR. With the early_push setting it is pushed "
+        "while the description is generated instead, and the push is rolled back if you cancel.",
+    ),
+    "review": ("aigit.commands.review", "review_command", "AI code review of staged changes"),
+    "explain": ("aigit.commands.explain", "explain_command", "Explain changes in commit/branch/diff"),
+    "index": ("aigit.commands.index", "index_command", "Build or update the semantic index used for related-code context"),
+    "config": ("aigit.commands.config", "config_command", "Manage aigit configuration"),
+    "cache": ("aigit.commands.cache", "cache_command", "Show stats for or clear the AI response cache"),
+    "hook": ("aigit.commands.hook", "hook_command", "Install git hooks that write AI commit messages for git commit"),
+    "serve": ("aigit.commands.serve", "serve_command", "Run a background daemon that keeps aigit warm between commands"),
+}
+
+
+# Commands that never make AI requests, so they start without loading the
+# metrics and config modules
+UNMETERED = {"config", "cache", "serve"}
+
+
+class LazyGroup(TyperGroup):
+    """Command group that imports each command's module on first use."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._loaded = {}
+
+    def list_commands(self, ctx):
+        return list(COMMANDS)
+
+    def get_command(self, ctx, cmd_name):
+        if cmd_name not in COMMANDS:
+            return None
+
+        if cmd_name not in self._loaded:
+            module_name, func_name, help_text = COMMANDS[cmd_name]
+            func = getattr(importlib.import_module(module_name), func_name)
+
+            command_app = typer.Typer()
+            command_app.command(name=cmd_name, help=help_text)(func)
+            self._loaded[cmd_name] = typer.main.get_command(command_app)
+
+        return self._loaded[cmd_name]
+
+    def shell_complete(self, ctx, incomplete):
+        # Complete command names from COMMANDS rather than get_command, which
+        # would import every command module to show its help
+        results = [
+            CompletionItem(name, help=make_default_short_help(help_text))
+            for name, (_, _, help_text) in COMMANDS.items()
+            if name.startswith(incomplete)
+        ]
+        results.extend(super(TyperGroup, self).shell_complete(ctx, incomplete))
+        return results
+
 
 app = typer.Typer(
     name="aigit",
     help="AI-powered Git CLI tool for smart commits, branches, and PRs",
+    cls=LazyGroup,
     add_completion=True,
     no_args_is_help=True,
 )
-console = Console()
 
-# Import commands
-from aigit.commands.commit import commit_command
-from aigit.commands.branch import branch_command
-from aigit.commands.pr import pr_command
-from aigit.commands.review import review_command
-from aigit.commands.explain import explain_command
-from aigit.commands.config import config_command
 
-# Register commands
-app.command(name="commit", help="Generate AI commit message and create commit")(commit_command)
-app.command(name="branch", help="Generate AI branch name and create branch")(branch_command)
-app.command(name="pr", help="Create PR with AI-generated title and description")(pr_command)
-app.command(name="review", help="AI code review of staged changes")(review_command)
-app.command(name="explain", help="Explain changes in commit/branch/diff")(explain_command)
-app.command(name="config", help="Manage aigit configuration")(config_command)
+def report_rate_limits():
+    """Print throttling stats if this run made any AI requests."""
+    ratelimit = sys.modules.get("aigit.services.ratelimit")
+    if ratelimit is not None:
+        ratelimit.report()
+
+
+def report_metrics():
+    """Print or export this run's metrics, if enabled."""
+    metrics = sys.modules.get("aigit.metrics")
+    if metrics is not None:
+        metrics.report()
+
+
+def report_run():
+    """Report on the command that just ran, as is done at exit."""
+    report_rate_limits()
+    report_metrics()
+
+
+_reporting_at_exit = False
+
+
+@app.callback()
+def main(
+    ctx: typer.Context,
+    stats: bool = typer.Option(
+        False, "--stats", help="Show git and prompt timings, token usage, latency and cost at the end"
+    ),
+):
+    """AI-powered Git CLI tool for smart commits, branches, and PRs"""
+    global _reporting_at_exit
+
+    # Shell completion only needs the command tree
+    if ctx.resilient_parsing:
+        return
+    if ctx.invoked_subcommand in UNMETERED and not stats:
+        return
+
+    from aigit import metrics
+
+    metrics.start_run(ctx.invoked_subcommand, show_stats=stats)
+    if not _reporting_at_exit:
+        atexit.register(report_run)
+        _reporting_at_exit = True
 
 
 if __name__ == "__main__":
     app()
-
@@ -0,0 +1,162 @@
+"""Command-line entry point that forwards commands to `aigit serve`.
+
+Only the standard library is imported here. When a daemon is listening,
+commands that never prompt are sent to it and run with its warm state;
+everything else, or any command when no daemon answers, runs in this
+process as before.
+"""
+
+import json
+import os
+import shutil
+import sys
+
+from aigit import __version__
+
+# Bumped whenever the messages below change
+PROTOCOL_VERSION = 1
+
+# Commands run by the daemon. The others prompt for input, or (pr) must be
+# able to roll back a push when interrupted, so they run locally.
+FORWARDED = {"review", "explain", "index", "config", "cache"}
+
+# Commands run by the daemon only when they won't prompt
+FORWARDED_WITH_YES = {"commit", "branch"}
+
+# Commands of which only some actions are run by the daemon. The background
+# `hook pregenerate` would hold up other commands while it waits.
+FORWARDED_ACTIONS = {"hook": {"run"}}
+
+SOCKET_NAME = "aigit.sock"
+
+
+def get_socket_path() -> str:
+    """Get the daemon's socket path: AIGIT_DAEMON_SOCKET, else a per-user default."""
+    path = os.environ.get("AIGIT_DAEMON_SOCKET")
+    if path:
+        return os.path.expanduser(path)
+
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return os.path.join(runtime_dir, SOCKET_NAME)
+    return os.path.join(os.path.expanduser("~"), ".config", "aigit", SOCKET_NAME)
+
+
+def should_forward(args: list[str]) -> bool:
+    """Check whether a command line can be run by the daemon."""
+    if os.environ.get("AIGIT_NO_DAEMON") or "_AIGIT_COMPLETE" in os.environ:
+        return False
+
+    positional = [arg for arg in args if not arg.startswith("-")]
+    command = positional[0] if positional else None
+    if command in FORWARDED:
+        return True
+    if command in FORWARDED_WITH_YES:
+        return "-y" in args or "--yes" in args or "--help" in args
+    if command in FORWARDED_ACTIONS:
+        return len(positional) > 1 and positional[1] in FORWARDED_ACTIONS[command]
+    return False
+
+
+def connect(path: str = None, timeout: float = None) -> "socket.socket | None":
+    """Connect to the daemon, or return None if none is listening."""
+    # Imported here: completion and commands that never forward don't need it
+    import socket
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(path or get_socket_path())
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def send(sock: "socket.socket", message: dict) -> None:
+    sock.sendall(json.dumps(message).encode("utf-8") + b"\n")
+
+
+def _client_env() -> dict:
+    env = dict(os.environ)
+    # The daemon can't see this terminal, so pass its size along
+    if sys.stdout.isatty() and "COLUMNS" not in env:
+        size = shutil.get_terminal_size()
+        env["COLUMNS"], env["LINES"] = str(size.columns), str(size.lines)
+    return env
+
+
+def _relay(stream, text: str) -> bool:
+    try:
+        stream.write(text)
+        stream.flush()
+    except BrokenPipeError:
+        # The reader went away (`aigit ... | head`); stop quietly
+        os.dup2(os.open(os.devnull, os.O_WRONLY), stream.fileno())
+        return False
+    return True
+
+
+def forward(args: list[str]) -> int | None:
+    """Run a command in the daemon and relay its output.
+
+    Returns the exit code, or None if the daemon isn't available or declined
+    the command before running it.
+    """
+    sock = connect()
+    if sock is None:
+        return None
+
+    request = {
+        "op": "run",
+        "protocol": PROTOCOL_VERSION,
+        "version": __version__,
+        "argv": args,
+        "cwd": os.getcwd(),
+        "env": _client_env(),
+        "tty": {"stdout": sys.stdout.isatty(), "stderr": sys.stderr.isatty()},
+    }
+
+    started = False
+    with sock, sock.makefile("r", encoding="utf-8", newline="\n") as replies:
+        try:
+            send(sock, request)
+            for line in replies:
+                message = json.loads(line)
+                if "out" in message or "err" in message:
+                    started = True
+                    stream = sys.stdout if "out" in message else sys.stderr
+                    if not _relay(stream, message.get("out", message.get("err"))):
+                        return 1
+                elif "exit" in message:
+                    return message["exit"]
+                elif "error" in message:
+                    return None
+        except OSError:
+            pass
+
+    if not started:
+        return None
+    # The command may have had side effects, so don't run it again locally
+    sys.stderr.write("aigit: lost connection to the daemon\n")
+    return 1
+
+
+def main() -> None:
+    args = sys.argv[1:]
+    if should_forward(args):
+        try:
+            code = forward(args)
+        except KeyboardInterrupt:
+            # The daemon interrupts the command when the connection closes
+            sys.exit(130)
+        if code is not None:
+            sys.exit(code)
+
+    from aigit.cli import app
+
+    app(prog_name="aigit")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ from rich.console import Console
 from rich.panel import Panel
 from rich.prompt import Confirm, Prompt
 
+from aigit import cache
 from aigit.config import get_config
 from aigit.services import ai, git
 
@@ -14,9 +15,13 @@ console = Console()
 def branch_command(
     description: str = typer.Argument(None, help="Description for branch (optional)"),
     yes: bool = typer.Option(False, "-y", "--yes", help="Skip confirmation"),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Don't use cached AI responses"),
 ):
     """Generate AI branch name and create branch."""
 
+    if no_cache:
+        cache.disable()
+
     try:
         repo = git.get_repo()
 
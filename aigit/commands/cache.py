@@ -0,0 +1,47 @@
+"""Cache command implementation."""
+
+from datetime import datetime
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+from aigit import cache
+
+console = Console()
+
+
+def cache_command(
+    action: str = typer.Argument(..., help="Action: stats or clear"),
+):
+    """Manage the AI response cache."""
+
+    action = action.lower()
+
+    if action == "stats":
+        info = cache.stats()
+
+        table = Table(title="aigit Response Cache")
+        table.add_column("Stat", style="cyan")
+        table.add_column("Value", style="green")
+
+        oldest = info["oldest_access"]
+        table.add_row("Entries", str(info["entries"]))
+        table.add_row("Size", f"{info['size_bytes'] / 1024:.1f} KiB")
+        table.add_row(
+            "Least recently used",
+            datetime.fromtimestamp(oldest).strftime("%Y-%m-%d %H:%M") if oldest else "-",
+        )
+        table.add_row("Enabled", str(cache.is_enabled()).lower())
+
+        console.print(table)
+        console.print(f"\n[dim]Cache directory: {info['path']}[/dim]")
+
+    elif action == "clear":
+        removed = cache.clear()
+        console.print(f"[green]✓[/green] Removed {removed} cached responses")
+
+    else:
+        console.print(f"[red]Unknown action:[/red] {action}")
+        console.print("Available actions: stats, clear")
+        raise typer.Exit(1)
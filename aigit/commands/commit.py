@@ -1,23 +1,83 @@
 """Commit command implementation."""
 
 import typer
-from rich.console import Console
+from rich.console import Console, Group
+from rich.markup import escape
 from rich.panel import Panel
 from rich.prompt import Confirm, Prompt
+from rich.text import Text
 
+from aigit import cache
 from aigit.config import get_config
+from aigit.render import render_stream
 from aigit.services import ai, git
+from aigit.services.split import DEFAULT_MAX_COMMITS
 
 console = Console()
 
 
+def commit_split(repo, hint: str, yes: bool, max_commits: int) -> bool:
+    """Commit the staged changes as several commits, named in one request.
+
+    Returns False, having done nothing, if the changes form a single group.
+    """
+    from aigit.services import split
+
+    with console.status("[cyan]Grouping staged changes...[/cyan]"):
+        groups, excluded = split.plan_split(repo, max_commits)
+
+    if len(groups) < 2:
+        console.print("[dim]The staged changes form a single group; committing them as one.[/dim]")
+        return False
+
+    try:
+        with console.status(f"[cyan]Generating {len(groups)} commit messages...[/cyan]"):
+            split.name_groups(groups, excluded, hint)
+    except ValueError as e:
+        console.print(f"[red]Error:[/red] {e}")
+        raise typer.Exit(1)
+    except Exception as e:
+        console.print(f"[red]Failed to generate commit messages:[/red] {e}")
+        raise typer.Exit(1)
+
+    console.print()
+    for i, group in enumerate(groups, 1):
+        console.print(
+            Panel(
+                Group(Text(group.message), Text(""), Text("\n".join(group.paths), style="dim")),
+                title=f"Commit {i} of {len(groups)}",
+                subtitle=f"+{group.additions} -{group.deletions}",
+                border_style="green",
+            )
+        )
+    console.print()
+
+    if get_config("interactive") and not yes:
+        action = Prompt.ask("Action", choices=["commit", "cancel"], default="commit")
+        if action == "cancel":
+            console.print("[yellow]Commit cancelled.[/yellow]")
+            raise typer.Exit(0)
+
+    hashes = split.commit_groups(groups, repo)
+    for commit_hash, group in zip(hashes, groups):
+        subject = group.message.splitlines()[0]
+        console.print(f"[green]✓[/green] Committed [cyan]{commit_hash}[/cyan] {escape(subject)}", highlight=False)
+    return True
+
+
 def commit_command(
     all: bool = typer.Option(False, "-a", "--all", help="Stage all changes before committing"),
     message_hint: str = typer.Option(None, "-m", "--message", help="Hint for AI to generate message"),
     yes: bool = typer.Option(False, "-y", "--yes", help="Skip confirmation"),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Don't use cached AI responses"),
+    split: bool = typer.Option(False, "--split", help="Split the staged changes into several logical commits"),
+    max_commits: int = typer.Option(DEFAULT_MAX_COMMITS, "--max-commits", help="Most commits --split creates"),
 ):
     """Generate AI commit message and create commit."""
 
+    if no_cache:
+        cache.disable()
+
     try:
         repo = git.get_repo()
 
@@ -32,6 +92,9 @@ def commit_command(
             console.print("Use [cyan]git add[/cyan] or [cyan]aigit commit -a[/cyan] to stage changes.")
             raise typer.Exit(1)
 
+        if split and commit_split(repo, message_hint, yes, max_commits):
+            return
+
         # Get diff
         diff = git.get_staged_diff(repo)
 
@@ -43,23 +106,31 @@ def commit_command(
         console.print("[cyan]Generating commit message...[/cyan]")
         conventional = get_config("conventional_commits")
 
+        # Stream the message into the panel as it is generated
+        console.print()
         try:
-            commit_message = ai.generate_commit_message(diff, conventional, message_hint)
+            commit_message, completed = render_stream(
+                console,
+                ai.stream_commit_message(diff, conventional, message_hint),
+                title="Generated Commit Message",
+                border_style="green",
+                markdown=False,
+            )
         except ValueError as e:
             console.print(f"[red]Error:[/red] {e}")
             raise typer.Exit(1)
         except Exception as e:
             console.print(f"[red]Failed to generate commit message:[/red] {e}")
             raise typer.Exit(1)
-
-        # Display the message
-        console.print()
-        console.print(Panel(commit_message, title="Generated Commit Message", border_style="green"))
         console.print()
 
         # Confirm or edit
         interactive = get_config("interactive") and not yes
 
+        if not completed and not interactive:
+            console.print("[yellow]Generation cancelled, nothing committed.[/yellow]")
+            raise typer.Exit(1)
+
         if interactive:
             action = Prompt.ask(
                 "Action",
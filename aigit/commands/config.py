@@ -1,12 +1,26 @@
-"""Config command implementation."""
+"""Config command implementation.
+
+`config get` and `set` print through typer rather than rich, so they
+don't pay for importing rich; only `list` needs it for its table.
+"""
 
 import typer
-from rich.console import Console
-from rich.table import Table
 
 from aigit import config as cfg
 
-console = Console()
+# Credentials, shown masked
+SECRET_KEYS = {"openai_api_key", "github_token"}
+
+
+def mask(key: str, value):
+    """Mask a credential for display, keeping enough of it to recognize."""
+    if key not in SECRET_KEYS or not isinstance(value, str) or not value:
+        return value
+    return value[:8] + "..." if len(value) > 8 else "***"
+
+
+def _echo(label: str, text: str, color: str) -> None:
+    typer.echo(f"{typer.style(label, fg=color)} {text}")
 
 
 def config_command(
@@ -20,36 +34,36 @@ def config_command(
 
     if action == "set":
         if not key or value is None:
-            console.print("[red]Usage:[/red] aigit config set <key> <value>")
+            _echo("Usage:", "aigit config set <key> <value>", "red")
             raise typer.Exit(1)
 
         try:
             cfg.set_config(key, value)
-            console.print(f"[green]✓[/green] Set {key} = {value}")
+            _echo("✓", f"Set {key} = {mask(key, value)}", "green")
         except Exception as e:
-            console.print(f"[red]Error:[/red] {e}")
+            _echo("Error:", str(e), "red")
             raise typer.Exit(1)
 
     elif action == "get":
         if not key:
-            console.print("[red]Usage:[/red] aigit config get <key>")
+            _echo("Usage:", "aigit config get <key>", "red")
             raise typer.Exit(1)
 
         try:
             val = cfg.get_config(key)
             if val is None:
-                console.print(f"[yellow]Key not found:[/yellow] {key}")
+                _echo("Key not found:", key, "yellow")
             else:
-                # Mask sensitive values
-                if "key" in key.lower() or "token" in key.lower():
-                    if val:
-                        val = val[:8] + "..." if len(val) > 8 else "***"
-                console.print(f"{key} = {val}")
+                typer.echo(f"{key} = {mask(key, val)}")
         except Exception as e:
-            console.print(f"[red]Error:[/red] {e}")
+            _echo("Error:", str(e), "red")
             raise typer.Exit(1)
 
     elif action == "list":
+        from rich.console import Console
+        from rich.table import Table
+
+        console = Console()
         try:
             config = cfg.load_config()
 
@@ -58,22 +72,18 @@ def config_command(
             table.add_column("Value", style="green")
 
             for k, v in sorted(config.items()):
-                # Mask sensitive values
-                display_val = str(v)
-                if "key" in k.lower() or "token" in k.lower():
-                    if v:
-                        display_val = str(v)[:8] + "..." if len(str(v)) > 8 else "***"
-
-                table.add_row(k, display_val)
+                table.add_row(k, str(mask(k, v)))
 
             console.print(table)
             console.print(f"\n[dim]Config file: {cfg.CONFIG_FILE}[/dim]")
+            local_config = cfg.find_local_config()
+            if local_config:
+                console.print(f"[dim]Repo config: {local_config}[/dim]")
         except Exception as e:
             console.print(f"[red]Error:[/red] {e}")
             raise typer.Exit(1)
 
     else:
-        console.print(f"[red]Unknown action:[/red] {action}")
-        console.print("Available actions: set, get, list")
+        _echo("Unknown action:", action, "red")
+        typer.echo("Available actions: set, get, list")
         raise typer.Exit(1)
-
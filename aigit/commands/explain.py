@@ -1,23 +1,42 @@
 """Explain command implementation."""
 
+import sys
+
 import typer
 from rich.console import Console
-from rich.markdown import Markdown
-from rich.panel import Panel
 
+from aigit import cache
+from aigit.render import render_stream
 from aigit.services import ai, git
 
 console = Console()
+err_console = Console(stderr=True)
+
+FORMATS = ("markdown", "jsonl")
 
 
 def explain_command(
-    target: str = typer.Argument(None, help="Commit hash, branch, or empty for current diff"),
+    target: str = typer.Argument(None, help="Commit hash, branch, A..B range, or empty for current diff"),
+    since: str = typer.Option(None, "--since", help="Explain each commit since a date (batch mode)"),
+    until: str = typer.Option(None, "--until", help="Explain each commit until a date (batch mode)"),
+    output_format: str = typer.Option("markdown", "--format", "-f", help="Batch output format: markdown or jsonl"),
+    output: str = typer.Option(None, "--output", "-o", help="Write batch output to a file instead of stdout"),
+    jobs: int = typer.Option(None, "--jobs", "-j", help="Concurrent requests in batch mode (default: max_workers)"),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Don't use cached AI responses"),
 ):
     """Explain what changed in a commit/branch/diff."""
 
+    if no_cache:
+        cache.disable()
+
     try:
         repo = git.get_repo()
 
+        # A range or date filter explains each commit separately
+        if (target and ".." in target) or since or until:
+            explain_batch(repo, target, since, until, output_format, output, jobs)
+            return
+
         # Determine what to explain
         context = None
         diff = None
@@ -58,8 +77,14 @@ def explain_command(
         console.print(f"[cyan]Explaining {context}...[/cyan]")
         console.print()
 
+        # Stream the explanation into the panel as it is generated
         try:
-            explanation = ai.generate_explanation(diff, context)
+            render_stream(
+                console,
+                ai.stream_explanation(diff, context),
+                title="Explanation",
+                border_style="blue",
+            )
         except ValueError as e:
             console.print(f"[red]Error:[/red] {e}")
             raise typer.Exit(1)
@@ -67,10 +92,52 @@ def explain_command(
             console.print(f"[red]Failed to generate explanation:[/red] {e}")
             raise typer.Exit(1)
 
-        # Display explanation
-        console.print(Panel(Markdown(explanation), title="Explanation", border_style="blue"))
-
     except ValueError as e:
         console.print(f"[red]Error:[/red] {e}")
         raise typer.Exit(1)
 
+
+def explain_batch(repo, rev_range, since, until, output_format, output, jobs):
+    """Explain every commit in a range, writing entries in commit order."""
+    from aigit.services import explain
+
+    if output_format not in FORMATS:
+        console.print(f"[red]Unknown format:[/red] {output_format} (choose from {', '.join(FORMATS)})")
+        raise typer.Exit(1)
+
+    commits = git.iter_commits(repo, rev_range, since, until)
+    out = open(output, "w", encoding="utf-8") if output else sys.stdout
+    written = cached = 0
+
+    try:
+        with err_console.status("[cyan]Explaining commits...[/cyan]") as status:
+            for entry in explain.explain_commits(repo, commits, jobs):
+                if output_format == "jsonl":
+                    out.write(entry.to_json() + "\n")
+                else:
+                    out.write(("\n" if written else "") + entry.to_markdown())
+                out.flush()
+
+                written += 1
+                cached += entry.cached
+                status.update(f"[cyan]Explained {written} commits ({cached} already explained)...[/cyan]")
+    except KeyboardInterrupt:
+        err_console.print(f"[yellow]Cancelled after {written} commits.[/yellow]")
+        raise typer.Exit(130)
+    except ValueError as e:
+        err_console.print(f"[red]Error:[/red] {e}")
+        raise typer.Exit(1)
+    except Exception as e:
+        err_console.print(f"[red]Failed to generate explanation:[/red] {e}")
+        raise typer.Exit(1)
+    finally:
+        if output:
+            out.close()
+
+    if not written:
+        err_console.print("[yellow]No commits found.[/yellow]")
+        raise typer.Exit(1)
+
+    suffix = f", {cached} from earlier runs" if cached else ""
+    target = f" to {output}" if output else ""
+    err_console.print(f"[green]✓ Explained {written} commits{target}{suffix}[/green]")
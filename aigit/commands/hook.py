@@ -0,0 +1,81 @@
+"""Hook command implementation."""
+
+import typer
+from rich.console import Console
+
+from aigit.services import git, hooks
+
+console = Console()
+err_console = Console(stderr=True)
+
+
+def hook_command(
+    action: str = typer.Argument(..., help="Action: install, uninstall or status (run and pregenerate are used by the hooks)"),
+    args: list[str] = typer.Argument(None, help="Arguments passed by git to the hook"),
+    pregenerate: bool = typer.Option(
+        False, "--pregenerate", help="Also generate the message in the background whenever files are staged"
+    ),
+    force: bool = typer.Option(False, "--force", help="Replace existing hooks not installed by aigit"),
+):
+    """Use AI commit messages in plain `git commit`."""
+
+    action = action.lower()
+
+    try:
+        repo = git.get_repo()
+
+        if action == "install":
+            for path in hooks.install(repo, pregenerate=pregenerate, force=force):
+                console.print(f"[green]✓[/green] Installed {path}")
+            if not pregenerate:
+                console.print("[dim]Generate messages while you stage with: aigit hook install --pregenerate[/dim]")
+
+        elif action == "uninstall":
+            removed = hooks.uninstall(repo)
+            if not removed:
+                console.print("[yellow]No aigit hooks installed.[/yellow]")
+            for path in removed:
+                console.print(f"[green]✓[/green] Removed {path}")
+
+        elif action == "status":
+            installed = hooks.installed_hooks(repo)
+            if not installed:
+                console.print("[yellow]No aigit hooks installed.[/yellow] Install with: aigit hook install")
+                raise typer.Exit(1)
+            console.print(f"Installed in {hooks.get_hooks_dir(repo)}: {', '.join(installed)}")
+            if git.has_staged_changes(repo):
+                pregenerated = hooks.load_message(repo, hooks.staged_tree(repo)) is not None
+                console.print(f"[dim]Message for the staged changes pre-generated: {str(pregenerated).lower()}[/dim]")
+
+        elif action == "run":
+            # prepare-commit-msg <file> [<source> [<sha>]]
+            if not args:
+                console.print("[red]Usage:[/red] aigit hook run <message-file> [<source>]")
+                raise typer.Exit(1)
+            path, source = args[0], args[1] if len(args) > 1 else ""
+            if source in hooks.SKIPPED_SOURCES or hooks.has_message(path):
+                return
+            if not git.has_staged_changes(repo):
+                return
+
+            try:
+                message, pregenerated = hooks.get_message(repo)
+            except Exception as e:
+                # Never block the commit; the user writes the message instead
+                err_console.print(f"[yellow]aigit: couldn't generate a commit message:[/yellow] {e}")
+                return
+            hooks.write_message(path, message)
+            if not pregenerated:
+                err_console.print("[dim]aigit: generated the commit message[/dim]")
+
+        elif action == "pregenerate":
+            hooks.pregenerate(repo)
+
+        else:
+            console.print(f"[red]Unknown action:[/red] {action}")
+            console.print("Available actions: install, uninstall, status")
+            raise typer.Exit(1)
+
+    except ValueError as e:
+        console.print(f"[red]Error:[/red] {e}")
+        raise typer.Exit(1)
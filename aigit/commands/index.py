@@ -0,0 +1,70 @@
+"""Index command implementation."""
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+from aigit.config import get_config
+from aigit.services import git, index
+
+console = Console()
+
+
+def index_command(
+    action: str = typer.Argument("update", help="Action: update, status or clear"),
+):
+    """Manage the semantic index of the repository."""
+
+    action = action.lower()
+
+    try:
+        repo = git.get_repo()
+
+        if action == "update":
+            with console.status("[cyan]Indexing repository...[/cyan]") as status:
+
+                def progress(done, total):
+                    status.update(f"[cyan]Embedding files... {done}/{total}[/cyan]")
+
+                stats = index.update_index(repo, on_progress=progress)
+
+            console.print(
+                f"[green]✓[/green] Indexed {stats.files} files ({stats.chunks} chunks); "
+                f"embedded {stats.embedded_files} new files ({stats.embedded_chunks} chunks), "
+                f"removed {stats.removed_files}"
+            )
+            if not get_config("semantic_context"):
+                console.print("[dim]Enable related-code context with: aigit config set semantic_context true[/dim]")
+
+        elif action == "status":
+            manifest = index.load_manifest(repo)
+            if manifest is None:
+                console.print("[yellow]No index yet.[/yellow] Build one with: aigit index")
+                raise typer.Exit(1)
+
+            table = Table(title="aigit Semantic Index")
+            table.add_column("Stat", style="cyan")
+            table.add_column("Value", style="green")
+
+            head = manifest.get("head") or ""
+            table.add_row("Files", str(len(manifest["files"])))
+            table.add_row("Chunks", str(sum(manifest.get("chunks", {}).values())))
+            table.add_row("Indexed commit", head[:7] + ("" if head == repo.head.commit.hexsha else " (behind HEAD)"))
+            table.add_row("Embeddings", manifest.get("identity", "-"))
+            table.add_row("Used in prompts", str(bool(get_config("semantic_context"))).lower())
+
+            console.print(table)
+            console.print(f"\n[dim]Index directory: {index.get_index_dir(repo)}[/dim]")
+
+        elif action == "clear":
+            index.clear_index(repo)
+            console.print("[green]✓[/green] Removed the semantic index")
+
+        else:
+            console.print(f"[red]Unknown action:[/red] {action}")
+            console.print("Available actions: update, status, clear")
+            raise typer.Exit(1)
+
+    except ValueError as e:
+        console.print(f"[red]Error:[/red] {e}")
+        raise typer.Exit(1)
@@ -1,10 +1,13 @@
 """PR command implementation."""
 
+from concurrent.futures import Future, ThreadPoolExecutor
+
 import typer
 from rich.console import Console
 from rich.panel import Panel
 from rich.prompt import Confirm, Prompt
 
+from aigit import cache
 from aigit.config import get_config
 from aigit.services import ai, git, github
 
@@ -16,9 +19,13 @@ def pr_command(
     draft: bool = typer.Option(False, "--draft", help="Create as draft PR"),
     yes: bool = typer.Option(False, "-y", "--yes", help="Skip confirmation"),
     no_open: bool = typer.Option(False, "--no-open", help="Don't open PR in browser"),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Don't use cached AI responses"),
 ):
     """Generate AI PR title/description and create pull request."""
 
+    if no_cache:
+        cache.disable()
+
     try:
         repo = git.get_repo()
 
@@ -42,46 +49,37 @@ def pr_command(
 
         files_changed = git.get_changed_files(repo, base_branch)
 
-        # Generate PR content
-        console.print("[cyan]Generating PR title and description...[/cyan]")
+        # In tool-calling mode the model starts from the commit subjects
+        commits = None
+        if get_config("pr_tools"):
+            commits = [commit.subject for commit in git.iter_commits(repo, f"{base_branch}..HEAD")]
+
+        # The push doesn't depend on the PR text, so run it during generation
+        push = None
+        if get_config("early_push"):
+            console.print(f"[cyan]Pushing {current_branch} to origin in the background...[/cyan]")
+            pool = ThreadPoolExecutor(max_workers=1)
+            push = pool.submit(git.push_branch, repo, True)
+            pool.shutdown(wait=False)
 
         try:
-            title, description = ai.generate_pr(diff, base_branch, current_branch, files_changed)
-        except ValueError as e:
-            console.print(f"[red]Error:[/red] {e}")
-            raise typer.Exit(1)
-        except Exception as e:
-            console.print(f"[red]Failed to generate PR:[/red] {e}")
-            raise typer.Exit(1)
+            title, description = generate_and_confirm(
+                diff, base_branch, current_branch, files_changed, yes, commits
+            )
+        except (KeyboardInterrupt, typer.Exit) as e:
+            # Cancelled or generation failed: undo the early push
+            rollback(push, repo)
+            raise typer.Exit(130 if isinstance(e, KeyboardInterrupt) else e.exit_code)
 
-        # Display the PR content
-        console.print()
-        console.print(Panel(title, title="PR Title", border_style="green"))
-        console.print()
-        console.print(Panel(description, title="PR Description", border_style="green"))
-        console.print()
-        console.print(f"[dim]Base: {base_branch} ← Head: {current_branch}[/dim]")
-        console.print()
-
-        # Confirm or edit
-        interactive = get_config("interactive") and not yes
-
-        if interactive:
-            if not Confirm.ask("Create this PR?", default=True):
-                console.print("[yellow]PR creation cancelled.[/yellow]")
-                raise typer.Exit(0)
-
-            if Confirm.ask("Edit title or description?", default=False):
-                title = Prompt.ask("PR Title", default=title)
-                console.print("PR Description (press Enter to keep current):")
-                new_desc = Prompt.ask("", default="<keep current>")
-                if new_desc != "<keep current>":
-                    description = new_desc
-
-        # Push branch to origin
-        console.print(f"[cyan]Pushing {current_branch} to origin...[/cyan]")
+        # Wait for the early push, or push now
         try:
-            git.push_branch(repo, set_upstream=True)
+            if push is None:
+                console.print(f"[cyan]Pushing {current_branch} to origin...[/cyan]")
+                git.push_branch(repo, set_upstream=True)
+            else:
+                if not push.done():
+                    console.print(f"[dim]Waiting for push of {current_branch} to finish...[/dim]")
+                push.result()
         except Exception as e:
             console.print(f"[red]Failed to push branch:[/red] {e}")
             raise typer.Exit(1)
@@ -117,3 +115,79 @@ def pr_command(
         console.print(f"[red]Error:[/red] {e}")
         raise typer.Exit(1)
 
+
+def generate_and_confirm(
+    diff: str,
+    base_branch: str,
+    current_branch: str,
+    files_changed: list[str],
+    yes: bool,
+    commits: list[str] = None,
+) -> tuple[str, str]:
+    """Generate the PR title and description, then show them for confirmation."""
+    console.print("[cyan]Generating PR title and description...[/cyan]")
+
+    try:
+        title, description = ai.generate_pr(diff, base_branch, current_branch, files_changed, commits)
+    except ValueError as e:
+        console.print(f"[red]Error:[/red] {e}")
+        raise typer.Exit(1)
+    except Exception as e:
+        console.print(f"[red]Failed to generate PR:[/red] {e}")
+        raise typer.Exit(1)
+
+    # Display the PR content
+    console.print()
+    console.print(Panel(title, title="PR Title", border_style="green"))
+    console.print()
+    console.print(Panel(description, title="PR Description", border_style="green"))
+    console.print()
+    console.print(f"[dim]Base: {base_branch} ← Head: {current_branch}[/dim]")
+    console.print()
+
+    # Confirm or edit
+    interactive = get_config("interactive") and not yes
+
+    if interactive:
+        if not Confirm.ask("Create this PR?", default=True):
+            console.print("[yellow]PR creation cancelled.[/yellow]")
+            raise typer.Exit(0)
+
+        if Confirm.ask("Edit title or description?", default=False):
+            title = Prompt.ask("PR Title", default=title)
+            console.print("PR Description (press Enter to keep current):")
+            new_desc = Prompt.ask("", default="<keep current>")
+            if new_desc != "<keep current>":
+                description = new_desc
+
+    return title, description
+
+
+def rollback(push: Future | None, repo) -> None:
+    """Undo an early push after the PR was cancelled.
+
+    A branch the push created is deleted from origin; a branch it moved
+    is restored to its previous commit. Both use --force-with-lease, so
+    commits pushed by anyone else in the meantime are left alone.
+    """
+    if push is None:
+        return
+
+    try:
+        result = push.result()
+    except BaseException:
+        return  # Nothing reached the remote
+
+    if not result.changed:
+        return
+
+    try:
+        git.rollback_push(result, repo)
+    except Exception as e:
+        console.print(f"[red]Failed to roll back push of {result.branch}, it is still on origin:[/red] {e}")
+        return
+
+    if result.created:
+        console.print(f"[yellow]Deleted {result.branch} from origin.[/yellow]")
+    else:
+        console.print(f"[yellow]Restored origin/{result.branch} to {result.old_sha[:7]}.[/yellow]")
@@ -2,17 +2,34 @@
 
 import typer
 from rich.console import Console
-from rich.markdown import Markdown
-from rich.panel import Panel
 
-from aigit.services import ai, git
+from aigit import cache
+from aigit.render import render_progress
+from aigit.services import git, review
 
 console = Console()
 
 
-def review_command():
+def format_result(result: review.ReviewResult) -> str:
+    """Render a (possibly partial) review result as Markdown."""
+    if not result.done:
+        report = review.format_report(result.findings, result.files) if result.findings else ""
+        report += f"\n\n*Reviewing... {result.groups_done}/{result.groups} file groups done*"
+    else:
+        report = review.format_report(result.findings, result.files)
+    if result.cached_hunks:
+        report += f"\n\n*{result.cached_hunks} unchanged hunks reused from earlier reviews*"
+    return report
+
+
+def review_command(
+    no_cache: bool = typer.Option(False, "--no-cache", help="Don't use cached AI responses"),
+):
     """AI code review of staged changes."""
 
+    if no_cache:
+        cache.disable()
+
     try:
         repo = git.get_repo()
 
@@ -29,8 +46,15 @@ def review_command():
         console.print("[cyan]Reviewing staged changes...[/cyan]")
         console.print()
 
+        # Only new or changed hunks go to the model; findings appear as groups finish
         try:
-            review = ai.generate_review(diff)
+            render_progress(
+                console,
+                lambda update: review.review_diff(diff, on_update=update),
+                render=format_result,
+                title="Code Review",
+                border_style="blue",
+            )
         except ValueError as e:
             console.print(f"[red]Error:[/red] {e}")
             raise typer.Exit(1)
@@ -38,9 +62,6 @@ def review_command():
             console.print(f"[red]Failed to generate review:[/red] {e}")
             raise typer.Exit(1)
 
-        # Display review
-        console.print(Panel(Markdown(review), title="Code Review", border_style="blue"))
-
     except ValueError as e:
         console.print(f"[red]Error:[/red] {e}")
         raise typer.Exit(1)
@@ -0,0 +1,96 @@
+"""Serve command implementation."""
+
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import typer
+from rich.console import Console
+
+from aigit import daemon
+from aigit.client import get_socket_path
+from aigit.config import CONFIG_DIR
+
+console = Console()
+
+LOG_FILE = CONFIG_DIR / "daemon.log"
+
+
+def _start_detached(path: str, idle_timeout: int) -> dict | None:
+    """Start the daemon in a new session and wait until it answers."""
+    LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(LOG_FILE, "ab") as log:
+        subprocess.Popen(
+            [sys.executable, "-m", "aigit.daemon", "--socket", path, "--idle-timeout", str(idle_timeout)],
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=log,
+            start_new_session=True,
+        )
+
+    deadline = time.monotonic() + daemon.START_TIMEOUT
+    while time.monotonic() < deadline:
+        status = daemon.request({"op": "status"}, path)
+        if status is not None:
+            return status
+        time.sleep(0.05)
+    return None
+
+
+def serve_command(
+    action: str = typer.Argument("start", help="Action: start, stop or status"),
+    detach: bool = typer.Option(False, "--detach", "-d", help="Run the daemon in the background"),
+    idle_timeout: int = typer.Option(3600, "--idle-timeout", help="Exit after this many idle seconds (0: never)"),
+    socket_path: str = typer.Option(None, "--socket", help="Unix socket to listen on"),
+):
+    """Run a daemon that keeps aigit's state warm between commands."""
+
+    action = action.lower()
+    path = socket_path or get_socket_path()
+
+    if action == "start":
+        if detach:
+            if daemon.request({"op": "status"}, path) is not None:
+                console.print(f"[yellow]Already running[/yellow] on {path}")
+                return
+            status = _start_detached(path, idle_timeout)
+            if status is None:
+                console.print(f"[red]Error:[/red] The daemon didn't start; see {LOG_FILE}")
+                raise typer.Exit(1)
+            console.print(f"[green]✓[/green] Daemon running (pid {status['pid']}) on {path}")
+            return
+
+        console.print(f"[cyan]Listening on {path}[/cyan] [dim](Ctrl+C to stop)[/dim]")
+        try:
+            daemon.serve(path, idle_timeout)
+        except (ValueError, OSError) as e:
+            console.print(f"[red]Error:[/red] {e}")
+            raise typer.Exit(1)
+
+    elif action == "stop":
+        if daemon.request({"op": "stop"}, path) is None:
+            console.print("[yellow]No daemon running.[/yellow]")
+            raise typer.Exit(1)
+        console.print("[green]✓[/green] Daemon stopped")
+
+    elif action == "status":
+        status = daemon.request({"op": "status"}, path)
+        if status is None:
+            console.print("[yellow]No daemon running.[/yellow] Start one with: aigit serve --detach")
+            raise typer.Exit(1)
+
+        started = datetime.fromtimestamp(status["started_at"]).strftime("%Y-%m-%d %H:%M")
+        idle = f"{status['idle_timeout']:.0f}s" if status["idle_timeout"] else "never"
+        console.print(
+            f"[green]Running[/green] (pid {status['pid']}, aigit {status['version']}) on {path}\n"
+            f"[dim]Started {started}; {status['requests']} commands served; idle timeout {idle}[/dim]"
+        )
+        if os.environ.get("AIGIT_NO_DAEMON"):
+            console.print("[dim]AIGIT_NO_DAEMON is set, so this shell runs commands locally[/dim]")
+
+    else:
+        console.print(f"[red]Unknown action:[/red] {action}")
+        console.print("Available actions: start, stop, status")
+        raise typer.Exit(1)
@@ -1,6 +1,7 @@
 """Configuration management for aigit."""
 
 import os
+import time
 from pathlib import Path
 from typing import Any
 
@@ -10,56 +11,250 @@ import tomli_w
 CONFIG_DIR = Path.home() / ".config" / "aigit"
 CONFIG_FILE = CONFIG_DIR / "config.toml"
 
+# Repo-local overrides, found by walking up from the working directory
+LOCAL_CONFIG_NAME = ".aigit.toml"
+
+# Settings a repo-local file may change. A cloned repository is not
+# trusted, so endpoints, credentials, the provider and file paths can only
+# be set in the global file or the environment.
+LOCAL_KEYS = {
+    "model",
+    "embedding_model",
+    "conventional_commits",
+    "max_diff_tokens",
+    "max_diff_mb",
+    "include",
+    "exclude",
+    "exclude_generated",
+    "map_reduce",
+    "pr_tools",
+    "review_group_tokens",
+    "semantic_context",
+    "context_tokens",
+    "context_top_k",
+    "structured_outputs",
+}
+
+# Environment variables AIGIT_<KEY> override every file
+ENV_PREFIX = "AIGIT_"
+
+# Seconds between checks for config file changes
+CHECK_INTERVAL = 1.0
+
 DEFAULT_CONFIG = {
     "openai_api_key": "",
     "github_token": "",
+    "github_api_url": "https://api.github.com",
     "model": "gpt-4o-mini",
+    "provider": "openai",
+    "base_url": "",
+    "structured_outputs": True,
     "conventional_commits": True,
     "auto_stage": False,
     "interactive": True,
+    "early_push": False,
+    "max_diff_tokens": 12000,
+    "max_diff_mb": 4.0,
+    "include": "",
+    "exclude": "",
+    "exclude_generated": True,
+    "map_reduce": True,
+    "pr_tools": False,
+    "max_workers": 4,
+    "review_group_tokens": 4000,
+    "semantic_context": False,
+    "embedding_model": "text-embedding-3-small",
+    "context_tokens": 2000,
+    "context_top_k": 8,
+    "cache": True,
+    "cache_max_mb": 50,
+    "cache_max_age_days": 30,
+    "http_pool_size": 10,
+    "http_timeout": 60,
+    "http2": True,
+    "max_retries": 5,
+    "rpm_limit": 0,
+    "tpm_limit": 0,
+    "stub_latency_ms": 0,
+    "stats": False,
+    "metrics_file": "",
+    "otel": False,
 }
 
+BOOL_KEYS = {k for k, v in DEFAULT_CONFIG.items() if isinstance(v, bool)}
+INT_KEYS = {k for k, v in DEFAULT_CONFIG.items() if isinstance(v, int) and not isinstance(v, bool)}
+FLOAT_KEYS = {k for k, v in DEFAULT_CONFIG.items() if isinstance(v, float)}
+
+TRUE_VALUES = ("true", "1", "yes", "on")
+FALSE_VALUES = ("false", "0", "no", "off", "")
+
+_cache: dict[str, Any] | None = None
+_cache_signature: tuple = None
+_checked_at = 0.0
+
 
 def ensure_config_dir() -> None:
     """Ensure the config directory exists."""
     CONFIG_DIR.mkdir(parents=True, exist_ok=True)
 
 
+def _read_toml(path: Path) -> dict[str, Any]:
+    """Read a TOML file, returning an empty dict if it does not exist."""
+    try:
+        with open(path, "rb") as f:
+            return tomli.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _mtime(path: Path | None) -> int | None:
+    try:
+        return path.stat().st_mtime_ns if path else None
+    except OSError:
+        return None
+
+
+def _coerce(key: str, value: str) -> Any:
+    """Convert a string value to the type of a known config key.
+
+    Raises ValueError for values that don't fit the key's type.
+    """
+    if key in BOOL_KEYS:
+        if value.strip().lower() in TRUE_VALUES:
+            return True
+        if value.strip().lower() in FALSE_VALUES:
+            return False
+        raise ValueError(f"Invalid value for {key}: {value!r} (expected true or false)")
+    try:
+        if key in INT_KEYS:
+            return int(value)
+        if key in FLOAT_KEYS:
+            return float(value)
+    except ValueError:
+        expected = "an integer" if key in INT_KEYS else "a number"
+        raise ValueError(f"Invalid value for {key}: {value!r} (expected {expected})") from None
+    return value
+
+
+def find_local_config(start: Path = None) -> Path | None:
+    """Find a repo-local config file in the current directory or its parents.
+
+    The search stops at the repository root (the first directory with a
+    .git entry).
+    """
+    path = (start or Path.cwd()).resolve()
+
+    for directory in (path, *path.parents):
+        candidate = directory / LOCAL_CONFIG_NAME
+        if candidate.is_file():
+            return candidate
+        if (directory / ".git").exists():
+            break
+
+    return None
+
+
+def _warn(message: str) -> None:
+    from rich.console import Console
+    from rich.markup import escape
+
+    Console(stderr=True).print(f"[yellow]aigit:[/yellow] {escape(message)}", highlight=False, soft_wrap=True)
+
+
+def get_env_config() -> dict[str, Any]:
+    """Get config overrides from AIGIT_<KEY> environment variables.
+
+    Only known keys count; other AIGIT_* variables (AIGIT_NO_DAEMON,
+    AIGIT_DAEMON_SOCKET, AIGIT_IN_HOOK) control aigit itself.
+    """
+    overrides = {}
+    for name, value in os.environ.items():
+        if not name.startswith(ENV_PREFIX):
+            continue
+        key = name[len(ENV_PREFIX):].lower()
+        if key not in DEFAULT_CONFIG:
+            continue
+        try:
+            overrides[key] = _coerce(key, value)
+        except ValueError as e:
+            # Reported rather than raised: config is read in places that can't fail
+            _warn(f"ignoring {name}: {e}")
+    return overrides
+
+
+def _load_layers(local_path: Path | None) -> dict[str, Any]:
+    merged = DEFAULT_CONFIG.copy()
+    merged.update(_read_toml(CONFIG_FILE))
+    if local_path:
+        local = _read_toml(local_path)
+        merged.update({key: value for key, value in local.items() if key in LOCAL_KEYS})
+    merged.update(get_env_config())
+
+    return merged
+
+
+def _get_cached_config() -> dict[str, Any]:
+    """Get the merged config, re-reading files only when they change.
+
+    Sources are checked at most once per CHECK_INTERVAL seconds, so
+    repeated lookups within a command cost a dict access.
+    """
+    global _cache, _cache_signature, _checked_at
+
+    now = time.monotonic()
+    if _cache is not None and now - _checked_at < CHECK_INTERVAL:
+        return _cache
+
+    local_path = find_local_config()
+    env = tuple(sorted((k, v) for k, v in os.environ.items() if k.startswith(ENV_PREFIX)))
+    signature = (_mtime(CONFIG_FILE), local_path, _mtime(local_path), env)
+
+    if _cache is None or signature != _cache_signature:
+        _cache = _load_layers(local_path)
+        _cache_signature = signature
+
+    _checked_at = now
+    return _cache
+
+
+def invalidate_config() -> None:
+    """Force the next lookup to re-read all config sources."""
+    global _cache
+    _cache = None
+
+
 def load_config() -> dict[str, Any]:
-    """Load configuration from file."""
-    if not CONFIG_FILE.exists():
-        return DEFAULT_CONFIG.copy()
+    """Load configuration merged from defaults, global file, repo-local file and env."""
+    return _get_cached_config().copy()
 
-    with open(CONFIG_FILE, "rb") as f:
-        config = tomli.load(f)
 
-    # Merge with defaults for any missing keys
+def load_global_config() -> dict[str, Any]:
+    """Load only the global config file, merged with defaults."""
     merged = DEFAULT_CONFIG.copy()
-    merged.update(config)
+    merged.update(_read_toml(CONFIG_FILE))
     return merged
 
 
 def save_config(config: dict[str, Any]) -> None:
-    """Save configuration to file."""
+    """Save configuration to the global file."""
     ensure_config_dir()
     with open(CONFIG_FILE, "wb") as f:
         tomli_w.dump(config, f)
+    invalidate_config()
 
 
 def get_config(key: str) -> Any:
     """Get a specific config value."""
-    config = load_config()
-    return config.get(key)
+    return _get_cached_config().get(key)
 
 
 def set_config(key: str, value: Any) -> None:
-    """Set a specific config value."""
-    config = load_config()
+    """Set a specific config value in the global file."""
+    config = load_global_config()
 
-    # Type conversion for known boolean fields
-    if key in ("conventional_commits", "auto_stage", "interactive"):
-        if isinstance(value, str):
-            value = value.lower() in ("true", "1", "yes", "on")
+    # Type conversion for known boolean and integer fields
+    if isinstance(value, str):
+        value = _coerce(key, value)
 
     config[key] = value
     save_config(config)
@@ -0,0 +1,353 @@
+"""Long-lived daemon that runs aigit commands with warm state.
+
+`aigit serve` listens on a Unix socket. The thin client (aigit.client)
+sends it each command's arguments, working directory, environment and
+whether its output is a terminal; the daemon runs the command in-process
+and streams the output back. Imported modules, Repo objects, pooled HTTP
+clients, the rate-limit scheduler and in-memory caches stay warm between
+commands. Commands run one at a time, since each takes over the process's
+working directory, environment and standard streams.
+
+Messages are JSON, one per line. Requests: {"op": "run", ...},
+{"op": "status"} and {"op": "stop"}. A run is answered by any number of
+{"out": text} and {"err": text} messages and a final {"exit": code}, or by
+{"error": reason} if the daemon declines it.
+"""
+
+import contextlib
+import ctypes
+import io
+import json
+import os
+import select
+import signal
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+import traceback
+
+from aigit import __version__
+from aigit.client import PROTOCOL_VERSION, connect, get_socket_path, send
+
+# How long `serve --detach` waits for the daemon to start listening
+START_TIMEOUT = 10.0
+
+# How often a running command checks whether its client is still connected
+DISCONNECT_POLL = 0.5
+
+
+class _ClientStream(io.TextIOBase):
+    """Text stream that sends writes to the client as out/err messages."""
+
+    def __init__(self, reply, name: str, tty: bool):
+        self._reply = reply
+        self._name = name
+        self._tty = tty
+
+    @property
+    def encoding(self) -> str:
+        return "utf-8"
+
+    def writable(self) -> bool:
+        return True
+
+    def isatty(self) -> bool:
+        return self._tty
+
+    def write(self, text: str) -> int:
+        if text:
+            self._reply({self._name: text})
+        return len(text)
+
+
+class _DisconnectWatch:
+    """Interrupt the command run inside this context when its client disconnects.
+
+    The client sends nothing after its request, so the socket becoming
+    readable means it was closed (Ctrl-C, or the client's output pipe
+    closed). The command's thread then gets a KeyboardInterrupt, raised the
+    next time it runs Python code, so it stops and releases the run lock
+    instead of finishing for nobody.
+    """
+
+    def __init__(self, sock: socket.socket):
+        self._sock = sock
+        self._lock = threading.Lock()
+        self._thread_id = None
+        self._done = threading.Event()
+        self.disconnected = False
+
+    def __enter__(self):
+        self._thread_id = threading.get_ident()
+        threading.Thread(target=self._watch, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._done.set()
+        with self._lock:
+            if self.disconnected:
+                # Drop the interrupt if the command finished before it was raised
+                _set_async_exc(self._thread_id, None)
+            self._thread_id = None
+        return False
+
+    def _watch(self) -> None:
+        while not self._done.wait(DISCONNECT_POLL):
+            try:
+                readable, _, _ = select.select([self._sock], [], [], 0)
+                if not readable:
+                    continue
+                if self._sock.recv(1, socket.MSG_PEEK):
+                    # Unexpected data, not a disconnect; stop watching
+                    return
+            except OSError:
+                pass
+            with self._lock:
+                if self._thread_id is not None:
+                    self.disconnected = True
+                    _set_async_exc(self._thread_id, KeyboardInterrupt)
+            return
+
+
+def _set_async_exc(thread_id: int, exc_type) -> None:
+    """Raise exc_type in another thread, or cancel a pending one with None."""
+    exc = ctypes.py_object(exc_type) if exc_type is not None else None
+    ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(thread_id), exc)
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, idle_timeout: float):
+        super().__init__(path, _Handler)
+        self.idle_timeout = idle_timeout
+        self.started_at = time.time()
+        self.last_active = time.monotonic()
+        self.requests = 0
+        self.run_lock = threading.Lock()
+
+    def stop(self) -> None:
+        # shutdown() waits for serve_forever() to return, so never call it
+        # from the thread running serve_forever()
+        threading.Thread(target=self.shutdown, daemon=True).start()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def reply(self, message: dict) -> None:
+        with self._write_lock:
+            self.wfile.write(json.dumps(message).encode("utf-8") + b"\n")
+
+    def handle(self):
+        self._write_lock = threading.Lock()
+        line = self.rfile.readline()
+        if not line:
+            return
+        if not _same_user(self.request):
+            self.reply({"error": "permission denied"})
+            return
+
+        request = json.loads(line)
+        op = request.get("op")
+        server: _Server = self.server
+
+        if op == "status":
+            self.reply(
+                {
+                    "pid": os.getpid(),
+                    "version": __version__,
+                    "started_at": server.started_at,
+                    "requests": server.requests,
+                    "idle_timeout": server.idle_timeout,
+                }
+            )
+        elif op == "stop":
+            self.reply({"ok": True})
+            server.stop()
+        elif op == "run":
+            if request.get("protocol") != PROTOCOL_VERSION or request.get("version") != __version__:
+                # Let the client run its own version of aigit
+                self.reply({"error": "version mismatch"})
+                return
+            with server.run_lock:
+                server.requests += 1
+                try:
+                    code = run_command(request, self.reply, _DisconnectWatch(self.request))
+                finally:
+                    server.last_active = time.monotonic()
+            try:
+                self.reply({"exit": code})
+            except OSError:
+                pass
+        else:
+            self.reply({"error": f"unknown op: {op}"})
+
+
+def _same_user(sock: socket.socket) -> bool:
+    """Check that the peer runs as this user, where the OS can tell."""
+    if not hasattr(socket, "SO_PEERCRED"):
+        return True
+    creds = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    _pid, uid, _gid = struct.unpack("3i", creds)
+    return uid == os.getuid()
+
+
+def _reset_state() -> None:
+    """Forget state that belongs to the previous command."""
+    from aigit import cache, metrics
+    from aigit.config import invalidate_config
+    from aigit.services import git, ratelimit
+
+    invalidate_config()
+    cache.enable()
+    git.clear_memo()
+    metrics.reset()
+    ratelimit.reset_stats()
+
+
+def _refresh_consoles() -> None:
+    """Re-create module-level rich consoles for the current streams.
+
+    A Console decides on color and terminal features when it's created, so
+    the ones made for the previous client (or the daemon itself) won't do.
+    """
+    from rich.console import Console
+
+    for name, module in list(sys.modules.items()):
+        if not name.startswith("aigit.") or module is None:
+            continue
+        for attr, value in list(vars(module).items()):
+            if isinstance(value, Console):
+                setattr(module, attr, Console(stderr=value.stderr))
+
+
+def run_command(request: dict, reply, watch: _DisconnectWatch = None) -> int:
+    """Run one command with the client's directory, environment and streams.
+
+    If `watch` is given, the command is interrupted when the client disconnects.
+    """
+    from aigit import cli
+
+    saved_cwd, saved_env = os.getcwd(), dict(os.environ)
+    saved_streams = sys.stdin, sys.stdout, sys.stderr
+    tty = request.get("tty", {})
+    code = 0
+
+    try:
+        os.chdir(request["cwd"])
+        os.environ.clear()
+        os.environ.update(request["env"])
+        sys.stdin = io.StringIO()
+        sys.stdout = _ClientStream(reply, "out", bool(tty.get("stdout")))
+        sys.stderr = _ClientStream(reply, "err", bool(tty.get("stderr")))
+        _reset_state()
+        _refresh_consoles()
+
+        try:
+            with watch or contextlib.nullcontext():
+                cli.app(args=request["argv"], prog_name="aigit")
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except KeyboardInterrupt:
+            code = 130
+        except Exception:
+            sys.stderr.write(traceback.format_exc())
+            code = 1
+
+        # What a standalone run reports at exit
+        cli.report_run()
+        # Nothing of this command may be reported again at the daemon's exit
+        _reset_state()
+    except OSError:
+        # The client went away mid-command
+        code = 1
+    finally:
+        sys.stdin, sys.stdout, sys.stderr = saved_streams
+        os.environ.clear()
+        os.environ.update(saved_env)
+        os.chdir(saved_cwd)
+    return code
+
+
+def _warm_up() -> None:
+    """Import the command modules and their libraries before the first request."""
+    import importlib
+
+    from aigit import cli
+
+    # Each command reports when it finishes, not at exit
+    cli._reporting_at_exit = True
+    for module_name, _func, _help in cli.COMMANDS.values():
+        importlib.import_module(module_name)
+    for module_name in ("aigit.services.ai", "aigit.services.github", "aigit.services.git"):
+        importlib.import_module(module_name)
+
+
+def _watch_idle(server: _Server) -> None:
+    while True:
+        time.sleep(min(server.idle_timeout, 30))
+        idle = time.monotonic() - server.last_active
+        if idle >= server.idle_timeout and not server.run_lock.locked():
+            server.stop()
+            return
+
+
+def request(message: dict, path: str = None, timeout: float = 5.0) -> dict | None:
+    """Send a status or stop request to the daemon; None if it isn't running."""
+    sock = connect(path, timeout)
+    if sock is None:
+        return None
+    with sock, sock.makefile("r", encoding="utf-8") as replies:
+        send(sock, message)
+        line = replies.readline()
+    return json.loads(line) if line else None
+
+
+def serve(path: str = None, idle_timeout: float = 0) -> None:
+    """Listen for commands until stopped, or idle for idle_timeout seconds (0: never)."""
+    path = path or get_socket_path()
+    if request({"op": "status"}, path) is not None:
+        raise ValueError(f"A daemon is already listening on {path}")
+
+    # A leftover socket from a daemon that didn't shut down cleanly
+    if os.path.exists(path):
+        os.unlink(path)
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+
+    _warm_up()
+    old_umask = os.umask(0o177)
+    try:
+        server = _Server(path, idle_timeout)
+    finally:
+        os.umask(old_umask)
+
+    for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+        signal.signal(signum, lambda *_: server.stop())
+    if idle_timeout > 0:
+        threading.Thread(target=_watch_idle, args=(server,), daemon=True).start()
+
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def main() -> None:
+    """Entry point of the detached process started by `aigit serve --detach`."""
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="aigit-daemon")
+    parser.add_argument("--socket")
+    parser.add_argument("--idle-timeout", type=float, default=0)
+    options = parser.parse_args()
+    serve(options.socket, options.idle_timeout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,588 @@
+"""Diff parsing and token-budgeted compaction for aigit."""
+
+import heapq
+import re
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from fnmatch import fnmatch
+
+from aigit.tokens import count_tokens, truncate_to_tokens
+
+HUNK_HEADER_RE = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@(.*)$")
+DIFF_HEADER_RE = re.compile(r"^diff --git a/(.*) b/(.*)$")
+
+# Git quotes paths with special or (by default) non-ASCII characters C-style
+QUOTED_PATH = r'"(?:[^"\\]|\\.)*"'
+QUOTED_HEADER_RE = re.compile(rf"^diff --git ({QUOTED_PATH}|a/\S+) ({QUOTED_PATH}|b/\S+)$")
+C_ESCAPES = {"a": 7, "b": 8, "t": 9, "n": 10, "v": 11, "f": 12, "r": 13, '"': 34, "\\": 92}
+
+# Files that carry little signal for the model, dropped first when over budget
+GENERATED_PATTERNS = [
+    "*.lock",
+    "package-lock.json",
+    "npm-shrinkwrap.json",
+    "pnpm-lock.yaml",
+    "go.sum",
+    "*.min.js",
+    "*.min.css",
+    "*.map",
+    "*_pb2.py",
+    "*_pb2_grpc.py",
+    "*.pb.go",
+    "*.snap",
+    "*/__snapshots__/*",
+    "vendor/*",
+    "*/vendor/*",
+    "node_modules/*",
+    "dist/*",
+    "build/*",
+]
+
+DATA_PATTERNS = ["*.json", "*.csv", "*.tsv", "*.svg", "*.xml", "*.txt", "*.ipynb"]
+
+DOC_PATTERNS = ["*.md", "*.rst", "*.adoc"]
+
+# Context line counts tried, in order, when shrinking hunks
+CONTEXT_STEPS = (3, 1, 0)
+
+TRUNCATION_MARKER = "\n[... diff truncated to fit token budget ...]"
+
+
+@dataclass
+class Hunk:
+    """A single hunk of a file diff."""
+
+    header: str
+    lines: list[str] = field(default_factory=list)
+
+    @property
+    def additions(self) -> int:
+        return sum(1 for line in self.lines if line.startswith("+"))
+
+    @property
+    def deletions(self) -> int:
+        return sum(1 for line in self.lines if line.startswith("-"))
+
+    def render(self) -> str:
+        return "\n".join([self.header, *self.lines])
+
+
+@dataclass
+class FileDiff:
+    """The diff of a single file: git headers plus hunks."""
+
+    path: str
+    old_path: str
+    header: list[str] = field(default_factory=list)
+    hunks: list[Hunk] = field(default_factory=list)
+    summary: str = None
+    # Set when the reader stopped keeping lines; counts cover the lines not kept
+    truncated: bool = False
+    omitted_additions: int = 0
+    omitted_deletions: int = 0
+
+    @property
+    def is_binary(self) -> bool:
+        return any(
+            line.startswith("Binary files ") or line == "GIT binary patch"
+            for line in self.header
+        )
+
+    @property
+    def is_rename(self) -> bool:
+        return any(line.startswith("rename from ") for line in self.header)
+
+    @property
+    def is_new(self) -> bool:
+        return any(line.startswith("new file mode") for line in self.header)
+
+    @property
+    def is_deleted(self) -> bool:
+        return any(line.startswith("deleted file mode") for line in self.header)
+
+    @property
+    def additions(self) -> int:
+        return sum(hunk.additions for hunk in self.hunks) + self.omitted_additions
+
+    @property
+    def deletions(self) -> int:
+        return sum(hunk.deletions for hunk in self.hunks) + self.omitted_deletions
+
+    def size(self) -> int:
+        """Length of the rendered diff in characters, without rendering it."""
+        if self.summary is not None:
+            return len(self.summary)
+        return sum(len(line) + 1 for line in self.header) + sum(
+            len(hunk.header) + 1 + sum(len(line) + 1 for line in hunk.lines) for hunk in self.hunks
+        )
+
+    def stat(self) -> str:
+        """One-line description of the file change."""
+        return f"{self.path} (+{self.additions} -{self.deletions})"
+
+    def render(self) -> str:
+        if self.summary is not None:
+            return self.summary
+        return "\n".join([*self.header, *(hunk.render() for hunk in self.hunks)])
+
+
+def unquote_path(path: str) -> str:
+    """Undo git's C-style quoting of a path, e.g. "caf\\303\\251.py" -> café.py."""
+    if len(path) < 2 or not (path.startswith('"') and path.endswith('"')):
+        return path
+
+    data = bytearray()
+    text = path[1:-1]
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if char != "\\" or i + 1 == len(text):
+            data += char.encode("utf-8")
+            i += 1
+        elif text[i + 1] in "01234567":
+            octal = re.match(r"[0-7]{1,3}", text[i + 1 :]).group()
+            data.append(int(octal, 8) & 0xFF)
+            i += 1 + len(octal)
+        else:
+            data.append(C_ESCAPES.get(text[i + 1], ord(text[i + 1])))
+            i += 2
+    return data.decode("utf-8", "surrogateescape")
+
+
+def parse_diff_header(line: str) -> tuple[str, str] | None:
+    """Get (old path, new path) from a `diff --git` line, or None if it isn't one."""
+    if '"' in line:
+        match = QUOTED_HEADER_RE.match(line)
+        if match:
+            return unquote_path(match.group(1))[2:], unquote_path(match.group(2))[2:]
+    match = DIFF_HEADER_RE.match(line)
+    return match.groups() if match else None
+
+
+def _header_path(value: str, prefix: str = "") -> str:
+    """A path from a ---/+++/rename line, unquoted and without its a/ or b/ prefix."""
+    # Git ends ---/+++ paths containing spaces with a tab; a real one would be quoted
+    path = unquote_path(value.removesuffix("\t"))
+    return path[len(prefix):] if prefix and path.startswith(prefix) else path
+
+
+def iter_file_diffs(lines, max_file_chars: int = None):
+    """Parse diff lines into FileDiff records, yielding each file as it completes.
+
+    `lines` may be any iterable, such as a subprocess pipe, so only one
+    file is held at a time. Past max_file_chars, a file's remaining hunk
+    lines are only counted, and the file is marked truncated.
+    """
+    current = None
+    hunk = None
+    kept = 0
+    lines = iter(lines)
+
+    for line in lines:
+        line = line.rstrip("\n")
+
+        if line.startswith("diff --git "):
+            paths = parse_diff_header(line)
+            if paths:
+                if current is not None:
+                    yield current
+                current = FileDiff(path=paths[1], old_path=paths[0], header=[line])
+                hunk = None
+                kept = len(line) + 1
+                continue
+
+        if current is None:
+            continue
+
+        if line.startswith("@@"):
+            hunk = Hunk(header=line)
+            current.hunks.append(hunk)
+        elif hunk is not None:
+            hunk.lines.append(line)
+        else:
+            current.header.append(line)
+            if line.startswith(("+++ b/", '+++ "b/')):
+                current.path = _header_path(line[4:], "b/")
+            elif line.startswith(("--- a/", '--- "a/')):
+                current.old_path = _header_path(line[4:], "a/")
+            elif line.startswith("rename to "):
+                current.path = _header_path(line[10:])
+            elif line.startswith("rename from "):
+                current.old_path = _header_path(line[12:])
+
+        if max_file_chars:
+            kept += len(line) + 1
+            if kept <= max_file_chars:
+                continue
+
+            # Count the rest of the file without keeping it, in a tight loop
+            current.truncated = True
+            additions = deletions = 0
+            paths = None
+            for line in lines:
+                first = line[:1]
+                if first == "+":
+                    additions += 1
+                elif first == "-":
+                    deletions += 1
+                elif first == "d" and line.startswith("diff --git "):
+                    line = line.rstrip("\n")
+                    paths = parse_diff_header(line)
+                    if paths:
+                        break
+            current.omitted_additions = additions
+            current.omitted_deletions = deletions
+
+            if paths:
+                yield current
+                current = FileDiff(path=paths[1], old_path=paths[0], header=[line])
+                hunk = None
+                kept = len(line) + 1
+
+    if current is not None:
+        yield current
+
+
+def parse_diff(diff: str) -> list[FileDiff]:
+    """Parse a unified git diff into per-file records."""
+    return list(iter_file_diffs(diff.split("\n")))
+
+
+def render_diff(files: Iterable[FileDiff]) -> str:
+    """Render per-file records back into diff text."""
+    return "\n".join(f.render() for f in files)
+
+
+def get_signal_rank(path: str) -> int:
+    """Rank how useful a file's diff is to the model (lower is less useful)."""
+    name = path.rsplit("/", 1)[-1]
+
+    def matches(patterns):
+        return any(fnmatch(path, p) or fnmatch(name, p) for p in patterns)
+
+    if matches(GENERATED_PATTERNS):
+        return 0
+    if matches(DATA_PATTERNS):
+        return 1
+    if matches(DOC_PATTERNS):
+        return 2
+    return 3
+
+
+def _normalize_whitespace(text: str) -> str:
+    """Collapse runs of inner whitespace and drop trailing whitespace, keeping indentation."""
+    body = text.rstrip()
+    stripped = body.lstrip()
+    return body[: len(body) - len(stripped)] + " ".join(stripped.split())
+
+
+def is_whitespace_only(hunk: Hunk) -> bool:
+    """Check whether a hunk only changes whitespace.
+
+    Lines are compared one by one with indentation kept, since it is
+    meaningful in Python or YAML; only trailing whitespace, runs of
+    inner whitespace and blank lines may differ.
+    """
+
+    def changed(sign: str) -> list[str]:
+        lines = (_normalize_whitespace(line[1:]) for line in hunk.lines if line.startswith(sign))
+        return [line for line in lines if line]
+
+    has_changes = any(line[:1] in ("+", "-") for line in hunk.lines)
+    return has_changes and changed("-") == changed("+")
+
+
+def shrink_context(hunk: Hunk, context: int) -> list[Hunk]:
+    """Trim context lines to at most `context` around each change.
+
+    Trimming can split a hunk in two, so a list of hunks with recomputed
+    headers is returned.
+    """
+    match = HUNK_HEADER_RE.match(hunk.header)
+    if not match:
+        return [hunk]
+
+    old_no, new_no = int(match.group(1)), int(match.group(3))
+    section = match.group(5)
+
+    # An empty side's start is the line before the hunk
+    if match.group(2) == "0":
+        old_no += 1
+    if match.group(4) == "0":
+        new_no += 1
+
+    changes = [i for i, line in enumerate(hunk.lines) if line[:1] in ("+", "-")]
+    if not changes:
+        return [hunk]
+
+    keep = [False] * len(hunk.lines)
+    for i in changes:
+        for j in range(max(0, i - context), min(len(hunk.lines), i + context + 1)):
+            keep[j] = True
+
+    result = []
+    group = None
+
+    for i, line in enumerate(hunk.lines):
+        if line.startswith("\\"):
+            # "\ No newline at end of file" belongs to the previous line
+            if group is not None and i > 0 and keep[i - 1]:
+                group["lines"].append(line)
+            continue
+
+        if keep[i]:
+            if group is None:
+                group = {"old": old_no, "new": new_no, "old_count": 0, "new_count": 0, "lines": []}
+                result.append(group)
+            group["lines"].append(line)
+            if not line.startswith("+"):
+                group["old_count"] += 1
+            if not line.startswith("-"):
+                group["new_count"] += 1
+        else:
+            group = None
+
+        if not line.startswith("+"):
+            old_no += 1
+        if not line.startswith("-"):
+            new_no += 1
+
+    hunks = []
+    for g in result:
+        old_start = g["old"] if g["old_count"] else g["old"] - 1
+        new_start = g["new"] if g["new_count"] else g["new"] - 1
+        header = f"@@ -{old_start},{g['old_count']} +{new_start},{g['new_count']} @@{section}"
+        hunks.append(Hunk(header=header, lines=g["lines"]))
+
+    return hunks
+
+
+def summarize_file(file: FileDiff) -> None:
+    """Replace binary files and pure renames with a one-line summary."""
+    if file.is_binary:
+        kind = "added" if file.is_new else "deleted" if file.is_deleted else "modified"
+        file.summary = f"Binary file {kind}: {file.path}"
+    elif file.is_rename and not file.hunks:
+        similarity = next(
+            (line.split(" ", 2)[-1] for line in file.header if line.startswith("similarity index ")),
+            "",
+        )
+        suffix = f" (similarity {similarity})" if similarity else ""
+        file.summary = f"Renamed: {file.old_path} -> {file.path}{suffix}"
+
+
+def collapse_whitespace_hunks(file: FileDiff) -> None:
+    """Replace whitespace-only hunks with a short marker."""
+    for hunk in file.hunks:
+        if is_whitespace_only(hunk):
+            hunk.lines = [f"\\ whitespace-only changes collapsed (+{hunk.additions} -{hunk.deletions})"]
+
+
+def _fits_bytes(text: str, max_tokens: int) -> bool:
+    # A character is at least one byte, so only short texts need encoding
+    return len(text) <= max_tokens and len(text.encode("utf-8", "surrogateescape")) <= max_tokens
+
+
+def compact_diff(diff: str, max_tokens: int, model: str = None) -> str:
+    """Compact a diff so that it fits in max_tokens.
+
+    Stages run in order and stop as soon as the diff fits: summarize binary
+    files and renames, collapse whitespace-only hunks, shrink context lines,
+    drop low-signal files, and finally hard-truncate.
+    """
+    # A token covers at least one UTF-8 byte (a character can take several
+    # tokens), so diffs with no more bytes than max_tokens always fit
+    if not diff or _fits_bytes(diff, max_tokens) or count_tokens(diff, model) <= max_tokens:
+        return diff
+
+    files = parse_diff(diff)
+    if not files:
+        return truncate_to_tokens(diff, max_tokens, model) + TRUNCATION_MARKER
+
+    return compact_files(files, max_tokens, model)
+
+
+def compact_files(files: list[FileDiff], max_tokens: int, model: str = None) -> str:
+    """Compact parsed file diffs so that their rendering fits in max_tokens."""
+
+    def fits():
+        return count_tokens(render_diff(files), model) <= max_tokens
+
+    for file in files:
+        summarize_file(file)
+        collapse_whitespace_hunks(file)
+    if fits():
+        return render_diff(files)
+
+    for context in CONTEXT_STEPS:
+        for file in files:
+            file.hunks = [h for hunk in file.hunks for h in shrink_context(hunk, context)]
+        if fits():
+            return render_diff(files)
+
+    # Drop the least useful files first, largest first within a rank
+    sizes = {id(f): count_tokens(f.render(), model) for f in files}
+    total = sum(sizes.values()) + len(files)
+
+    for file in sorted(files, key=lambda f: (get_signal_rank(f.path), -sizes[id(f)])):
+        if total <= max_tokens:
+            break
+        if file.summary is not None:
+            continue
+        file.summary = f"Omitted: {file.stat()}"
+        total += count_tokens(file.summary, model) - sizes[id(file)]
+
+    rendered = render_diff(files)
+    if count_tokens(rendered, model) <= max_tokens:
+        return rendered
+
+    marker_tokens = count_tokens(TRUNCATION_MARKER, model)
+    return truncate_to_tokens(rendered, max(max_tokens - marker_tokens, 0), model) + TRUNCATION_MARKER
+
+
+def compact_stream(files: Iterable[FileDiff], max_chars: int) -> str:
+    """Render a stream of file diffs, keeping at most max_chars of hunks in memory.
+
+    Files are consumed one at a time. Binary files and renames are
+    summarized as they arrive; whenever the kept files outgrow max_chars,
+    the least useful ones (lowest signal rank, then largest) are reduced
+    to a one-line summary, as are files the reader truncated.
+    """
+    kept: list[FileDiff] = []
+    heap = []
+    total = 0
+
+    def omit(file: FileDiff, reason: str = "Omitted") -> None:
+        file.summary = f"{reason}: {file.stat()}"
+        file.hunks = []
+
+    for seq, file in enumerate(files):
+        summarize_file(file)
+        if file.truncated and file.summary is None:
+            omit(file, "Omitted (too large)")
+        kept.append(file)
+
+        size = file.size()
+        total += size
+        if file.summary is None:
+            heapq.heappush(heap, (get_signal_rank(file.path), -size, seq, file))
+
+        while total > max_chars and heap:
+            _, negative_size, _, victim = heapq.heappop(heap)
+            omit(victim)
+            total += victim.size() + negative_size
+
+    return render_diff(kept)
+
+
+def split_hunk(hunk: Hunk, max_tokens: int, model: str = None) -> list[Hunk]:
+    """Split an oversized hunk into consecutive hunks that each fit in max_tokens."""
+    match = HUNK_HEADER_RE.match(hunk.header)
+    if not match:
+        return [hunk]
+
+    old_no, new_no = int(match.group(1)), int(match.group(3))
+    section = match.group(5)
+    if match.group(2) == "0":
+        old_no += 1
+    if match.group(4) == "0":
+        new_no += 1
+
+    hunks = []
+    lines = []
+    used = 0
+    start = (old_no, new_no)
+
+    def flush():
+        old_count = sum(1 for line in lines if line[:1] in (" ", "-"))
+        new_count = sum(1 for line in lines if line[:1] in (" ", "+"))
+        old_start = start[0] if old_count else start[0] - 1
+        new_start = start[1] if new_count else start[1] - 1
+        header = f"@@ -{old_start},{old_count} +{new_start},{new_count} @@{section}"
+        hunks.append(Hunk(header=header, lines=lines))
+
+    for line in hunk.lines:
+        size = count_tokens(line, model) + 1
+        if lines and used + size > max_tokens and not line.startswith("\\"):
+            flush()
+            lines, used, start = [], 0, (old_no, new_no)
+        lines.append(line)
+        used += size
+        if line[:1] in (" ", "-"):
+            old_no += 1
+        if line[:1] in (" ", "+"):
+            new_no += 1
+
+    if lines:
+        flush()
+
+    return hunks
+
+
+def split_file(file: FileDiff, max_tokens: int, model: str = None) -> list[FileDiff]:
+    """Split a file diff into pieces of hunks that each fit in max_tokens."""
+    header_tokens = count_tokens("\n".join(file.header), model)
+    hunk_budget = max(max_tokens - header_tokens - 16, 1)
+    pieces = []
+    current = None
+    used = 0
+
+    hunks = []
+    for hunk in file.hunks:
+        if count_tokens(hunk.render(), model) > hunk_budget:
+            hunks.extend(split_hunk(hunk, hunk_budget, model))
+        else:
+            hunks.append(hunk)
+
+    for hunk in hunks:
+        size = count_tokens(hunk.render(), model)
+        if current is None or used + size > max_tokens:
+            current = FileDiff(path=file.path, old_path=file.old_path, header=file.header)
+            pieces.append(current)
+            used = header_tokens
+        current.hunks.append(hunk)
+        used += size
+
+    return pieces or [file]
+
+
+def pack_files(files: list[FileDiff], max_tokens: int, model: str = None) -> list[list[FileDiff]]:
+    """Pack file diffs into groups whose rendering fits in max_tokens.
+
+    Files are packed together while they fit; a file too big on its own is
+    split by hunks, and any piece still over budget is compacted.
+    """
+    groups = []
+    current = []
+    used = 0
+
+    for file in files:
+        size = count_tokens(file.render(), model)
+        pieces = [file] if size <= max_tokens else split_file(file, max_tokens, model)
+
+        for piece in pieces:
+            if piece is not file:
+                size = count_tokens(piece.render(), model)
+            if current and used + size > max_tokens:
+                groups.append(current)
+                current, used = [], 0
+            if size > max_tokens:
+                compacted = compact_files([piece], max_tokens, model)
+                groups.append([FileDiff(path=piece.path, old_path=piece.old_path, summary=compacted)])
+                continue
+            current.append(piece)
+            used += size + 1
+
+    if current:
+        groups.append(current)
+
+    return groups
+
+
+def chunk_diff(diff: str, max_tokens: int, model: str = None) -> list[str]:
+    """Split a diff into chunks of whole files (or hunk groups) under max_tokens."""
+    files = parse_diff(diff)
+    if not files:
+        return [compact_diff(diff, max_tokens, model)] if diff else []
+
+    return [render_diff(group) for group in pack_files(files, max_tokens, model)]
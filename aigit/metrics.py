@@ -0,0 +1,382 @@
+"""Instrumentation of git work, prompt building and AI requests.
+
+Every AI request records its prompt size, token usage, time to first
+token, latency, cache hit or miss and estimated cost. Token counts come
+from the response's `usage` when the backend reports it, and are counted
+locally otherwise. `aigit --stats` prints a summary when the command
+finishes; the `metrics_file` config key appends the run to a JSON Lines
+file, and `otel` exports it as OpenTelemetry spans.
+"""
+
+import contextvars
+import functools
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from aigit.config import get_config
+
+# Requests listed individually by --stats; the rest are only totalled
+MAX_STATS_ROWS = 20
+
+
+@dataclass
+class CallMetrics:
+    """Measurements for one AI request."""
+
+    kind: str
+    provider: str
+    model: str
+    prompt_chars: int = 0
+    cache: str = "none"
+    input_tokens: int | None = None
+    output_tokens: int | None = None
+    # False when token counts were estimated locally
+    usage_reported: bool = False
+    first_token: float | None = None
+    latency: float = 0.0
+    cost: float | None = None
+    error: str | None = None
+    started_at: float = field(default_factory=time.time)
+    _start: float = field(default_factory=time.perf_counter, repr=False)
+    _prompt: str = field(default="", repr=False)
+    _output: str = field(default="", repr=False)
+
+    def mark_first_token(self) -> None:
+        if self.first_token is None:
+            self.first_token = time.perf_counter() - self._start
+
+    def set_output(self, text: str) -> None:
+        self._output = text
+
+    def to_dict(self) -> dict:
+        return {key: value for key, value in asdict(self).items() if not key.startswith("_")}
+
+
+@dataclass
+class PhaseTiming:
+    """One timed stretch of non-AI work, such as reading a diff."""
+
+    name: str
+    started_at: float
+    duration: float
+
+
+_lock = threading.Lock()
+_local = threading.local()
+_current: contextvars.ContextVar = contextvars.ContextVar("aigit_call", default=None)
+
+_calls: list[CallMetrics] = []
+_phases: list[PhaseTiming] = []
+_run_id = uuid.uuid4().hex[:12]
+_run_started = time.time()
+_command: str | None = None
+_show_stats = False
+
+
+def start_run(command: str = None, show_stats: bool = False) -> None:
+    """Name the command being measured and whether to print stats at the end."""
+    global _command, _show_stats
+    _command = command
+    _show_stats = show_stats or bool(get_config("stats"))
+
+
+def reset() -> None:
+    """Discard everything recorded so far and start a new run."""
+    global _run_id, _run_started, _command, _show_stats
+    with _lock:
+        _calls.clear()
+        _phases.clear()
+    _run_id = uuid.uuid4().hex[:12]
+    _run_started = time.time()
+    _command = None
+    _show_stats = False
+
+
+def is_enabled() -> bool:
+    """Check whether anything will consume the metrics of this run."""
+    return _show_stats or bool(get_config("metrics_file")) or bool(get_config("otel"))
+
+
+def timed(phase: str):
+    """Decorator adding a function's wall time to a phase.
+
+    Only the outermost timed call of a phase in each thread is counted,
+    so nested helpers aren't counted twice.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            active = _local.__dict__.setdefault("phases", set())
+            if phase in active:
+                return func(*args, **kwargs)
+
+            active.add(phase)
+            started_at, start = time.time(), time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                active.discard(phase)
+                timing = PhaseTiming(phase, started_at, time.perf_counter() - start)
+                with _lock:
+                    _phases.append(timing)
+
+        return wrapper
+
+    return decorator
+
+
+@contextmanager
+def track(kind: str, provider: str, model: str, prompt: str):
+    """Measure one AI request made inside the block.
+
+    Providers report the response's token usage with observe_usage().
+    """
+    call = CallMetrics(kind=kind, provider=provider, model=model, prompt_chars=len(prompt), _prompt=prompt)
+    token = _current.set(call)
+    try:
+        yield call
+    except BaseException as e:
+        call.error = type(e).__name__
+        raise
+    finally:
+        try:
+            _current.reset(token)
+        except ValueError:
+            pass  # A generator finalized outside the context it started in
+        call.latency = time.perf_counter() - call._start
+        _finish(call)
+
+
+def observe_usage(usage) -> None:
+    """Record token usage reported by the API for the current request."""
+    call = _current.get()
+    if call is None or usage is None:
+        return
+    call.input_tokens = getattr(usage, "prompt_tokens", None)
+    call.output_tokens = getattr(usage, "completion_tokens", None) or 0
+    call.usage_reported = True
+
+
+def _finish(call: CallMetrics) -> None:
+    if is_enabled() and call.cache != "hit":
+        from aigit.tokens import count_tokens, estimate_cost
+
+        if not call.usage_reported:
+            call.input_tokens = count_tokens(call._prompt, call.model)
+            call.output_tokens = count_tokens(call._output, call.model)
+        if call.provider == "openai":
+            call.cost = estimate_cost(call.model, call.input_tokens or 0, call.output_tokens or 0)
+    elif call.cache == "hit":
+        call.cost = 0.0
+
+    call._prompt = call._output = ""
+    with _lock:
+        _calls.append(call)
+
+
+def get_calls() -> list[CallMetrics]:
+    with _lock:
+        return list(_calls)
+
+
+def phase_totals() -> dict[str, float]:
+    """Seconds spent per phase, summed across threads."""
+    totals: dict[str, float] = {}
+    with _lock:
+        for phase in _phases:
+            totals[phase.name] = totals.get(phase.name, 0.0) + phase.duration
+    return totals
+
+
+def _repo_root() -> str:
+    path = Path.cwd()
+    for directory in (path, *path.parents):
+        if (directory / ".git").exists():
+            return str(directory)
+    return str(path)
+
+
+def summary() -> dict:
+    """Totals for this run, as written to the metrics file."""
+    calls = get_calls()
+    costs = [call.cost for call in calls if call.cost is not None]
+    return {
+        "type": "run",
+        "run": _run_id,
+        "command": _command,
+        "repo": _repo_root(),
+        "started_at": _run_started,
+        "duration": time.time() - _run_started,
+        "phases": phase_totals(),
+        "requests": len(calls),
+        "cache_hits": sum(call.cache == "hit" for call in calls),
+        "input_tokens": sum(call.input_tokens or 0 for call in calls),
+        "output_tokens": sum(call.output_tokens or 0 for call in calls),
+        "cost": sum(costs) if costs else None,
+    }
+
+
+def write_jsonl(path: str) -> None:
+    """Append this run's requests and totals to a JSON Lines file."""
+    path = Path(path).expanduser()
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    run = summary()
+    lines = [
+        {"type": "request", "run": _run_id, "command": _command, "repo": run["repo"], **call.to_dict()}
+        for call in get_calls()
+    ]
+    lines.append(run)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("".join(json.dumps(line) + "\n" for line in lines))
+
+
+def export_spans() -> None:
+    """Export this run as OpenTelemetry spans, if opentelemetry is installed.
+
+    Uses the tracer provider the host application configured. Otherwise
+    spans go to an OTLP/HTTP exporter (configured with the standard
+    OTEL_EXPORTER_OTLP_* variables) when the SDK and exporter are installed.
+    """
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        return
+
+    provider = trace.get_tracer_provider()
+    owned = False
+    if not hasattr(provider, "force_flush"):
+        # The API's default provider drops spans; set up the SDK if present
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+            from opentelemetry.sdk.resources import Resource
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        except ImportError:
+            return
+        provider = TracerProvider(resource=Resource.create({"service.name": "aigit"}))
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+        owned = True
+
+    def ns(seconds: float) -> int:
+        return int(seconds * 1e9)
+
+    tracer = provider.get_tracer("aigit")
+    run = summary()
+    root = tracer.start_span(
+        f"aigit {_command or ''}".strip(),
+        start_time=ns(_run_started),
+        attributes={"aigit.repo": run["repo"], "aigit.run": _run_id},
+    )
+    context = trace.set_span_in_context(root)
+
+    with _lock:
+        phases = list(_phases)
+    for phase in phases:
+        span = tracer.start_span(f"aigit.{phase.name}", context=context, start_time=ns(phase.started_at))
+        span.end(end_time=ns(phase.started_at + phase.duration))
+
+    for call in get_calls():
+        attributes = {
+            "gen_ai.system": call.provider,
+            "gen_ai.request.model": call.model,
+            "gen_ai.usage.input_tokens": call.input_tokens or 0,
+            "gen_ai.usage.output_tokens": call.output_tokens or 0,
+            "aigit.prompt_chars": call.prompt_chars,
+            "aigit.cache": call.cache,
+            "aigit.usage_reported": call.usage_reported,
+        }
+        if call.first_token is not None:
+            attributes["aigit.time_to_first_token"] = call.first_token
+        if call.cost is not None:
+            attributes["aigit.cost_usd"] = call.cost
+        if call.error:
+            attributes["error.type"] = call.error
+
+        span = tracer.start_span(f"ai.{call.kind}", context=context, start_time=ns(call.started_at), attributes=attributes)
+        if call.error:
+            span.set_status(trace.Status(trace.StatusCode.ERROR))
+        span.end(end_time=ns(call.started_at + call.latency))
+
+    root.end()
+    if owned:
+        provider.shutdown()
+    else:
+        provider.force_flush()
+
+
+def print_stats() -> None:
+    """Print per-request metrics and phase timings to stderr."""
+    from rich.console import Console
+    from rich.table import Table
+
+    console = Console(stderr=True)
+    calls = get_calls()
+    run = summary()
+
+    if calls:
+        table = Table(title="aigit stats", show_footer=len(calls) > 1)
+        table.add_column("Request", footer="Total")
+        table.add_column("Model")
+        table.add_column("Cache", footer=f"{run['cache_hits']} hits")
+        table.add_column("Prompt", justify="right")
+        table.add_column("In", justify="right", footer=f"{run['input_tokens']:,}")
+        table.add_column("Out", justify="right", footer=f"{run['output_tokens']:,}")
+        table.add_column("First token", justify="right")
+        table.add_column("Latency", justify="right")
+        table.add_column("Cost", justify="right", footer=_format_cost(run["cost"]))
+
+        for call in calls[:MAX_STATS_ROWS]:
+            estimated = "" if call.usage_reported or call.input_tokens is None else "~"
+            table.add_row(
+                call.kind + (f" [red]({call.error})[/red]" if call.error else ""),
+                call.model,
+                call.cache,
+                f"{call.prompt_chars:,} ch",
+                "-" if call.input_tokens is None else f"{estimated}{call.input_tokens:,}",
+                "-" if call.output_tokens is None else f"{estimated}{call.output_tokens:,}",
+                "-" if call.first_token is None else f"{call.first_token:.2f}s",
+                f"{call.latency:.2f}s",
+                _format_cost(call.cost),
+            )
+        if len(calls) > MAX_STATS_ROWS:
+            table.add_row(f"[dim]... {len(calls) - MAX_STATS_ROWS} more[/dim]")
+        console.print(table)
+
+    phases = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in run["phases"].items())
+    console.print(f"[dim]Time: {phases + ', ' if phases else ''}total {run['duration']:.2f}s[/dim]")
+    if any(not call.usage_reported and call.input_tokens is not None for call in calls):
+        console.print("[dim]~ token counts estimated locally[/dim]")
+
+
+def _format_cost(cost: float | None) -> str:
+    return "-" if cost is None else f"${cost:.4f}"
+
+
+def report() -> None:
+    """Emit this run's metrics to every configured destination."""
+    if not is_enabled() or not (_calls or _phases):
+        return
+
+    if _show_stats:
+        print_stats()
+
+    path = get_config("metrics_file")
+    if path:
+        try:
+            write_jsonl(path)
+        except OSError:
+            pass
+
+    if get_config("otel"):
+        try:
+            export_spans()
+        except Exception:
+            # Telemetry never fails the command
+            pass
@@ -1,5 +1,9 @@
 """AI prompt templates for aigit."""
 
+from aigit import metrics
+from aigit.diff import FileDiff, compact_diff
+from aigit.tokens import count_tokens, get_diff_budget
+
 COMMIT_MESSAGE_PROMPT = """You are an expert at writing clear, concise git commit messages.
 
 Analyze the following git diff and generate a commit message.
@@ -30,6 +34,24 @@ CONVENTIONAL_COMMITS_INSTRUCTION = """Use Conventional Commits format:
 - test: adding tests
 - chore: maintenance"""
 
+SPLIT_COMMIT_PROMPT = """You are an expert at writing clear, concise git commit messages.
+
+The staged changes below are being split into {count} separate commits, one per group. Write a commit message for each group.
+
+{conventional_commits_instruction}
+
+Rules:
+- First line: Brief summary (50 chars max, imperative mood)
+- If needed, add blank line then detailed body
+- Describe only the changes in that group
+- Be specific, avoid vague words like "update", "fix", "change"
+
+{groups}
+
+{hint_instruction}
+
+Respond with ONLY the commit messages, each after its marker line exactly as shown (=== Commit 1 ===, === Commit 2 ===, ...), no explanations or markdown."""
+
 BRANCH_NAME_PROMPT = """You are an expert at creating clear, descriptive git branch names.
 
 {context}
@@ -41,7 +63,8 @@ Rules:
 - Keep it short but descriptive (max 50 chars total)
 - No special characters except hyphens and slashes
 
-Respond with ONLY the branch name, no explanations."""
+Respond with ONLY a JSON object, no explanations:
+{{"name": "type/short-description"}}"""
 
 PR_PROMPT = """You are an expert at writing clear, comprehensive pull request descriptions.
 
@@ -54,7 +77,7 @@ Git diff:
 ```
 {diff}
 ```
-
+{related}
 Files changed: {files_changed}
 
 Generate a PR with:
@@ -64,32 +87,58 @@ Generate a PR with:
    - Key modifications
    - Any breaking changes or important notes
 
-Respond in this exact format:
-TITLE: <title here>
-DESCRIPTION:
-<description here>"""
+Respond with ONLY a JSON object, no other text:
+{{"title": "<title>", "description": "<description in Markdown>"}}"""
+
+PR_TOOLS_PROMPT = """You are an expert at writing clear, comprehensive pull request descriptions.
+
+Generate a PR title and description for the branch below. Only the changed
+files and the commit subjects are shown here. Call get_file_diff to read the
+diff of a file when you need it to understand the change. Read only what you
+need: start with the files with the most changes, and skip files whose role
+is clear from their path and the commits.
+
+Base branch: {base_branch}
+Current branch: {current_branch}
+
+Commits:
+{commits}
+
+Changed files (lines added, lines deleted, path; - for binary):
+{stats}
+
+Generate a PR with:
+1. A clear, concise title (max 72 chars)
+2. A detailed description including:
+   - Summary of changes
+   - Key modifications
+   - Any breaking changes or important notes
+
+When you are done reading, respond with ONLY a JSON object, no other text:
+{{"title": "<title>", "description": "<description in Markdown>"}}"""
 
-REVIEW_PROMPT = """You are an expert code reviewer. Review the following git diff for:
+FILE_REVIEW_PROMPT = """You are an expert code reviewer. Review the following git diff for:
 
 1. **Bugs**: Logic errors, edge cases, potential runtime errors
 2. **Security**: Vulnerabilities, unsafe practices, exposed secrets
 3. **Style**: Code quality, readability, maintainability
 4. **Performance**: Inefficiencies, potential bottlenecks
 
+Files in this diff: {files}
+
 Git diff:
 ```
 {diff}
 ```
+{related}
+Respond with ONLY a JSON object, no other text:
+{{"findings": [{{"severity": "WARNING", "path": "path/to/file", "line": 42, "issue": "...", "suggestion": "..."}}]}}
 
-For each issue found, provide:
-- Severity: CRITICAL / WARNING / INFO
-- Location: File and approximate line
-- Issue: Clear description
-- Suggestion: How to fix it
-
-If the code looks good, say so briefly.
+- severity is one of CRITICAL, WARNING, INFO
+- path is one of the files above
+- line is the line number in the new version of the file, or null
 
-Be concise and actionable. Focus on the most important issues."""
+If there are no issues, respond with: {{"findings": []}}"""
 
 EXPLAIN_PROMPT = """You are an expert at explaining code changes in plain English.
 
@@ -101,6 +150,79 @@ Git diff:
 ```
 {diff}
 ```
+{related}
+Provide your response in this EXACT format:
+
+## Summary
+[2-3 sentence overview of what functionality was added/changed/fixed]
+
+## Key Changes
+- [bullet point of important change 1]
+- [bullet point of important change 2]
+- [bullet point of important change 3]
+[max 3-4 key points]
+
+Keep it SHORT and focused on WHAT was done, not HOW it was implemented. Do NOT list files."""
+
+CHUNK_SUMMARY_PROMPT = """You are an expert at summarizing code changes.
+
+This is part {index} of {total} of a larger git diff.
+{context}
+
+Git diff:
+```
+{diff}
+```
+
+Summarize what changed in this part as concise bullet points.
+- Mention the files and the behavior that changed
+- Note any breaking changes or risky modifications
+- Do NOT speculate about parts of the diff you cannot see
+
+Respond with ONLY the bullet points."""
+
+COMBINE_SUMMARIES_PROMPT = """You are an expert at summarizing code changes.
+
+Merge the following summaries of parts of one git diff into a single
+summary. Keep every distinct change, remove duplicates, and stay concise.
+
+{summaries}
+
+Respond with ONLY the merged bullet points."""
+
+PR_REDUCE_PROMPT = """You are an expert at writing clear, comprehensive pull request descriptions.
+
+The diff for this branch was too large to read at once, so it was
+summarized in parts. Use the part summaries below to generate a PR title
+and description.
+
+Base branch: {base_branch}
+Current branch: {current_branch}
+
+Summaries of the changes:
+{summaries}
+
+Files changed: {files_changed}
+
+Generate a PR with:
+1. A clear, concise title (max 72 chars)
+2. A detailed description including:
+   - Summary of changes
+   - Key modifications
+   - Any breaking changes or important notes
+
+Respond with ONLY a JSON object, no other text:
+{{"title": "<title>", "description": "<description in Markdown>"}}"""
+
+EXPLAIN_REDUCE_PROMPT = """You are an expert at explaining code changes in plain English.
+
+The diff was too large to read at once, so it was summarized in parts.
+Use the part summaries below to provide a brief, structured explanation.
+
+{context}
+
+Summaries of the changes:
+{summaries}
 
 Provide your response in this EXACT format:
 
@@ -116,52 +238,186 @@ Provide your response in this EXACT format:
 Keep it SHORT and focused on WHAT was done, not HOW it was implemented. Do NOT list files."""
 
 
+RELATED_CODE_INSTRUCTION = """
+Related code elsewhere in the repository (for reference only, not part of this change):
+
+{related}
+"""
+
+
+def fit_diff(diff: str, related: str = None) -> str:
+    """Compact a diff to the configured model's token budget, minus any related code."""
+    return compact_diff(diff, max(get_diff_budget() - count_tokens(related or ""), 256))
+
+
+def format_related(related: str = None) -> str:
+    """Format retrieved related code for a prompt, or nothing."""
+    return RELATED_CODE_INSTRUCTION.format(related=related) if related else ""
+
+
+def format_files_changed(files_changed: list[str], limit: int = 200) -> str:
+    """Format the changed file list, capped so huge branches stay bounded."""
+    if len(files_changed) <= limit:
+        return ", ".join(files_changed)
+    shown = ", ".join(files_changed[:limit])
+    return f"{shown} (and {len(files_changed) - limit} more)"
+
+
+def format_summaries(summaries: list[str]) -> str:
+    """Format part summaries for a reduce prompt."""
+    return "\n\n".join(f"Part {i}:\n{summary}" for i, summary in enumerate(summaries, 1))
+
+
+def format_numstat(files: list[FileDiff], limit: int = 300) -> str:
+    """List file diffs like `git diff --numstat`, capped so huge branches stay bounded."""
+    lines = []
+    for file in files[:limit]:
+        if file.summary is not None:
+            lines.append(f"-\t-\t{file.summary}")
+        elif file.is_binary:
+            lines.append(f"-\t-\t{file.path}")
+        else:
+            lines.append(f"{file.additions}\t{file.deletions}\t{file.path}")
+    if len(files) > limit:
+        lines.append(f"(and {len(files) - limit} more)")
+    return "\n".join(lines)
+
+
+@metrics.timed("prompt")
 def get_commit_prompt(diff: str, conventional: bool = True, hint: str = None) -> str:
     """Generate commit message prompt."""
     conventional_instruction = CONVENTIONAL_COMMITS_INSTRUCTION if conventional else ""
     hint_instruction = f"Additional context from user: {hint}" if hint else ""
 
     return COMMIT_MESSAGE_PROMPT.format(
-        diff=diff,
+        diff=fit_diff(diff),
         conventional_commits_instruction=conventional_instruction,
         hint_instruction=hint_instruction,
     )
 
 
+@metrics.timed("prompt")
+def get_split_commit_prompt(diffs: list[str], conventional: bool = True, hint: str = None) -> str:
+    """Generate the prompt naming every group of a split commit at once."""
+    conventional_instruction = CONVENTIONAL_COMMITS_INSTRUCTION if conventional else ""
+    hint_instruction = f"Additional context from user: {hint}" if hint else ""
+
+    # The groups share the diff budget
+    share = max(get_diff_budget() // max(len(diffs), 1), 256)
+    groups = "\n\n".join(
+        f"=== Commit {i} ===\n```\n{compact_diff(diff, share)}\n```" for i, diff in enumerate(diffs, 1)
+    )
+
+    return SPLIT_COMMIT_PROMPT.format(
+        count=len(diffs),
+        groups=groups,
+        conventional_commits_instruction=conventional_instruction,
+        hint_instruction=hint_instruction,
+    )
+
+
+@metrics.timed("prompt")
 def get_branch_prompt(diff: str = None, description: str = None) -> str:
     """Generate branch name prompt."""
     if description:
         context = f"Create a branch name for this task:\n{description}"
     elif diff:
-        context = f"Create a branch name based on these changes:\n```\n{diff}\n```"
+        context = f"Create a branch name based on these changes:\n```\n{fit_diff(diff)}\n```"
     else:
         context = "Create a branch name for a new feature."
 
     return BRANCH_NAME_PROMPT.format(context=context)
 
 
+@metrics.timed("prompt")
 def get_pr_prompt(
     diff: str,
     base_branch: str,
     current_branch: str,
     files_changed: list[str],
+    related: str = None,
 ) -> str:
     """Generate PR prompt."""
     return PR_PROMPT.format(
-        diff=diff,
+        diff=fit_diff(diff, related),
+        related=format_related(related),
+        base_branch=base_branch,
+        current_branch=current_branch,
+        files_changed=format_files_changed(files_changed),
+    )
+
+
+@metrics.timed("prompt")
+def get_pr_tools_prompt(
+    files: list[FileDiff],
+    commits: list[str],
+    base_branch: str,
+    current_branch: str,
+) -> str:
+    """Generate the PR prompt for tool-calling mode: file stats and commit subjects, no diff."""
+    # The most changed files first, as the model is told to read those first
+    files = sorted(files, key=lambda f: f.additions + f.deletions, reverse=True)
+    shown = commits[-50:]
+    commit_lines = [f"- {subject}" for subject in shown]
+    if len(commits) > len(shown):
+        commit_lines.insert(0, f"(first {len(commits) - len(shown)} commits omitted)")
+
+    return PR_TOOLS_PROMPT.format(
         base_branch=base_branch,
         current_branch=current_branch,
-        files_changed=", ".join(files_changed),
+        commits="\n".join(commit_lines) or "(none)",
+        stats=format_numstat(files),
     )
 
 
-def get_review_prompt(diff: str) -> str:
-    """Generate review prompt."""
-    return REVIEW_PROMPT.format(diff=diff)
+@metrics.timed("prompt")
+def get_file_review_prompt(diff: str, files: list[str], related: str = None) -> str:
+    """Generate review prompt for one group of files, asking for JSON findings."""
+    return FILE_REVIEW_PROMPT.format(
+        diff=fit_diff(diff, related),
+        related=format_related(related),
+        files=format_files_changed(files),
+    )
 
 
-def get_explain_prompt(diff: str, context: str = None) -> str:
+@metrics.timed("prompt")
+def get_explain_prompt(diff: str, context: str = None, related: str = None) -> str:
     """Generate explain prompt."""
     ctx = f"Context: {context}" if context else ""
-    return EXPLAIN_PROMPT.format(diff=diff, context=ctx)
+    return EXPLAIN_PROMPT.format(diff=fit_diff(diff, related), related=format_related(related), context=ctx)
+
 
+@metrics.timed("prompt")
+def get_chunk_summary_prompt(diff: str, index: int, total: int, context: str = None) -> str:
+    """Generate prompt summarizing one chunk of a large diff."""
+    ctx = f"Context: {context}" if context else ""
+    return CHUNK_SUMMARY_PROMPT.format(diff=fit_diff(diff), index=index, total=total, context=ctx)
+
+
+@metrics.timed("prompt")
+def get_combine_summaries_prompt(summaries: list[str]) -> str:
+    """Generate prompt merging several chunk summaries into one."""
+    return COMBINE_SUMMARIES_PROMPT.format(summaries=format_summaries(summaries))
+
+
+@metrics.timed("prompt")
+def get_pr_reduce_prompt(
+    summaries: list[str],
+    base_branch: str,
+    current_branch: str,
+    files_changed: list[str],
+) -> str:
+    """Generate PR prompt from chunk summaries."""
+    return PR_REDUCE_PROMPT.format(
+        summaries=format_summaries(summaries),
+        base_branch=base_branch,
+        current_branch=current_branch,
+        files_changed=format_files_changed(files_changed),
+    )
+
+
+@metrics.timed("prompt")
+def get_explain_reduce_prompt(summaries: list[str], context: str = None) -> str:
+    """Generate explain prompt from chunk summaries."""
+    ctx = f"Context: {context}" if context else ""
+    return EXPLAIN_REDUCE_PROMPT.format(summaries=format_summaries(summaries), context=ctx)
@@ -0,0 +1,119 @@
+"""Terminal rendering helpers for aigit."""
+
+import time
+from collections.abc import Callable, Iterable
+
+from rich.console import Console
+from rich.live import Live
+from rich.panel import Panel
+from rich.text import Text
+
+
+def render_stream(
+    console: Console,
+    chunks: Iterable[str],
+    title: str,
+    border_style: str = "blue",
+    markdown: bool = True,
+) -> tuple[str, bool]:
+    """Render streamed text into a growing panel.
+
+    The panel subtitle shows time-to-first-token and total time. Ctrl-C
+    stops the stream but keeps the text received so far on screen.
+
+    Returns the text and whether the stream ran to completion.
+    """
+    parts = []
+    start = time.monotonic()
+    first_token = None
+    status = "waiting for first token..."
+
+    def get_panel():
+        text = "".join(parts)
+        if markdown:
+            from rich.markdown import Markdown
+
+            body = Markdown(text)
+        else:
+            body = Text(text)
+        return Panel(body, title=title, border_style=border_style, subtitle=f"[dim]{status}[/dim]")
+
+    def consume():
+        nonlocal first_token, status
+        try:
+            for chunk in chunks:
+                if first_token is None:
+                    first_token = time.monotonic() - start
+                    status = f"first token {first_token:.2f}s"
+                parts.append(chunk)
+        except KeyboardInterrupt:
+            return False
+        return True
+
+    # Only redraw in place on a terminal; otherwise print the final panel once
+    if console.is_terminal:
+        with Live(console=console, get_renderable=get_panel, refresh_per_second=10) as live:
+            completed = consume()
+            status = _final_status(completed, first_token, time.monotonic() - start)
+            live.refresh()
+    else:
+        completed = consume()
+        status = _final_status(completed, first_token, time.monotonic() - start)
+        console.print(get_panel())
+
+    return "".join(parts).strip(), completed
+
+
+def _final_status(completed: bool, first_token: float | None, total: float) -> str:
+    if not completed:
+        return f"cancelled after {total:.2f}s"
+    if first_token is not None:
+        return f"first token {first_token:.2f}s · total {total:.2f}s"
+    return f"total {total:.2f}s"
+
+
+def render_progress(
+    console: Console,
+    run: Callable[[Callable], None],
+    render: Callable[[object], str],
+    title: str,
+    border_style: str = "blue",
+) -> tuple[object, bool]:
+    """Run work that reports partial results, showing the latest one in a panel.
+
+    `run` receives an `update(value)` callback; `render` turns a value into
+    Markdown. Ctrl-C stops waiting but keeps the last result on screen.
+
+    Returns the last value and whether the work ran to completion.
+    """
+    from rich.markdown import Markdown
+
+    state = {"value": None}
+    start = time.monotonic()
+    status = "working..."
+
+    def get_panel():
+        text = render(state["value"]) if state["value"] is not None else ""
+        return Panel(Markdown(text), title=title, border_style=border_style, subtitle=f"[dim]{status}[/dim]")
+
+    def update(value):
+        state["value"] = value
+
+    def consume():
+        try:
+            run(update)
+        except KeyboardInterrupt:
+            return False
+        return True
+
+    if console.is_terminal:
+        with Live(console=console, get_renderable=get_panel, refresh_per_second=10) as live:
+            completed = consume()
+            status = _final_status(completed, None, time.monotonic() - start)
+            live.refresh()
+    else:
+        completed = consume()
+        status = _final_status(completed, None, time.monotonic() - start)
+        console.print(get_panel())
+
+    return state["value"], completed
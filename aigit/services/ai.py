@@ -1,28 +1,375 @@
-"""AI service for OpenAI interactions."""
+"""AI service for generating text from diffs.
 
-from openai import OpenAI
+Functions prefixed with `a` are asyncio counterparts of the synchronous
+ones, for overlapping independent work or embedding aigit in async code.
+"""
 
-from aigit.config import get_openai_api_key, get_config
+import hashlib
+import json
+import re
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, NamedTuple
 
+from aigit import cache, metrics, structured
+from aigit.config import get_config
+from aigit.services.providers import Provider, get_client, get_provider  # noqa: F401
+from aigit.services.ratelimit import get_scheduler
 
-def get_client() -> OpenAI:
-    """Get OpenAI client."""
-    return OpenAI(api_key=get_openai_api_key())
+if TYPE_CHECKING:
+    from aigit.diff import FileDiff
 
+TEMPERATURE = 0.7
 
-def generate(prompt: str, max_tokens: int = 1024) -> str:
-    """Generate a response from the AI model."""
-    client = get_client()
+# Max tokens for each chunk summary in map-reduce mode
+SUMMARY_MAX_TOKENS = 512
+
+# Texts per embeddings request
+EMBED_BATCH_SIZE = 64
+
+# Marker before each message in a split commit response
+SPLIT_MARKER_RE = re.compile(r"^[=#*\s]*Commit\s+(\d+)\s*[=#*:\s]*$", re.MULTILINE | re.IGNORECASE)
+
+# Model turns in tool-calling mode before the model must answer
+MAX_TOOL_ROUNDS = 4
+
+
+class Tool(NamedTuple):
+    """A local function the model may call in generate_with_tools()."""
+
+    name: str
+    description: str
+    # JSON schema of the arguments
+    parameters: dict
+    run: Callable[..., str]
+
+    def spec(self) -> dict:
+        return {
+            "type": "function",
+            "function": {
+                "name": self.name,
+                "description": self.description,
+                "parameters": self.parameters,
+                "strict": True,
+            },
+        }
+
+
+# Characters allowed in generated branch names
+BRANCH_INVALID_RE = re.compile(r"[^a-z0-9/._-]+")
+
+
+class PRContent(NamedTuple):
+    """A generated pull request; unpacks as (title, description)."""
+
+    title: str
+    description: str
+
+
+def _cache_key(provider: Provider, model: str, prompt: str, max_tokens: int, schema: dict = None) -> str:
+    return cache.make_key(
+        provider=provider.identity(),
+        model=model,
+        prompt=prompt,
+        max_tokens=max_tokens,
+        temperature=TEMPERATURE,
+        schema=schema["name"] if schema and get_config("structured_outputs") else None,
+    )
+
+
+def _estimate_cost(prompt: str, max_tokens: int) -> int:
+    """Tokens a request counts against the TPM limit (prompt plus max output)."""
+    from aigit.tokens import CHARS_PER_TOKEN
+
+    return len(prompt) // CHARS_PER_TOKEN + max_tokens
+
+
+def generate(prompt: str, max_tokens: int = 1024, schema: dict = None) -> str:
+    """Generate a response from the AI model.
+
+    With a schema from aigit.structured, providers that support it are
+    asked for JSON matching it; parse the result with structured.parse().
+    """
+    provider = get_provider()
+    model = get_config("model") or "gpt-4o-mini"
+
+    with metrics.track("generate", provider.name, model, prompt) as call:
+        key = _cache_key(provider, model, prompt, max_tokens, schema)
+        cached = cache.get(key)
+        if cached is not None:
+            call.cache = "hit"
+            return cached
+
+        call.cache = "miss" if cache.is_enabled() else "off"
+        result = get_scheduler().call(
+            lambda: provider.complete(prompt, model, max_tokens, TEMPERATURE, schema),
+            _estimate_cost(prompt, max_tokens),
+        )
+        call.set_output(result)
+        cache.put(key, result)
+        return result
+
+
+def generate_stream(prompt: str, max_tokens: int = 1024) -> Iterator[str]:
+    """Stream a response from the AI model, yielding text as it arrives.
+
+    The full response is cached only if the stream runs to completion.
+    """
+    provider = get_provider()
     model = get_config("model") or "gpt-4o-mini"
 
-    response = client.chat.completions.create(
+    with metrics.track("stream", provider.name, model, prompt) as call:
+        key = _cache_key(provider, model, prompt, max_tokens)
+        cached = cache.get(key)
+        if cached is not None:
+            call.cache = "hit"
+            call.mark_first_token()
+            yield cached
+            return
+
+        call.cache = "miss" if cache.is_enabled() else "off"
+        parts = []
+        stream = get_scheduler().stream(
+            lambda: provider.stream(prompt, model, max_tokens, TEMPERATURE),
+            _estimate_cost(prompt, max_tokens),
+        )
+        for text in stream:
+            call.mark_first_token()
+            parts.append(text)
+            yield text
+
+        result = "".join(parts).strip()
+        call.set_output(result)
+        cache.put(key, result)
+
+
+async def agenerate(prompt: str, max_tokens: int = 1024, schema: dict = None) -> str:
+    """Generate a response from the AI model without blocking the event loop."""
+    provider = get_provider()
+    model = get_config("model") or "gpt-4o-mini"
+
+    with metrics.track("generate", provider.name, model, prompt) as call:
+        key = _cache_key(provider, model, prompt, max_tokens, schema)
+        cached = cache.get(key)
+        if cached is not None:
+            call.cache = "hit"
+            return cached
+
+        call.cache = "miss" if cache.is_enabled() else "off"
+        result = await get_scheduler().acall(
+            lambda: provider.acomplete(prompt, model, max_tokens, TEMPERATURE, schema),
+            _estimate_cost(prompt, max_tokens),
+        )
+        call.set_output(result)
+        cache.put(key, result)
+        return result
+
+
+def _run_tool(tools: dict[str, Tool], call: dict) -> str:
+    tool = tools.get(call["function"]["name"])
+    if tool is None:
+        return f"Error: unknown tool {call['function']['name']}"
+    try:
+        arguments = json.loads(call["function"]["arguments"] or "{}")
+        return tool.run(**arguments)
+    except (TypeError, ValueError) as e:
+        # Tell the model what went wrong so it can correct the call
+        return f"Error: {e}"
+
+
+def generate_with_tools(
+    prompt: str,
+    tools: list[Tool],
+    max_tokens: int = 1024,
+    schema: dict = None,
+    tool_data: str = "",
+) -> str:
+    """Generate a response, letting the model call local tools for what it needs.
+
+    Each model turn is one request; tool results are added to the
+    conversation until the model answers, or after MAX_TOOL_ROUNDS turns
+    it is asked to answer with what it has. `tool_data` is everything the
+    tools can return, so the cached answer is reused only while it is
+    unchanged.
+    """
+    provider = get_provider()
+    model = get_config("model") or "gpt-4o-mini"
+    by_name = {tool.name: tool for tool in tools}
+    specs = [tool.spec() for tool in tools]
+
+    key = cache.make_key(
+        provider=provider.identity(),
         model=model,
-        messages=[{"role": "user", "content": prompt}],
+        prompt=prompt,
         max_tokens=max_tokens,
-        temperature=0.7,
+        temperature=TEMPERATURE,
+        schema=schema["name"] if schema and get_config("structured_outputs") else None,
+        tools=specs,
+        tool_data=hashlib.sha256(tool_data.encode("utf-8", "surrogatepass")).hexdigest(),
     )
+    cached = cache.get(key)
+    if cached is not None:
+        with metrics.track("generate", provider.name, model, prompt) as call:
+            call.cache = "hit"
+        return cached
+
+    messages = [{"role": "user", "content": prompt}]
+    for turn in range(MAX_TOOL_ROUNDS + 1):
+        tool_choice = "auto" if turn < MAX_TOOL_ROUNDS else "none"
+        text = "\n".join(message.get("content") or "" for message in messages)
+
+        with metrics.track("generate", provider.name, model, text) as call:
+            call.cache = "miss" if cache.is_enabled() else "off"
+            reply = get_scheduler().call(
+                lambda: provider.chat(messages, model, max_tokens, TEMPERATURE, specs, tool_choice, schema),
+                _estimate_cost(text, max_tokens),
+            )
+            calls = reply.get("tool_calls") or []
+            call.set_output(reply["content"] or json.dumps(calls))
+
+        if not calls:
+            result = reply["content"].strip()
+            cache.put(key, result)
+            return result
+
+        messages.append(reply)
+        for tool_call in calls:
+            messages.append({"role": "tool", "tool_call_id": tool_call["id"], "content": _run_tool(by_name, tool_call)})
+
+    raise ValueError("The model kept calling tools without answering")
+
+
+def get_max_workers() -> int:
+    """Number of AI requests that may run concurrently."""
+    return max(int(get_config("max_workers") or 1), 1)
+
+
+def generate_many(prompts: list[str], max_tokens: int = 1024) -> list[str]:
+    """Generate responses for several prompts concurrently, in order."""
+    workers = min(get_max_workers(), len(prompts))
+
+    if workers <= 1:
+        return [generate(prompt, max_tokens=max_tokens) for prompt in prompts]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda prompt: generate(prompt, max_tokens=max_tokens), prompts))
+
+
+async def agenerate_many(prompts: list[str], max_tokens: int = 1024) -> list[str]:
+    """Generate responses for several prompts concurrently, in order."""
+    import asyncio
+
+    semaphore = asyncio.Semaphore(get_max_workers())
+
+    async def run(prompt: str) -> str:
+        async with semaphore:
+            return await agenerate(prompt, max_tokens=max_tokens)
+
+    return list(await asyncio.gather(*(run(prompt) for prompt in prompts)))
+
+
+def embed(texts: list[str]) -> list[list[float]]:
+    """Embed texts with the configured embedding model, batches in parallel."""
+    from aigit.tokens import CHARS_PER_TOKEN
+
+    provider = get_provider()
+    model = get_config("embedding_model") or "text-embedding-3-small"
+    batches = [texts[i : i + EMBED_BATCH_SIZE] for i in range(0, len(texts), EMBED_BATCH_SIZE)]
+
+    def run(batch: list[str]) -> list[list[float]]:
+        cost = sum(len(text) for text in batch) // CHARS_PER_TOKEN
+        with metrics.track("embed", provider.name, model, "\n".join(batch)):
+            return get_scheduler().call(lambda: provider.embed(batch, model), cost)
+
+    workers = min(get_max_workers(), len(batches))
+    if workers <= 1:
+        results = [run(batch) for batch in batches]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run, batches))
+
+    return [vector for batch in results for vector in batch]
+
+
+def get_related_context(diff: str) -> str | None:
+    """Related code from the semantic index for a diff, if enabled and built."""
+    if not get_config("semantic_context"):
+        return None
+
+    from aigit.services import index
+
+    try:
+        return index.get_related_context(diff) or None
+    except Exception:
+        # Context only improves the prompt; never fail the command over it
+        return None
+
+
+def needs_map_reduce(diff: str) -> bool:
+    """Check whether a diff is too large for a single prompt."""
+    from aigit.tokens import count_tokens, get_diff_budget
+
+    if not get_config("map_reduce"):
+        return False
+
+    budget = get_diff_budget()
+    return len(diff) > budget and count_tokens(diff) > budget
+
+
+def _get_chunk_prompts(diff: str, context: str = None) -> list[str]:
+    from aigit.diff import chunk_diff
+    from aigit.prompts import get_chunk_summary_prompt
+    from aigit.tokens import get_diff_budget
 
-    return response.choices[0].message.content.strip()
+    chunks = chunk_diff(diff, get_diff_budget())
+    return [
+        get_chunk_summary_prompt(chunk, i, len(chunks), context)
+        for i, chunk in enumerate(chunks, 1)
+    ]
+
+
+def _get_combine_prompts(summaries: list[str]) -> list[str]:
+    """Prompts for the next reduce round, or none once the summaries fit."""
+    from aigit.prompts import format_summaries, get_combine_summaries_prompt
+    from aigit.tokens import count_tokens, get_diff_budget
+
+    budget = get_diff_budget()
+    if len(summaries) <= 1 or count_tokens(format_summaries(summaries)) <= budget:
+        return []
+
+    # Pack at least two summaries per group so every round shrinks the list
+    groups = [[]]
+    used = 0
+    for summary in summaries:
+        size = count_tokens(summary)
+        if len(groups[-1]) >= 2 and used + size > budget:
+            groups.append([])
+            used = 0
+        groups[-1].append(summary)
+        used += size
+
+    return [get_combine_summaries_prompt(group) for group in groups]
+
+
+def summarize_diff(diff: str, context: str = None) -> list[str]:
+    """Summarize a large diff in chunks (map), then merge the summaries
+    until they fit in a single prompt (reduce)."""
+    summaries = generate_many(_get_chunk_prompts(diff, context), max_tokens=SUMMARY_MAX_TOKENS)
+
+    while prompts := _get_combine_prompts(summaries):
+        summaries = generate_many(prompts, max_tokens=SUMMARY_MAX_TOKENS)
+
+    return summaries
+
+
+async def asummarize_diff(diff: str, context: str = None) -> list[str]:
+    """Async counterpart of summarize_diff()."""
+    summaries = await agenerate_many(_get_chunk_prompts(diff, context), max_tokens=SUMMARY_MAX_TOKENS)
+
+    while prompts := _get_combine_prompts(summaries):
+        summaries = await agenerate_many(prompts, max_tokens=SUMMARY_MAX_TOKENS)
+
+    return summaries
 
 
 def generate_commit_message(diff: str, conventional: bool = True, hint: str = None) -> str:
@@ -33,20 +380,76 @@ def generate_commit_message(diff: str, conventional: bool = True, hint: str = No
     return generate(prompt, max_tokens=256)
 
 
+def stream_commit_message(diff: str, conventional: bool = True, hint: str = None) -> Iterator[str]:
+    """Stream a commit message from a diff."""
+    from aigit.prompts import get_commit_prompt
+
+    prompt = get_commit_prompt(diff, conventional, hint)
+    return generate_stream(prompt, max_tokens=256)
+
+
+async def agenerate_commit_message(diff: str, conventional: bool = True, hint: str = None) -> str:
+    """Async counterpart of generate_commit_message()."""
+    from aigit.prompts import get_commit_prompt
+
+    prompt = get_commit_prompt(diff, conventional, hint)
+    return await agenerate(prompt, max_tokens=256)
+
+
+def generate_split_commit_messages(diffs: list[str], conventional: bool = True, hint: str = None) -> list[str]:
+    """Generate commit messages for several groups of changes in one request."""
+    from aigit.prompts import get_split_commit_prompt
+
+    prompt = get_split_commit_prompt(diffs, conventional, hint)
+    result = generate(prompt, max_tokens=min(256 * len(diffs), 4096))
+    return parse_split_commit_messages(result, len(diffs))
+
+
+def parse_split_commit_messages(result: str, count: int) -> list[str]:
+    """Parse `=== Commit N ===` sections; groups without one get an empty message."""
+    messages = [""] * count
+    parts = SPLIT_MARKER_RE.split(result)
+
+    # parts: [preamble, number, message, number, message, ...]
+    for number, message in zip(parts[1::2], parts[2::2]):
+        index = int(number) - 1
+        message = message.strip().strip("`").strip()
+        if 0 <= index < count and message and not messages[index]:
+            messages[index] = message
+    return messages
+
+
 def generate_branch_name(diff: str = None, description: str = None) -> str:
     """Generate a branch name."""
     from aigit.prompts import get_branch_prompt
 
     prompt = get_branch_prompt(diff, description)
-    result = generate(prompt, max_tokens=64)
+    return parse_branch_name(generate(prompt, max_tokens=64, schema=structured.BRANCH_SCHEMA))
+
 
-    # Clean up the result
-    result = result.strip().lower()
-    result = result.replace(" ", "-")
-    # Remove any quotes or backticks
-    result = result.strip("`'\"")
+async def agenerate_branch_name(diff: str = None, description: str = None) -> str:
+    """Async counterpart of generate_branch_name()."""
+    from aigit.prompts import get_branch_prompt
+
+    prompt = get_branch_prompt(diff, description)
+    return parse_branch_name(await agenerate(prompt, max_tokens=64, schema=structured.BRANCH_SCHEMA))
 
-    return result
+
+def parse_branch_name(result: str) -> str:
+    """Get the branch name from a JSON response, or from plain text."""
+    data = structured.parse(result, structured.BRANCH_SCHEMA)
+    name = data["name"] if data and data["name"] else result.strip().splitlines()[0] if result.strip() else ""
+    return clean_branch_name(name)
+
+
+def clean_branch_name(result: str) -> str:
+    """Normalize a generated branch name into a valid ref name."""
+    result = result.strip().strip("`'\"").lower()
+    result = BRANCH_INVALID_RE.sub("-", result.replace(" ", "-"))
+    # No empty components, "..", or components starting or ending with "." or "-"
+    parts = [part.strip(".-") for part in re.sub(r"\.{2,}", ".", result).split("/")]
+    result = "/".join(re.sub(r"-{2,}", "-", part) for part in parts if part.strip(".-"))
+    return result.removesuffix(".lock")
 
 
 def generate_pr(
@@ -54,14 +457,138 @@ def generate_pr(
     base_branch: str,
     current_branch: str,
     files_changed: list[str],
-) -> tuple[str, str]:
-    """Generate PR title and description."""
-    from aigit.prompts import get_pr_prompt
+    commits: list[str] = None,
+) -> PRContent:
+    """Generate PR title and description.
+
+    With `pr_tools` on, the model sees only file stats and `commits`
+    subjects and reads the file diffs it needs (see generate_pr_with_tools).
+    """
+    from aigit.prompts import get_pr_prompt, get_pr_reduce_prompt
+
+    if get_config("pr_tools"):
+        return generate_pr_with_tools(diff, base_branch, current_branch, commits or [])
+    if needs_map_reduce(diff):
+        summaries = summarize_diff(diff, f"Branch {current_branch} against {base_branch}")
+        prompt = get_pr_reduce_prompt(summaries, base_branch, current_branch, files_changed)
+    else:
+        related = get_related_context(diff)
+        prompt = get_pr_prompt(diff, base_branch, current_branch, files_changed, related)
+    return parse_pr(generate(prompt, max_tokens=1024, schema=structured.PR_SCHEMA))
+
+
+async def agenerate_pr(
+    diff: str,
+    base_branch: str,
+    current_branch: str,
+    files_changed: list[str],
+    commits: list[str] = None,
+) -> PRContent:
+    """Async counterpart of generate_pr()."""
+    import asyncio
+
+    from aigit.prompts import get_pr_prompt, get_pr_reduce_prompt
+
+    if get_config("pr_tools"):
+        return await asyncio.to_thread(generate_pr_with_tools, diff, base_branch, current_branch, commits or [])
+    if needs_map_reduce(diff):
+        summaries = await asummarize_diff(diff, f"Branch {current_branch} against {base_branch}")
+        prompt = get_pr_reduce_prompt(summaries, base_branch, current_branch, files_changed)
+    else:
+        related = await asyncio.to_thread(get_related_context, diff)
+        prompt = get_pr_prompt(diff, base_branch, current_branch, files_changed, related)
+    return parse_pr(await agenerate(prompt, max_tokens=1024, schema=structured.PR_SCHEMA))
+
 
-    prompt = get_pr_prompt(diff, base_branch, current_branch, files_changed)
-    result = generate(prompt, max_tokens=1024)
+def get_file_diff_tool(files: list["FileDiff"]) -> Tool:
+    """A get_file_diff(path) tool serving the diffs of `files`.
 
-    # Parse the result
+    Each result is compacted to a quarter of the diff budget, and once a
+    whole budget has been served the model is told to answer instead.
+    """
+    from aigit.diff import compact_diff
+    from aigit.tokens import count_tokens, get_diff_budget
+
+    by_path = {}
+    for file in files:
+        by_path.setdefault(file.path, file)
+        by_path.setdefault(file.old_path, file)
+    budget = get_diff_budget()
+    served = {"tokens": 0}
+
+    def get_file_diff(path: str) -> str:
+        path = path.strip().strip("`").removeprefix("b/")
+        file = by_path.get(path) or next((f for f in files if f.path.endswith(path)), None)
+        if file is None:
+            return f"No changes to {path} on this branch."
+        if served["tokens"] >= budget:
+            return "Diff budget used up; write the PR from what you have read."
+
+        text = compact_diff(file.render(), max(min(budget // 4, budget - served["tokens"]), 256))
+        served["tokens"] += count_tokens(text)
+        return text
+
+    return Tool(
+        name="get_file_diff",
+        description="Get the diff of one changed file on this branch against the base branch.",
+        parameters={
+            "type": "object",
+            "properties": {"path": {"type": "string", "description": "Path of a changed file, as listed"}},
+            "required": ["path"],
+            "additionalProperties": False,
+        },
+        run=get_file_diff,
+    )
+
+
+def generate_pr_with_tools(
+    diff: str,
+    base_branch: str,
+    current_branch: str,
+    commits: list[str],
+) -> PRContent:
+    """Generate a PR from file stats and commit subjects, with file diffs read on demand.
+
+    The first request carries no diff at all. The model calls
+    get_file_diff for the files it needs, so on large branches most of
+    the diff is never sent.
+    """
+    from aigit.diff import parse_diff
+    from aigit.prompts import get_pr_tools_prompt
+
+    files = parse_diff(diff)
+    prompt = get_pr_tools_prompt(files, commits, base_branch, current_branch)
+    result = generate_with_tools(
+        prompt,
+        [get_file_diff_tool(files)],
+        max_tokens=1024,
+        schema=structured.PR_SCHEMA,
+        tool_data=diff,
+    )
+    return parse_pr(result)
+
+
+def parse_pr(result: str) -> PRContent:
+    """Parse a PR response: JSON, else the older TITLE:/DESCRIPTION: format.
+
+    A missing title is taken from the description's first line rather
+    than asking again.
+    """
+    data = structured.parse(result, structured.PR_SCHEMA)
+    if data and (data["title"] or data["description"]):
+        title, description = data["title"], data["description"]
+    else:
+        title, description = _parse_pr_lines(result)
+        if not title and not description:
+            description = result.strip()
+
+    if not title:
+        lines = [line.strip("#*-` ").strip() for line in description.splitlines()]
+        title = next((line for line in lines if line), "")
+    return PRContent(title.splitlines()[0].strip() if title else "", description.strip())
+
+
+def _parse_pr_lines(result: str) -> tuple[str, str]:
     lines = result.split("\n")
     title = ""
     description_lines = []
@@ -80,18 +607,37 @@ def generate_pr(
     return title, description
 
 
-def generate_review(diff: str) -> str:
-    """Generate a code review."""
-    from aigit.prompts import get_review_prompt
+def get_explanation_prompt(diff: str, context: str = None) -> str:
+    """Build the explain prompt, summarizing the diff first if it is too large."""
+    from aigit.prompts import get_explain_prompt, get_explain_reduce_prompt
 
-    prompt = get_review_prompt(diff)
-    return generate(prompt, max_tokens=1024)
+    if needs_map_reduce(diff):
+        summaries = summarize_diff(diff, context)
+        return get_explain_reduce_prompt(summaries, context)
+    return get_explain_prompt(diff, context, get_related_context(diff))
 
 
 def generate_explanation(diff: str, context: str = None) -> str:
     """Generate an explanation of changes."""
-    from aigit.prompts import get_explain_prompt
-
-    prompt = get_explain_prompt(diff, context)
+    prompt = get_explanation_prompt(diff, context)
     return generate(prompt, max_tokens=1024)
 
+
+def stream_explanation(diff: str, context: str = None) -> Iterator[str]:
+    """Stream an explanation of changes."""
+    yield from generate_stream(get_explanation_prompt(diff, context), max_tokens=1024)
+
+
+async def agenerate_explanation(diff: str, context: str = None) -> str:
+    """Async counterpart of generate_explanation()."""
+    import asyncio
+
+    from aigit.prompts import get_explain_prompt, get_explain_reduce_prompt
+
+    if needs_map_reduce(diff):
+        prompt = get_explain_reduce_prompt(await asummarize_diff(diff, context), context)
+    else:
+        related = await asyncio.to_thread(get_related_context, diff)
+        prompt = get_explain_prompt(diff, context, related)
+    return await agenerate(prompt, max_tokens=1024)
+
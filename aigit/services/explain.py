@@ -0,0 +1,121 @@
+"""Batch explanations for commit ranges, generated concurrently in commit order."""
+
+import hashlib
+import json
+import os
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from aigit import cache
+from aigit.config import get_config
+from aigit.services import ai, git
+
+
+@dataclass
+class CommitExplanation:
+    """An explanation of one commit."""
+
+    sha: str
+    author: str
+    date: str
+    subject: str
+    explanation: str
+    cached: bool = False
+
+    def to_json(self) -> str:
+        data = asdict(self)
+        data.pop("cached")
+        return json.dumps(data, ensure_ascii=False)
+
+    def to_markdown(self) -> str:
+        return f"## {self.sha[:7]} {self.subject}\n\n*{self.author}, {self.date}*\n\n{self.explanation}\n"
+
+
+def _identity() -> str:
+    from aigit.prompts import EXPLAIN_PROMPT, EXPLAIN_REDUCE_PROMPT
+    from aigit.services.providers import get_provider
+
+    return "\0".join(
+        [get_provider().identity(), get_config("model") or "", EXPLAIN_PROMPT, EXPLAIN_REDUCE_PROMPT]
+    )
+
+
+def _store_path(repo, sha: str) -> Path:
+    # Explanations from another provider, model or prompt don't count as stored
+    key = hashlib.sha256(f"{_identity()}\0{sha}".encode("utf-8")).hexdigest()
+    return git.get_aigit_dir(repo) / "explain" / key[:2] / f"{key}.json"
+
+
+def load_explanation(repo, commit: git.CommitInfo) -> CommitExplanation | None:
+    """Load a stored explanation for a commit, if one exists."""
+    path = _store_path(repo, commit.sha)
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        # Mark as recently used, so pruning evicts old explanations first
+        os.utime(path)
+    except (OSError, ValueError):
+        return None
+    return CommitExplanation(**{**asdict(commit), "explanation": data["explanation"], "cached": True})
+
+
+def save_explanation(repo, explanation: CommitExplanation) -> None:
+    """Store a commit's explanation under .git/aigit/explain/."""
+    path = _store_path(repo, explanation.sha)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(explanation.to_json())
+    os.replace(tmp, path)
+
+    cache.track_write(path.parents[1], path)
+
+
+def explain_commit(repo, commit: git.CommitInfo) -> CommitExplanation:
+    """Fetch a commit's diff and explain it."""
+    diff = git.get_commit_diff(repo, commit.sha)
+    context = f"Commit {commit.sha[:7]}: {commit.subject}"
+    explanation = ai.generate_explanation(diff, context) if diff else "No changes."
+
+    result = CommitExplanation(**asdict(commit), explanation=explanation)
+    save_explanation(repo, result)
+    return result
+
+
+def explain_commits(
+    repo,
+    commits: Iterable[git.CommitInfo],
+    jobs: int = None,
+) -> Iterator[CommitExplanation]:
+    """Explain commits concurrently, yielding results in commit order.
+
+    Commits already explained in an earlier run are loaded from the store
+    instead of being sent to the model (unless the cache is disabled). At
+    most `jobs` requests run at once, and only a small window of commits
+    is in flight, so memory stays bounded on long ranges.
+    """
+    jobs = max(jobs or ai.get_max_workers(), 1)
+    window = deque()
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        try:
+            for commit in commits:
+                stored = load_explanation(repo, commit) if cache.is_enabled() else None
+                window.append(stored or pool.submit(explain_commit, repo, commit))
+
+                while len(window) > jobs * 2:
+                    yield _result(window.popleft())
+
+            while window:
+                yield _result(window.popleft())
+        finally:
+            for item in window:
+                if not isinstance(item, CommitExplanation):
+                    item.cancel()
+
+
+def _result(item) -> CommitExplanation:
+    return item if isinstance(item, CommitExplanation) else item.result()
@@ -0,0 +1,284 @@
+"""Path filters that keep ignored and generated files out of diffs.
+
+A file is excluded when it matches `.aigitignore` (gitignore syntax) or
+the `exclude` config globs, falls outside the `include` globs, or looks
+generated: marked linguist-generated or linguist-vendored in
+.gitattributes, a known lockfile or build output, or content that is very
+large, minified or headed by a "generated" marker. A `!pattern` line in
+.aigitignore keeps a file that would otherwise be detected as generated.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import subprocess
+from collections.abc import Iterator
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from aigit.config import get_config
+
+if TYPE_CHECKING:
+    from git import Repo
+
+    from aigit.diff import FileDiff
+    from aigit.services.git import FileStat
+
+IGNORE_FILE = ".aigitignore"
+
+# Only files at least this large are opened to look for generated content
+MIN_INSPECT_BYTES = 4096
+
+# Text files above this size are treated as generated or data
+MAX_SOURCE_BYTES = 1_000_000
+
+# Average line length above which a file counts as minified
+MAX_AVERAGE_LINE_LENGTH = 200
+
+# Markers that code generators put at the top of their output
+GENERATED_MARKERS = ("@generated", "DO NOT EDIT", "Code generated by", "<auto-generated")
+MARKER_SCAN_CHARS = 1024
+
+GENERATED_ATTRIBUTES = ("linguist-generated", "linguist-vendored")
+
+
+@dataclass
+class IgnoreRule:
+    """One gitignore-style pattern."""
+
+    regex: re.Pattern
+    negated: bool = False
+    dir_only: bool = False
+    anchored: bool = False
+
+    def matches(self, path: str) -> bool:
+        parts = path.split("/")
+        if not self.anchored:
+            # A pattern without a slash matches a name at any depth
+            names = parts[:-1] if self.dir_only else parts
+            return any(self.regex.fullmatch(name) for name in names)
+
+        # A directory pattern matches every file under the directory
+        prefixes = ["/".join(parts[:i]) for i in range(1, len(parts))]
+        if not self.dir_only:
+            prefixes.append(path)
+        return any(self.regex.fullmatch(prefix) for prefix in prefixes)
+
+
+def _glob_to_regex(pattern: str) -> re.Pattern:
+    """Translate a gitignore glob, where only `**` crosses directories."""
+    out = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            out.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            out.append("[^/]")
+            i += 1
+        elif pattern[i] == "[" and "]" in pattern[i + 2 :]:
+            end = pattern.index("]", i + 2)
+            out.append("[" + pattern[i + 1 : end].replace("!", "^", 1) + "]")
+            i = end + 1
+        else:
+            out.append(re.escape(pattern[i]))
+            i += 1
+    return re.compile("".join(out))
+
+
+def parse_rules(lines) -> list[IgnoreRule]:
+    """Parse gitignore-style lines, skipping blanks and comments."""
+    rules = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+
+        negated = line.startswith("!")
+        if negated:
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        anchored = "/" in line
+        line = line.lstrip("/")
+        if line:
+            rules.append(IgnoreRule(_glob_to_regex(line), negated, dir_only, anchored))
+    return rules
+
+
+def parse_patterns(value) -> list[str]:
+    """Read a glob list from config: a TOML list or a comma-separated string."""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.replace("\n", ",").split(",")
+    return [pattern.strip() for pattern in value if pattern.strip()]
+
+
+def load_rules(repo: Repo) -> list[IgnoreRule]:
+    """Load .aigitignore from the repository root, then the `exclude` config globs."""
+    lines = []
+    try:
+        with open(os.path.join(repo.working_dir, IGNORE_FILE), encoding="utf-8") as f:
+            lines.extend(f.read().splitlines())
+    except OSError:
+        pass
+    lines.extend(parse_patterns(get_config("exclude")))
+    return parse_rules(lines)
+
+
+def is_ignored(rules: list[IgnoreRule], path: str) -> bool | None:
+    """Apply rules in order, the last match winning; None if none matched."""
+    ignored = None
+    for rule in rules:
+        if rule.matches(path):
+            ignored = not rule.negated
+    return ignored
+
+
+def _generated_attributes(repo: Repo, paths: list[str]) -> dict[str, bool]:
+    """Read linguist attributes for paths: True if generated, False if explicitly not."""
+    result = subprocess.run(
+        ["git", "check-attr", "-z", "--stdin", *GENERATED_ATTRIBUTES],
+        cwd=repo.working_dir,
+        input="".join(f"{path}\0" for path in paths).encode(),
+        capture_output=True,
+    )
+    if result.returncode != 0:
+        return {}
+
+    attributes = {}
+    fields = result.stdout.decode("utf-8", "replace").split("\0")
+    for path, _, value in zip(fields[0::3], fields[1::3], fields[2::3]):
+        if value in ("set", "true"):
+            attributes[path] = True
+        elif value in ("unset", "false") and path not in attributes:
+            attributes[path] = False
+    return attributes
+
+
+def _blob_sizes(repo: Repo, shas: list[str]) -> dict[str, int]:
+    """Get blob sizes from one `git cat-file --batch-check` call."""
+    if not shas:
+        return {}
+    result = subprocess.run(
+        ["git", "cat-file", "--batch-check"],
+        cwd=repo.working_dir,
+        input="".join(f"{sha}\n" for sha in shas).encode(),
+        capture_output=True,
+    )
+    sizes = {}
+    for line in result.stdout.decode().split("\n"):
+        parts = line.split()
+        if len(parts) == 3 and parts[2].isdigit():
+            sizes[parts[0]] = int(parts[2])
+    return sizes
+
+
+def sniff_generated(text: str) -> str | None:
+    """Tell from a file's content whether it is generated or minified."""
+    if any(marker in text[:MARKER_SCAN_CHARS] for marker in GENERATED_MARKERS):
+        return "generated"
+    if len(text) / (text.count("\n") + 1) > MAX_AVERAGE_LINE_LENGTH:
+        return "minified"
+    return None
+
+
+def _read_worktree(repo: Repo, path: str) -> str | None:
+    try:
+        with open(os.path.join(repo.working_dir, path), "rb") as f:
+            data = f.read(MAX_SOURCE_BYTES)
+    except OSError:
+        return None
+    return None if b"\0" in data[:8000] else data.decode("utf-8", "replace")
+
+
+def detect_generated(repo: Repo, stats: list[FileStat]) -> dict[str, str]:
+    """Find generated files among changed files, mapping path to reason."""
+    from aigit.diff import get_signal_rank
+    from aigit.services.git import read_blobs
+
+    attributes = _generated_attributes(repo, [stat.path for stat in stats])
+    found = {}
+    candidates = []
+    for stat in stats:
+        marked = attributes.get(stat.path)
+        if marked:
+            found[stat.path] = "generated"
+        elif marked is None and get_signal_rank(stat.path) == 0:
+            found[stat.path] = "generated"
+        elif marked is None and stat.additions is not None:
+            # Binary files are already summarized in one line
+            candidates.append(stat)
+
+    sizes = _blob_sizes(repo, [stat.blob for stat in candidates if stat.blob])
+    to_read = {}
+    for stat in candidates:
+        if stat.blob:
+            size = sizes.get(stat.blob, 0)
+        else:
+            try:
+                size = os.path.getsize(os.path.join(repo.working_dir, stat.path))
+            except OSError:
+                continue
+
+        if size > MAX_SOURCE_BYTES:
+            found[stat.path] = "too large"
+        elif size >= MIN_INSPECT_BYTES:
+            to_read.setdefault(stat.blob, []).append(stat.path)
+
+    contents = dict(read_blobs(repo, [sha for sha in to_read if sha]))
+    for path in to_read.pop(None, []):
+        reason = sniff_generated(_read_worktree(repo, path) or "")
+        if reason:
+            found[path] = reason
+    for sha, paths in to_read.items():
+        reason = sniff_generated(contents.get(sha) or "")
+        if reason:
+            found.update(dict.fromkeys(paths, reason))
+    return found
+
+
+def find_exclusions(repo: Repo, stats: list[FileStat]) -> dict[str, str]:
+    """Decide which changed files to leave out of a diff, mapping path to reason."""
+    include = parse_rules(parse_patterns(get_config("include")))
+    rules = load_rules(repo)
+
+    excluded = {}
+    undecided = []
+    for stat in stats:
+        if include and not any(rule.matches(stat.path) for rule in include):
+            excluded[stat.path] = "not included"
+            continue
+        ignored = is_ignored(rules, stat.path)
+        if ignored:
+            excluded[stat.path] = "ignored"
+        elif ignored is None:
+            undecided.append(stat)
+
+    if undecided and get_config("exclude_generated"):
+        excluded.update(detect_generated(repo, undecided))
+    return excluded
+
+
+def summarize_exclusions(stats: list[FileStat], excluded: dict[str, str]) -> Iterator[FileDiff]:
+    """One-line records listing excluded files with their line counts."""
+    from aigit.diff import FileDiff
+
+    for stat in stats:
+        reason = excluded.get(stat.path)
+        if reason is None:
+            continue
+        counts = "binary" if stat.additions is None else f"+{stat.additions} -{stat.deletions}"
+        yield FileDiff(
+            path=stat.path,
+            old_path=stat.old_path or stat.path,
+            summary=f"Excluded ({reason}): {stat.path} ({counts})",
+        )
@@ -1,57 +1,483 @@
-"""Git service for local Git operations."""
+"""Git service for local Git operations.
 
+Functions prefixed with `a` are asyncio counterparts of the synchronous ones.
+"""
+
+from __future__ import annotations
+
+import io
+import os
 import subprocess
+from collections.abc import Iterable, Iterator
+from itertools import chain
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import TYPE_CHECKING
+
+from aigit import metrics
+
+if TYPE_CHECKING:
+    from git import Repo
+
+    from aigit.diff import FileDiff
+
+NULL_SHA = "0" * 40
+
+# Total size of exclusion pathspecs passed to git; ARG_MAX is often 128KB-2MB
+MAX_PATHSPEC_CHARS = 32_000
+
+# Results of git calls for the current command, keyed by (git dir, name)
+_memo: dict[tuple[str, str], tuple[tuple, object]] = {}
+
+# Repo objects by the directory they were opened from. They matter when the
+# same process runs many commands (`aigit serve`).
+_repos: dict[str, Repo] = {}
+
+
+@dataclass
+class FileStat:
+    """Line counts for one changed file (None for binary files)."""
+
+    path: str
+    additions: int | None
+    deletions: int | None
+    old_path: str | None = None
+    # Blob with the file's content, None when it is only in the working tree
+    blob: str | None = None
+
+
+@dataclass
+class DiffSnapshot:
+    """A diff's per-file numstat and patch, produced by one git call."""
+
+    stats: list[FileStat] = field(default_factory=list)
+    patch: str = ""
+
+    @property
+    def files(self) -> list[str]:
+        return [stat.path for stat in self.stats]
+
+
+@dataclass
+class CommitInfo:
+    """Metadata for one commit from `git log`."""
+
+    sha: str
+    author: str
+    date: str
+    subject: str
+
+
+@dataclass
+class PushResult:
+    """What a push changed on the remote, for rolling it back."""
+
+    branch: str
+    created: bool
+    old_sha: str | None
+    new_sha: str
 
-from git import Repo
-from git.exc import InvalidGitRepositoryError
+    @property
+    def changed(self) -> bool:
+        return self.created or self.old_sha != self.new_sha
+
+
+@dataclass
+class Status:
+    """Names of files with staged and unstaged changes (untracked excluded)."""
+
+    staged: list[str] = field(default_factory=list)
+    unstaged: list[str] = field(default_factory=list)
 
 
 def get_repo(path: str = ".") -> Repo:
     """Get the Git repository at the given path."""
+    from git import Repo
+    from git.exc import InvalidGitRepositoryError
+
+    key = os.path.abspath(path)
+    repo = _repos.get(key)
+    if repo is not None and os.path.isdir(repo.git_dir):
+        return repo
+
     try:
-        return Repo(path, search_parent_directories=True)
+        repo = Repo(path, search_parent_directories=True)
     except InvalidGitRepositoryError:
         raise ValueError(f"Not a git repository: {path}")
+    _repos[key] = repo
+    return repo
+
+
+def _index_signature(repo: Repo) -> tuple:
+    """Identify the index and HEAD state, so memoized results go stale with them."""
+    signature = []
+    for name in ("index", "HEAD"):
+        try:
+            st = os.stat(os.path.join(repo.git_dir, name))
+            signature.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
+def _memoized(repo: Repo, name: str, compute):
+    """Return a memoized result for this repo, recomputing if the index changed."""
+    key = (repo.git_dir, name)
+    signature = _index_signature(repo)
+
+    cached = _memo.get(key)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    value = compute()
+    _memo[key] = (signature, value)
+    return value
+
+
+def _memoized_value(repo: Repo, name: str):
+    """Get a memoized result if it is still valid, without computing it."""
+    cached = _memo.get((repo.git_dir, name))
+    if cached is not None and cached[0] == _index_signature(repo):
+        return cached[1]
+    return None
+
+
+def invalidate(repo: Repo = None) -> None:
+    """Drop memoized git results after the repository was modified."""
+    repo = repo or get_repo()
+    for key in [k for k in _memo if k[0] == repo.git_dir]:
+        del _memo[key]
+
+
+def clear_memo() -> None:
+    """Drop all memoized git results, for every repository."""
+    _memo.clear()
+
+
+def _numstat_path(path: str) -> str:
+    """Get the new path from a numstat entry, which may be a rename."""
+    from aigit.diff import unquote_path
+
+    if " => " not in path:
+        return unquote_path(path)
+    if path.endswith('"'):
+        # Quoted names are shown in full: "old" => "new"
+        return unquote_path(path.rsplit(" => ", 1)[1])
+    if "{" in path and "}" in path:
+        prefix, rest = path.split("{", 1)
+        inner, suffix = rest.split("}", 1)
+        return (prefix + inner.split(" => ", 1)[1] + suffix).replace("//", "/")
+    return path.split(" => ", 1)[1]
+
+
+def _parse_numstat(output: str) -> list[FileStat]:
+    stats = []
+    for line in output.split("\n"):
+        if line.startswith(":"):
+            continue  # --raw entry
+        parts = line.split("\t", 2)
+        if len(parts) != 3:
+            continue
+        added, deleted, path = parts
+        stats.append(
+            FileStat(
+                path=_numstat_path(path),
+                additions=None if added == "-" else int(added),
+                deletions=None if deleted == "-" else int(deleted),
+            )
+        )
+    return stats
+
+
+def _parse_diff_stat(output: str) -> list[FileStat]:
+    """Parse `--raw --numstat` output into stats that carry each file's blob."""
+    from aigit.diff import unquote_path
+
+    entries = {}
+    for line in output.split("\n"):
+        if not line.startswith(":"):
+            continue
+        meta, *paths = line.split("\t")
+        paths = [unquote_path(path) for path in paths]
+        parts = meta.split()
+        if len(parts) < 5 or not paths:
+            continue
+        old_sha, new_sha, status = parts[2], parts[3], parts[4]
+        # Deleted files are judged by the content they had
+        blob = old_sha if status.startswith("D") else new_sha
+        entries[paths[-1]] = (paths[0], None if blob == NULL_SHA else blob)
+
+    stats = _parse_numstat(output)
+    for stat in stats:
+        stat.old_path, stat.blob = entries.get(stat.path, (stat.path, None))
+    return stats
+
+
+def _exclude_pathspecs(stats: list[FileStat], excluded: dict[str, str]) -> list[str]:
+    """Pathspec arguments that keep excluded files out of a diff.
+
+    `git diff` can't read pathspecs from stdin, so they stop at
+    MAX_PATHSPEC_CHARS to stay far below the OS limit on arguments; files
+    beyond it are produced by git and dropped while parsing (_drop_excluded).
+    """
+    specs = []
+    size = 0
+    for stat in stats:
+        if stat.path not in excluded:
+            continue
+        paths = [stat.path] + ([stat.old_path] if stat.old_path and stat.old_path != stat.path else [])
+        entries = [f":(exclude,literal){path}" for path in paths]
+        size += sum(len(entry.encode("utf-8", "surrogateescape")) + 1 for entry in entries)
+        if size > MAX_PATHSPEC_CHARS:
+            break
+        specs.extend(entries)
+    return ["--", *specs] if specs else []
+
+
+def _drop_excluded(files: Iterable[FileDiff], excluded: dict[str, str]) -> Iterator[FileDiff]:
+    """Leave out excluded files that weren't already kept out by pathspec."""
+    return (file for file in files if file.path not in excluded)
+
+
+def _stream_git(repo: Repo, *args: str) -> Iterator[str]:
+    """Yield a git command's output line by line, straight from the pipe."""
+    proc = subprocess.Popen(
+        ["git", *args],
+        cwd=repo.working_dir,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    # newline="" keeps CRLF line endings in the diff intact
+    stdout = io.TextIOWrapper(proc.stdout, encoding="utf-8", errors="replace", newline="")
+    finished = False
+    try:
+        yield from stdout
+        finished = True
+    finally:
+        stdout.close()
+        stderr = proc.stderr.read()
+        proc.stderr.close()
+        # A consumer that stops early closes the pipe, which git reports as an error
+        if proc.wait() != 0 and finished:
+            from git.exc import GitCommandError
+
+            raise GitCommandError(["git", *args], proc.returncode, stderr.decode("utf-8", "replace"))
+
+
+def read_blobs(repo: Repo, shas: list[str]) -> Iterator[tuple[str, str | None]]:
+    """Read blob contents through one `git cat-file --batch` process.
+
+    Yields None for binary content.
+    """
+    proc = subprocess.Popen(
+        ["git", "cat-file", "--batch"],
+        cwd=repo.working_dir,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+    )
+    try:
+        for sha in shas:
+            proc.stdin.write(f"{sha}\n".encode())
+            proc.stdin.flush()
+            header = proc.stdout.readline().split()
+            if len(header) != 3:
+                yield sha, None
+                continue
+            data = proc.stdout.read(int(header[2]) + 1)[:-1]
+            yield sha, None if b"\0" in data[:8000] else data.decode("utf-8", "replace")
+    finally:
+        proc.stdin.close()
+        proc.stdout.close()
+        proc.wait()
+
+
+def get_max_diff_chars() -> int:
+    """Most diff text kept in memory per diff, from the `max_diff_mb` config key."""
+    from aigit.config import get_config
+
+    return int(float(get_config("max_diff_mb") or 4) * 1_000_000)
+
+
+def get_max_file_chars() -> int:
+    """Most diff text kept for a single file before it is truncated."""
+    # One vendored file shouldn't crowd every other file out of the budget
+    return get_max_diff_chars() // 8
+
+
+def _filtered_diff(repo: Repo, *args: str) -> tuple[list[FileStat], Iterator[FileDiff]]:
+    """Stat a diff, then stream its patch with excluded files left out.
+
+    Ignored and generated files are excluded by pathspec, so git never
+    produces their content; they follow the patch as one-line summaries.
+    """
+    from aigit.diff import iter_file_diffs
+    from aigit.services import filters
+
+    stats = _parse_diff_stat("".join(_stream_git(repo, *args, "--raw", "--numstat", "--no-abbrev")))
+    if not stats:
+        return stats, iter(())
+
+    excluded = filters.find_exclusions(repo, stats)
+    lines = _stream_git(repo, *args, "--patch", *_exclude_pathspecs(stats, excluded))
+    files = _drop_excluded(iter_file_diffs(lines, get_max_file_chars()), excluded)
+    return stats, chain(files, filters.summarize_exclusions(stats, excluded))
+
+
+def iter_diff(repo: Repo = None, *args: str) -> Iterator[FileDiff]:
+    """Parse `git diff <args>` into file diffs lazily, as git produces them.
+
+    Only one file is held at a time, and files larger than the memory
+    limit are truncated while reading.
+    """
+    repo = repo or get_repo()
+    yield from _filtered_diff(repo, "diff", *args)[1]
+
+
+def read_diff(files: Iterable[FileDiff]) -> str:
+    """Render streamed file diffs, keeping memory within `max_diff_mb`.
+
+    Small diffs come back unchanged. Past the limit, the least useful
+    files are reduced to one-line summaries as the stream is consumed.
+    """
+    from aigit.diff import compact_stream
+
+    return compact_stream(files, get_max_diff_chars())
+
+
+@metrics.timed("git")
+def _snapshot(repo: Repo, *args: str) -> DiffSnapshot:
+    """Get numstat and patch for a diff, streaming the patch."""
+    stats, files = _filtered_diff(repo, "diff", *args)
+    return DiffSnapshot(stats=stats, patch=read_diff(files))
+
+
+def get_staged_snapshot(repo: Repo = None) -> DiffSnapshot:
+    """Get numstat and patch of staged changes (memoized)."""
+    repo = repo or get_repo()
+    return _memoized(repo, "staged", lambda: _snapshot(repo, "--staged"))
+
+
+def get_unstaged_snapshot(repo: Repo = None) -> DiffSnapshot:
+    """Get numstat and patch of unstaged changes (memoized)."""
+    repo = repo or get_repo()
+    return _memoized(repo, "unstaged", lambda: _snapshot(repo))
+
+
+@metrics.timed("git")
+def get_status(repo: Repo = None) -> Status:
+    """Get staged and unstaged file names from one `git status` call (memoized)."""
+    repo = repo or get_repo()
+
+    def compute():
+        # Without optional locks, status doesn't refresh and rewrite the
+        # index, which would change its signature and drop this result
+        output = repo.git.status(
+            "--porcelain=v1",
+            "-z",
+            "--untracked-files=no",
+            strip_newline_in_stdout=False,
+            env={"GIT_OPTIONAL_LOCKS": "0"},
+        )
+        status = Status()
+        entries = iter(output.split("\0"))
+        for entry in entries:
+            if len(entry) < 4:
+                continue
+            index, worktree, path = entry[0], entry[1], entry[3:]
+            if index in "RC":
+                # Renames and copies are followed by the original path
+                next(entries, None)
+            if index not in " ?":
+                status.staged.append(path)
+            if worktree not in " ?":
+                status.unstaged.append(path)
+        return status
+
+    return _memoized(repo, "status", compute)
+
+
+@metrics.timed("git")
+def _diff_is_empty(repo: Repo, *args: str) -> bool:
+    """Check for an empty diff via `git diff --quiet`, without producing it."""
+    status, _, _ = repo.git.diff(
+        *args, "--quiet", with_extended_output=True, with_exceptions=False
+    )
+    return status == 0
 
 
 def get_staged_diff(repo: Repo = None) -> str:
     """Get the diff of staged changes."""
-    repo = repo or get_repo()
-    return repo.git.diff("--staged")
+    return get_staged_snapshot(repo).patch
 
 
 def get_unstaged_diff(repo: Repo = None) -> str:
     """Get the diff of unstaged changes."""
-    repo = repo or get_repo()
-    return repo.git.diff()
+    return get_unstaged_snapshot(repo).patch
 
 
+@metrics.timed("git")
 def get_all_diff(repo: Repo = None) -> str:
     """Get diff of all changes (staged + unstaged)."""
     repo = repo or get_repo()
-    staged = get_staged_diff(repo)
-    unstaged = get_unstaged_diff(repo)
-
-    if staged and unstaged:
-        return f"{staged}\n{unstaged}"
-    return staged or unstaged
+    return read_diff(chain(iter_diff(repo, "--staged"), iter_diff(repo)))
 
 
+@metrics.timed("git")
 def get_branch_diff(repo: Repo = None, base_branch: str = None) -> str:
     """Get diff between current branch and base branch."""
     repo = repo or get_repo()
     base = base_branch or get_default_branch(repo)
 
-    return repo.git.diff(f"{base}...HEAD")
+    return read_diff(iter_diff(repo, f"{base}...HEAD"))
 
 
+@metrics.timed("git")
 def get_commit_diff(repo: Repo = None, commit: str = "HEAD") -> str:
-    """Get diff for a specific commit."""
+    """Get diff for a specific commit (against its first parent for merges)."""
     repo = repo or get_repo()
-    return repo.git.show(commit, "--format=", "--patch")
+    _, files = _filtered_diff(repo, "show", commit, "--format=", "-m", "--first-parent")
+    return read_diff(files)
 
 
+def iter_commits(
+    repo: Repo = None,
+    rev_range: str = None,
+    since: str = None,
+    until: str = None,
+) -> Iterator[CommitInfo]:
+    """Stream commits oldest first from `git log` without buffering the output."""
+    repo = repo or get_repo()
+
+    args = ["git", "log", "--reverse", "--no-merges", "--format=%H%x1f%an%x1f%aI%x1f%s"]
+    if since:
+        args.append(f"--since={since}")
+    if until:
+        args.append(f"--until={until}")
+    args.append(rev_range or "HEAD")
+
+    proc = subprocess.Popen(
+        args,
+        cwd=repo.working_dir,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+    )
+    try:
+        for line in proc.stdout:
+            parts = line.rstrip("\n").split("\x1f", 3)
+            if len(parts) == 4:
+                yield CommitInfo(*parts)
+    finally:
+        proc.stdout.close()
+        stderr = proc.stderr.read()
+        proc.stderr.close()
+        if proc.wait() != 0 and stderr:
+            raise ValueError(f"git log failed: {stderr.strip()}")
+
+
+@metrics.timed("git")
 def get_default_branch(repo: Repo = None) -> str:
     """Detect the default branch (main or master)."""
     repo = repo or get_repo()
@@ -73,12 +499,14 @@ def get_default_branch(repo: Repo = None) -> str:
     return "main"  # Default assumption
 
 
+@metrics.timed("git")
 def get_current_branch(repo: Repo = None) -> str:
     """Get the current branch name."""
     repo = repo or get_repo()
     return repo.active_branch.name
 
 
+@metrics.timed("git")
 def get_changed_files(repo: Repo = None, base_branch: str = None) -> list[str]:
     """Get list of changed files compared to base branch."""
     repo = repo or get_repo()
@@ -93,24 +521,103 @@ def get_changed_files(repo: Repo = None, base_branch: str = None) -> list[str]:
 
 def get_staged_files(repo: Repo = None) -> list[str]:
     """Get list of staged files."""
-    repo = repo or get_repo()
-    output = repo.git.diff("--staged", "--name-only")
-    return [f for f in output.split("\n") if f]
+    return get_staged_snapshot(repo).files
 
 
 def stage_all(repo: Repo = None) -> None:
     """Stage all changes."""
     repo = repo or get_repo()
     repo.git.add("-A")
+    invalidate(repo)
 
 
 def commit(message: str, repo: Repo = None) -> str:
     """Create a commit with the given message."""
     repo = repo or get_repo()
     repo.git.commit("-m", message)
+    invalidate(repo)
     return repo.head.commit.hexsha[:7]
 
 
+def get_staged_patch(repo: Repo = None) -> tuple[str, dict[str, str]]:
+    """Get the complete staged patch, in a form `git apply` accepts.
+
+    Binary files are included, and nothing is left out. Also returns the
+    files prompts exclude (see filters.find_exclusions) with the reason.
+    Non-UTF-8 bytes survive as surrogate escapes, so the text can be
+    encoded back unchanged.
+    """
+    from aigit.services import filters
+
+    repo = repo or get_repo()
+    args = ("diff", "--cached", "-M", "--no-color", "--no-ext-diff")
+    stats = _parse_diff_stat("".join(_stream_git(repo, *args, "--raw", "--numstat", "--no-abbrev")))
+    excluded = filters.find_exclusions(repo, stats) if stats else {}
+
+    result = subprocess.run(
+        ["git", *args, "--binary", "--full-index", "--src-prefix=a/", "--dst-prefix=b/"],
+        cwd=repo.working_dir,
+        capture_output=True,
+        check=True,
+    )
+    return result.stdout.decode("utf-8", "surrogateescape"), excluded
+
+
+def write_tree(repo: Repo = None) -> str:
+    """Write the index as a tree and return its hash."""
+    repo = repo or get_repo()
+    return repo.git.write_tree()
+
+
+def read_tree(tree: str | None, repo: Repo = None) -> None:
+    """Replace the index with a tree (an empty index for None), keeping the working tree."""
+    repo = repo or get_repo()
+    if tree is None:
+        repo.git.read_tree("--empty")
+    else:
+        repo.git.read_tree(tree)
+    invalidate(repo)
+
+
+def apply_cached(patch: str, repo: Repo = None) -> None:
+    """Apply a patch to the index only, with `git apply --cached`."""
+    from git.exc import GitCommandError
+
+    repo = repo or get_repo()
+    args = ["git", "apply", "--cached", "--whitespace=nowarn", "-"]
+    result = subprocess.run(
+        args,
+        cwd=repo.working_dir,
+        input=patch.encode("utf-8", "surrogateescape"),
+        capture_output=True,
+    )
+    invalidate(repo)
+    if result.returncode != 0:
+        raise GitCommandError(args, result.returncode, result.stderr.decode("utf-8", "replace"))
+
+
+def get_head_sha(repo: Repo = None) -> str | None:
+    """Get the full SHA of HEAD, or None on an unborn branch."""
+    repo = repo or get_repo()
+    try:
+        return repo.git.rev_parse("--verify", "-q", "HEAD")
+    except Exception:
+        return None
+
+
+def reset_soft(sha: str | None, repo: Repo = None) -> None:
+    """Move the current branch back to a commit, keeping the index and working tree.
+
+    None makes the branch unborn again.
+    """
+    repo = repo or get_repo()
+    if sha is None:
+        repo.git.update_ref("-d", "HEAD")
+    else:
+        repo.git.reset("--soft", sha)
+    invalidate(repo)
+
+
 def create_branch(name: str, repo: Repo = None, checkout: bool = True) -> None:
     """Create a new branch."""
     repo = repo or get_repo()
@@ -119,24 +626,39 @@ def create_branch(name: str, repo: Repo = None, checkout: bool = True) -> None:
         repo.git.checkout("-b", name)
     else:
         repo.git.branch(name)
+    invalidate(repo)
 
 
 def has_staged_changes(repo: Repo = None) -> bool:
     """Check if there are staged changes."""
     repo = repo or get_repo()
-    return bool(get_staged_diff(repo))
+
+    known = _memoized_value(repo, "staged") or _memoized_value(repo, "status")
+    if known is not None:
+        return bool(known.patch if isinstance(known, DiffSnapshot) else known.staged)
+    return not _diff_is_empty(repo, "--staged")
 
 
 def has_unstaged_changes(repo: Repo = None) -> bool:
     """Check if there are unstaged changes."""
     repo = repo or get_repo()
-    return bool(get_unstaged_diff(repo))
+
+    known = _memoized_value(repo, "unstaged") or _memoized_value(repo, "status")
+    if known is not None:
+        return bool(known.patch if isinstance(known, DiffSnapshot) else known.unstaged)
+    return not _diff_is_empty(repo)
 
 
 def has_any_changes(repo: Repo = None) -> bool:
     """Check if there are any changes."""
+    status = get_status(repo)
+    return bool(status.staged or status.unstaged)
+
+
+def get_aigit_dir(repo: Repo = None) -> Path:
+    """Get the directory for aigit's per-repository state (inside .git)."""
     repo = repo or get_repo()
-    return has_staged_changes(repo) or has_unstaged_changes(repo)
+    return Path(repo.git_dir) / "aigit"
 
 
 def get_remote_url(repo: Repo = None) -> str | None:
@@ -171,13 +693,182 @@ def parse_github_url(url: str) -> tuple[str, str] | None:
     return None
 
 
-def push_branch(repo: Repo = None, set_upstream: bool = True) -> None:
+def _parse_push(output: str, branch: str, new_sha: str) -> PushResult:
+    """Read a ref update from `git push --porcelain` output.
+
+    The old SHA is abbreviated as git printed it.
+    """
+    for line in output.split("\n"):
+        parts = line.split("\t")
+        if len(parts) < 3 or not parts[1].endswith(f":refs/heads/{branch}"):
+            continue
+        flag, summary = parts[0], parts[2]
+        if flag == "*":
+            return PushResult(branch, created=True, old_sha=None, new_sha=new_sha)
+        if ".." in summary:
+            old = summary.split("..")[0].strip()
+            return PushResult(branch, created=False, old_sha=old, new_sha=new_sha)
+
+    # Already up to date
+    return PushResult(branch, created=False, old_sha=new_sha, new_sha=new_sha)
+
+
+def push_branch(repo: Repo = None, set_upstream: bool = True) -> PushResult:
     """Push the current branch to origin."""
     repo = repo or get_repo()
     branch = get_current_branch(repo)
 
     if set_upstream:
-        repo.git.push("-u", "origin", branch)
+        output = repo.git.push("--porcelain", "-u", "origin", branch)
+    else:
+        output = repo.git.push("--porcelain", "origin", branch)
+    invalidate(repo)
+
+    result = _parse_push(output, branch, repo.git.rev_parse(branch))
+    if result.old_sha and result.old_sha != result.new_sha:
+        result.old_sha = repo.git.rev_parse(result.old_sha)
+    return result
+
+
+def rollback_push(result: PushResult, repo: Repo = None) -> None:
+    """Undo a push: delete a newly created remote branch, or move it back.
+
+    Uses --force-with-lease, so the remote is only changed if it still
+    points at what we pushed.
+    """
+    repo = repo or get_repo()
+    if not result.changed:
+        return
+
+    ref = f"refs/heads/{result.branch}"
+    lease = f"--force-with-lease={ref}:{result.new_sha}"
+
+    if result.created:
+        repo.git.push(lease, "origin", f":{ref}")
+        try:
+            repo.git.branch("--unset-upstream", result.branch)
+        except Exception:
+            pass
+    else:
+        repo.git.push(lease, "origin", f"{result.old_sha}:{ref}")
+    invalidate(repo)
+
+
+# Async counterparts, run as asyncio subprocesses so the event loop never blocks
+
+
+async def _arun(repo: Repo, *args: str) -> str:
+    """Run a git command asynchronously and return its output."""
+    import asyncio
+
+    proc = await asyncio.create_subprocess_exec(
+        "git",
+        *args,
+        cwd=repo.working_dir,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stdout, stderr = await proc.communicate()
+
+    if proc.returncode != 0:
+        from git.exc import GitCommandError
+
+        raise GitCommandError(["git", *args], proc.returncode, stderr.decode("utf-8", "replace"))
+    # Match GitPython, which strips the trailing newline
+    return stdout.decode("utf-8", "replace").rstrip("\n")
+
+
+async def _afiltered_diff(repo: Repo, *args: str) -> str:
+    """Async counterpart of _filtered_diff(), returning the diff text."""
+    import asyncio
+
+    from aigit.services import filters
+
+    stats = _parse_diff_stat(await _arun(repo, *args, "--raw", "--numstat", "--no-abbrev"))
+    if not stats:
+        return ""
+
+    excluded = await asyncio.to_thread(filters.find_exclusions, repo, stats)
+    patch = await _arun(repo, *args, "--patch", *_exclude_pathspecs(stats, excluded))
+    if excluded:
+        from aigit.diff import parse_diff, render_diff
+
+        patch = render_diff(_drop_excluded(parse_diff(patch), excluded))
+    summaries = [file.summary for file in filters.summarize_exclusions(stats, excluded)]
+    return "\n".join(part for part in (patch, *summaries) if part)
+
+
+async def aget_staged_diff(repo: Repo = None) -> str:
+    """Async counterpart of get_staged_diff()."""
+    return await _afiltered_diff(repo or get_repo(), "diff", "--staged")
+
+
+async def aget_unstaged_diff(repo: Repo = None) -> str:
+    """Async counterpart of get_unstaged_diff()."""
+    return await _afiltered_diff(repo or get_repo(), "diff")
+
+
+async def aget_branch_diff(repo: Repo = None, base_branch: str = None) -> str:
+    """Async counterpart of get_branch_diff()."""
+    repo = repo or get_repo()
+    base = base_branch or await aget_default_branch(repo)
+    return await _afiltered_diff(repo, "diff", f"{base}...HEAD")
+
+
+async def aget_commit_diff(repo: Repo = None, commit: str = "HEAD") -> str:
+    """Async counterpart of get_commit_diff()."""
+    return await _afiltered_diff(repo or get_repo(), "show", commit, "--format=", "-m", "--first-parent")
+
+
+async def aget_default_branch(repo: Repo = None) -> str:
+    """Async counterpart of get_default_branch()."""
+    repo = repo or get_repo()
+
+    try:
+        remote_head = await _arun(repo, "symbolic-ref", "--short", "refs/remotes/origin/HEAD")
+        return remote_head.replace("origin/", "")
+    except Exception:
+        pass
+
+    output = await _arun(repo, "for-each-ref", "--format=%(refname:short)", "refs/heads", "refs/remotes")
+    branches = output.split("\n")
+    if "main" in branches or "origin/main" in branches:
+        return "main"
+    if "master" in branches or "origin/master" in branches:
+        return "master"
+
+    return "main"
+
+
+async def aget_current_branch(repo: Repo = None) -> str:
+    """Async counterpart of get_current_branch()."""
+    return await _arun(repo or get_repo(), "symbolic-ref", "--short", "HEAD")
+
+
+async def aget_changed_files(repo: Repo = None, base_branch: str = None) -> list[str]:
+    """Async counterpart of get_changed_files()."""
+    repo = repo or get_repo()
+    base = base_branch or await aget_default_branch(repo)
+
+    try:
+        output = await _arun(repo, "diff", "--name-only", f"{base}...HEAD")
+        return [f for f in output.split("\n") if f]
+    except Exception:
+        return []
+
+
+async def apush_branch(repo: Repo = None, set_upstream: bool = True) -> PushResult:
+    """Async counterpart of push_branch()."""
+    repo = repo or get_repo()
+    branch = await aget_current_branch(repo)
+
+    if set_upstream:
+        output = await _arun(repo, "push", "--porcelain", "-u", "origin", branch)
     else:
-        repo.git.push("origin", branch)
+        output = await _arun(repo, "push", "--porcelain", "origin", branch)
+    invalidate(repo)
 
+    result = _parse_push(output, branch, await _arun(repo, "rev-parse", branch))
+    if result.old_sha and result.old_sha != result.new_sha:
+        result.old_sha = await _arun(repo, "rev-parse", result.old_sha)
+    return result
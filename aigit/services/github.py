@@ -1,20 +1,59 @@
-"""GitHub service for PR operations."""
+"""GitHub service for PR operations.
 
-import webbrowser
+Functions prefixed with `a` are asyncio counterparts that call the REST
+API directly through a pooled async HTTP client.
+"""
 
-from github import Github
+import threading
+from typing import TYPE_CHECKING
 
-from aigit.config import get_github_token
+from aigit.config import get_config, get_github_token
 from aigit.services.git import get_repo, get_remote_url, parse_github_url
 
+if TYPE_CHECKING:
+    from github import Github
 
-def get_client() -> Github:
-    """Get GitHub client."""
-    return Github(get_github_token())
+GITHUB_API_URL = "https://api.github.com"
 
+_clients: dict[tuple, "Github"] = {}
+_clients_lock = threading.Lock()
 
-def get_github_repo(repo=None):
-    """Get the GitHub repository object."""
+
+def get_api_url() -> str:
+    """Get the GitHub API URL, e.g. for GitHub Enterprise Server."""
+    return (get_config("github_api_url") or GITHUB_API_URL).rstrip("/")
+
+
+def get_client() -> "Github":
+    """Get the process-wide GitHub client.
+
+    The client keeps a pooled requests session, so repeated API calls
+    reuse connections.
+    """
+    token = get_github_token()
+    base_url = get_api_url()
+    pool_size = int(get_config("http_pool_size") or 10)
+    timeout = int(get_config("http_timeout") or 60)
+    settings = (token, base_url, pool_size, timeout)
+
+    with _clients_lock:
+        client = _clients.get(settings)
+        if client is None:
+            from github import Auth, Github
+
+            client = Github(
+                auth=Auth.Token(token),
+                base_url=base_url,
+                pool_size=pool_size,
+                timeout=timeout,
+            )
+            _clients[settings] = client
+
+    return client
+
+
+def get_repo_slug(repo=None) -> str:
+    """Get the `owner/name` of the GitHub repository for origin."""
     repo = repo or get_repo()
     url = get_remote_url(repo)
 
@@ -26,9 +65,12 @@ def get_github_repo(repo=None):
         raise ValueError(f"Could not parse GitHub URL: {url}")
 
     owner, repo_name = parsed
-    client = get_client()
+    return f"{owner}/{repo_name}"
 
-    return client.get_repo(f"{owner}/{repo_name}")
+
+def get_github_repo(repo=None):
+    """Get the GitHub repository object."""
+    return get_client().get_repo(get_repo_slug(repo))
 
 
 def create_pull_request(
@@ -57,7 +99,43 @@ def create_pull_request(
     }
 
 
+async def acreate_pull_request(
+    title: str,
+    body: str,
+    head: str,
+    base: str,
+    draft: bool = False,
+    repo=None,
+) -> dict:
+    """Async counterpart of create_pull_request()."""
+    from aigit.services.http import get_async_http_client
+
+    response = await get_async_http_client("github").post(
+        f"{get_api_url()}/repos/{get_repo_slug(repo)}/pulls",
+        headers={
+            "Authorization": f"Bearer {get_github_token()}",
+            "Accept": "application/vnd.github+json",
+            "X-GitHub-Api-Version": "2022-11-28",
+        },
+        json={"title": title, "body": body, "head": head, "base": base, "draft": draft},
+    )
+
+    data = response.json() if response.content else {}
+    if response.status_code >= 400:
+        message = data.get("message") or response.reason_phrase
+        errors = "; ".join(e.get("message", "") for e in data.get("errors", []) if isinstance(e, dict))
+        raise ValueError(f"GitHub API error {response.status_code}: {message}" + (f" ({errors})" if errors else ""))
+
+    return {
+        "number": data["number"],
+        "url": data["html_url"],
+        "title": data["title"],
+    }
+
+
 def open_pr_in_browser(url: str) -> None:
     """Open a PR URL in the default browser."""
+    import webbrowser
+
     webbrowser.open(url)
 
@@ -0,0 +1,295 @@
+"""Git hooks that bring AI commit messages to plain `git commit`.
+
+The prepare-commit-msg hook fills in a generated message. With
+pre-generation, a post-index-change hook also starts a background job
+whenever the index changes; it generates the message for the staged tree
+ahead of time and stores it under .git/aigit/messages/, keyed by the
+tree's hash (`git write-tree`). When `git commit` runs, the hook finds the
+message already there.
+"""
+
+import json
+import os
+import shlex
+import shutil
+import sys
+import time
+from pathlib import Path
+
+from aigit.config import get_config
+from aigit.services import ai, git
+
+# First line of every hook aigit writes, so it never touches other hooks
+MARKER = "# Installed by aigit"
+
+PREPARE_HOOK = "prepare-commit-msg"
+PREGENERATE_HOOK = "post-index-change"
+
+# prepare-commit-msg sources where the user already chose a message:
+# -m/-F, merges, squashes, and amend/-c/-C
+SKIPPED_SOURCES = {"message", "merge", "squash", "commit"}
+
+# Pre-generation waits this long for staging to settle before generating
+PREGENERATE_DELAY = 1.5
+
+# How long the commit hook waits for a pre-generation already under way
+WAIT_TIMEOUT = 60.0
+
+# A lock older than this belongs to a job that died
+STALE_LOCK_SECONDS = 300
+
+# Everything below this line is cut from the message (`git commit -v`)
+SCISSORS = "------------------------ >8 ------------------------"
+
+# Pre-generated messages kept per repository
+MAX_MESSAGES = 20
+
+# Set while aigit runs from a hook. `git write-tree` can rewrite the index
+# (to store its cache-tree), which would fire post-index-change again from
+# inside the hook.
+HOOK_ENV = "AIGIT_IN_HOOK"
+
+
+def _aigit_command() -> str:
+    """Command line hooks use to run aigit, pinned to this installation if possible."""
+    path = shutil.which("aigit")
+    if path:
+        return shlex.quote(path)
+    return f"{shlex.quote(sys.executable)} -m aigit.client"
+
+
+def _scripts() -> dict[str, str]:
+    command = _aigit_command()
+    skipped = "|".join(sorted(SKIPPED_SOURCES))
+    return {
+        PREPARE_HOOK: (
+            f"#!/bin/sh\n{MARKER}: writes an AI-generated message for `git commit`.\n"
+            f'case "$2" in {skipped}) exit 0 ;; esac\n'
+            f'{HOOK_ENV}=1 {command} hook run "$1" "$2" || true\n'
+        ),
+        PREGENERATE_HOOK: (
+            f"#!/bin/sh\n{MARKER}: pre-generates the commit message when files are staged.\n"
+            f'[ -n "${HOOK_ENV}" ] && exit 0\n'
+            f"{HOOK_ENV}=1 {command} hook pregenerate >/dev/null 2>&1 </dev/null &\n"
+        ),
+    }
+
+
+def get_hooks_dir(repo=None) -> Path:
+    """Get the hooks directory, honoring core.hooksPath."""
+    repo = repo or git.get_repo()
+    path = repo.git.rev_parse("--git-path", "hooks")
+    return Path(repo.working_tree_dir or repo.git_dir, path)
+
+
+def _is_ours(path: Path) -> bool:
+    try:
+        return MARKER in path.read_text(encoding="utf-8", errors="replace").splitlines()[1]
+    except (OSError, IndexError):
+        return False
+
+
+def installed_hooks(repo=None) -> list[str]:
+    """Names of the aigit hooks installed in the repository."""
+    hooks_dir = get_hooks_dir(repo)
+    return [name for name in (PREPARE_HOOK, PREGENERATE_HOOK) if _is_ours(hooks_dir / name)]
+
+
+def install(repo=None, pregenerate: bool = False, force: bool = False) -> list[Path]:
+    """Write aigit's hooks; raises ValueError if another hook is in the way."""
+    hooks_dir = get_hooks_dir(repo)
+    scripts = _scripts()
+    names = [PREPARE_HOOK, PREGENERATE_HOOK] if pregenerate else [PREPARE_HOOK]
+
+    for name in names:
+        path = hooks_dir / name
+        if path.exists() and not _is_ours(path) and not force:
+            raise ValueError(f"{path} exists and wasn't installed by aigit (use --force to replace it)")
+
+    hooks_dir.mkdir(parents=True, exist_ok=True)
+    written = []
+    for name in names:
+        path = hooks_dir / name
+        path.write_text(scripts[name], encoding="utf-8")
+        path.chmod(0o755)
+        written.append(path)
+
+    # Switching pre-generation off removes its hook
+    if not pregenerate and _is_ours(hooks_dir / PREGENERATE_HOOK):
+        (hooks_dir / PREGENERATE_HOOK).unlink()
+    return written
+
+
+def uninstall(repo=None) -> list[Path]:
+    """Remove aigit's hooks, leaving any others alone."""
+    hooks_dir = get_hooks_dir(repo)
+    removed = []
+    for name in installed_hooks(repo):
+        path = hooks_dir / name
+        path.unlink()
+        removed.append(path)
+    clear_messages(repo)
+    return removed
+
+
+def _messages_dir(repo) -> Path:
+    return git.get_aigit_dir(repo) / "messages"
+
+
+def staged_tree(repo=None) -> str:
+    """Hash of the tree the staged changes would commit."""
+    return git.write_tree(repo)
+
+
+def _head_tree(repo) -> str | None:
+    try:
+        return repo.git.rev_parse("--verify", "-q", "HEAD^{tree}")
+    except Exception:
+        return None
+
+
+def _settings() -> dict:
+    """Config that shapes the message; a stored one is only used if it matches."""
+    return {"conventional": bool(get_config("conventional_commits")), "model": get_config("model")}
+
+
+def load_message(repo, tree: str) -> str | None:
+    """Get the pre-generated message for a tree, if it's current."""
+    try:
+        with open(_messages_dir(repo) / f"{tree}.json", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get("settings") != _settings():
+        return None
+    return data.get("message") or None
+
+
+def save_message(repo, tree: str, message: str) -> None:
+    """Store a generated message for a tree, keeping only the newest few."""
+    directory = _messages_dir(repo)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{tree}.json"
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"tree": tree, "settings": _settings(), "message": message}, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+    stored = sorted(directory.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for old in stored[MAX_MESSAGES:]:
+        old.unlink(missing_ok=True)
+
+
+def clear_messages(repo=None) -> int:
+    """Remove all pre-generated messages, returning how many there were."""
+    directory = _messages_dir(repo or git.get_repo())
+    if not directory.exists():
+        return 0
+    count = len(list(directory.glob("*.json")))
+    shutil.rmtree(directory, ignore_errors=True)
+    return count
+
+
+def _lock_path(repo, tree: str) -> Path:
+    return _messages_dir(repo) / f"{tree}.lock"
+
+
+def _acquire_lock(path: Path) -> bool:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        if time.time() - path.stat().st_mtime > STALE_LOCK_SECONDS:
+            path.unlink(missing_ok=True)
+    except OSError:
+        pass
+    try:
+        os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o600))
+    except FileExistsError:
+        return False
+    return True
+
+
+def _generate(repo) -> str:
+    diff = git.get_staged_diff(repo)
+    return ai.generate_commit_message(diff, get_config("conventional_commits"))
+
+
+def pregenerate(repo=None, delay: float = PREGENERATE_DELAY) -> str | None:
+    """Generate and store the message for the staged tree, unless it's already known.
+
+    Waits `delay` seconds first and gives up if the staged tree changed
+    meanwhile, so staging files one by one starts one request, not many.
+    """
+    repo = repo or git.get_repo()
+    tree = staged_tree(repo)
+    if tree == _head_tree(repo) or load_message(repo, tree) is not None:
+        return None
+
+    # Locked while waiting too, so a commit meanwhile waits for this job
+    lock = _lock_path(repo, tree)
+    if not _acquire_lock(lock):
+        return None
+    try:
+        if delay:
+            time.sleep(delay)
+            if staged_tree(repo) != tree:
+                return None
+        message = _generate(repo)
+        save_message(repo, tree, message)
+        return message
+    finally:
+        lock.unlink(missing_ok=True)
+
+
+def get_message(repo=None) -> tuple[str, bool]:
+    """Get the message for the staged changes: (message, pre-generated).
+
+    Uses the stored message when there is one, waits for a pre-generation
+    that's under way, and otherwise generates the message now.
+    """
+    repo = repo or git.get_repo()
+    tree = staged_tree(repo)
+
+    message = load_message(repo, tree)
+    if message is not None:
+        return message, True
+
+    lock = _lock_path(repo, tree)
+    deadline = time.monotonic() + WAIT_TIMEOUT
+    while lock.exists() and time.monotonic() < deadline:
+        time.sleep(0.1)
+        message = load_message(repo, tree)
+        if message is not None:
+            return message, True
+
+    message = _generate(repo)
+    save_message(repo, tree, message)
+    return message, False
+
+
+def _read(path: str) -> str:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+    except OSError:
+        return ""
+
+
+def _above_scissors(text: str) -> list[str]:
+    """Lines above the scissors line, below which `git commit -v` puts the diff."""
+    lines = text.splitlines()
+    for i, line in enumerate(lines):
+        if line[1:].strip() == SCISSORS:
+            return lines[:i]
+    return lines
+
+
+def has_message(path: str) -> bool:
+    """Check whether the message file already has text besides git's comments, e.g. a template."""
+    return any(line.strip() and not line.startswith("#") for line in _above_scissors(_read(path)))
+
+
+def write_message(path: str, message: str) -> None:
+    """Put the message above git's comments and scissors line in the message file."""
+    existing = _read(path).lstrip("\n")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(message.rstrip("\n") + "\n" + ("\n" + existing if existing.strip() else ""))
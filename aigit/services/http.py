@@ -0,0 +1,70 @@
+"""Pooled HTTP clients shared by the OpenAI and GitHub services."""
+
+import importlib.util
+import threading
+import weakref
+
+from aigit.config import get_config
+
+# Async clients are bound to the event loop that created them
+_async_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+_async_clients_lock = threading.Lock()
+
+
+def import_httpx():
+    try:
+        import httpx
+    except ImportError:  # recent openai releases depend on httpx2 instead
+        import httpx2 as httpx
+    return httpx
+
+
+def _client_options(httpx) -> dict:
+    pool_size = int(get_config("http_pool_size") or 10)
+    timeout = float(get_config("http_timeout") or 60)
+    http2 = bool(get_config("http2")) and importlib.util.find_spec("h2") is not None
+
+    return {
+        "limits": httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        "timeout": httpx.Timeout(timeout, connect=min(timeout, 10.0)),
+        "http2": http2,
+        "follow_redirects": True,
+    }
+
+
+def get_http_client():
+    """Build a pooled keep-alive HTTP client, using HTTP/2 when h2 is installed."""
+    httpx = import_httpx()
+    return httpx.Client(**_client_options(httpx))
+
+
+def get_async_http_client(name: str = "default"):
+    """Get a pooled async HTTP client for the running event loop.
+
+    One client per name is kept for each loop, so concurrent coroutines
+    share connections. Call aclose() before the loop ends to close them.
+    """
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    settings = (name, get_config("http_pool_size"), get_config("http_timeout"), get_config("http2"))
+
+    with _async_clients_lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(settings)
+        if client is None:
+            httpx = import_httpx()
+            client = httpx.AsyncClient(**_client_options(httpx))
+            clients[settings] = client
+
+    return client
+
+
+async def aclose() -> None:
+    """Close the async HTTP clients of the running event loop."""
+    import asyncio
+
+    with _async_clients_lock:
+        clients = _async_clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.aclose()
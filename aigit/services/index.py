@@ -0,0 +1,440 @@
+"""Semantic index of the repository, for adding related code to prompts.
+
+Source files at HEAD are split into chunks by function and class, embedded
+with the configured provider and stored under .git/aigit/index. Chunks are
+stored per blob SHA, so an update only embeds files whose content changed.
+"""
+
+import base64
+import json
+import os
+import re
+import shutil
+from array import array
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from aigit import metrics
+from aigit.config import get_config
+from aigit.diff import HUNK_HEADER_RE, get_signal_rank, parse_diff
+from aigit.services import ai, git
+
+INDEX_VERSION = 1
+
+# Files larger than this are skipped (usually generated or vendored)
+MAX_FILE_BYTES = 200_000
+
+# Definitions longer than this are split into windows of WINDOW_LINES
+MAX_CHUNK_LINES = 80
+WINDOW_LINES = 60
+
+# Text sent to the embedding model per chunk or query
+MAX_EMBED_CHARS = 6000
+
+# Hunks of a diff used as retrieval queries
+MAX_QUERY_HUNKS = 16
+
+# Chunks embedded per round while updating; ai.embed() runs the batches in parallel
+EMBED_ROUND_CHUNKS = 256
+
+# Top-level definitions in most languages (Python is parsed with ast)
+DEFINITION_RE = re.compile(
+    r"^(?:export\s+)?(?:default\s+)?(?:pub(?:\([^)]*\))?\s+)?(?:public\s+|private\s+|protected\s+)?"
+    r"(?:static\s+)?(?:async\s+)?(?:abstract\s+)?"
+    r"(?:def|class|function|func|fn|interface|struct|enum|impl|trait|type|module|object)\s+([A-Za-z_$][\w$]*)"
+)
+
+
+@dataclass
+class Chunk:
+    """A function, class or window of lines from one file."""
+
+    path: str
+    start: int
+    end: int
+    name: str
+    text: str
+    vector: array = field(default=None, repr=False)
+
+    @property
+    def location(self) -> str:
+        return f"{self.path}:{self.start}-{self.end}"
+
+
+@dataclass
+class IndexStats:
+    """Size of the index and what an update had to do."""
+
+    files: int = 0
+    chunks: int = 0
+    embedded_files: int = 0
+    embedded_chunks: int = 0
+    removed_files: int = 0
+
+
+def _windows(start: int, end: int, name: str) -> Iterator[tuple[int, int, str]]:
+    """Split lines start..end (1-based, inclusive) into bounded windows."""
+    if end - start + 1 <= MAX_CHUNK_LINES:
+        yield start, end, name
+        return
+    for i, window_start in enumerate(range(start, end + 1, WINDOW_LINES), 1):
+        yield window_start, min(window_start + WINDOW_LINES - 1, end), f"{name} (part {i})"
+
+
+def _python_spans(text: str) -> list[tuple[int, int, str]] | None:
+    import ast
+
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError):
+        return None
+
+    spans = []
+    for node in tree.body:
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            continue
+        start = _node_start(node)
+        end = node.end_lineno or node.lineno
+
+        # Split large classes by method
+        if isinstance(node, ast.ClassDef) and end - start + 1 > MAX_CHUNK_LINES:
+            methods = [n for n in node.body if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))]
+            if methods:
+                method_spans = [(_node_start(m), m.end_lineno or m.lineno, f"{node.name}.{m.name}") for m in methods]
+                if method_spans[0][0] > start:
+                    spans.append((start, method_spans[0][0] - 1, node.name))
+                spans.extend(method_spans)
+                continue
+        spans.append((start, end, node.name))
+    return spans
+
+
+def _node_start(node) -> int:
+    """First line of a definition, including its decorators."""
+    return min([node.lineno] + [d.lineno for d in node.decorator_list])
+
+
+def _generic_spans(lines: list[str]) -> list[tuple[int, int, str]]:
+    starts = []
+    for i, line in enumerate(lines, 1):
+        match = DEFINITION_RE.match(line)
+        if match:
+            starts.append((i, match.group(1)))
+
+    spans = []
+    for (start, name), (next_start, _) in zip(starts, starts[1:] + [(len(lines) + 1, "")]):
+        spans.append((start, next_start - 1, name))
+    return spans
+
+
+def chunk_file(path: str, text: str) -> list[Chunk]:
+    """Split a source file into chunks by top-level function and class."""
+    lines = text.splitlines()
+    if not lines:
+        return []
+
+    spans = _python_spans(text) if path.endswith(".py") else None
+    if spans is None:
+        spans = _generic_spans(lines)
+    if not spans:
+        spans = [(1, len(lines), path.rsplit("/", 1)[-1])]
+
+    chunks = []
+    for span_start, span_end, name in spans:
+        for start, end, part in _windows(span_start, span_end, name):
+            body = "\n".join(lines[start - 1 : end])
+            if body.strip():
+                chunks.append(Chunk(path=path, start=start, end=end, name=part, text=body))
+    return chunks
+
+
+def _embedding_input(chunk: Chunk) -> str:
+    return f"{chunk.path} {chunk.name}\n{chunk.text}"[:MAX_EMBED_CHARS]
+
+
+def _normalize(vector: list[float]) -> array:
+    norm = sum(x * x for x in vector) ** 0.5 or 1.0
+    return array("f", (x / norm for x in vector))
+
+
+def _encode_vector(vector: array) -> str:
+    return base64.b64encode(vector.tobytes()).decode("ascii")
+
+
+def _decode_vector(data: str) -> array:
+    vector = array("f")
+    vector.frombytes(base64.b64decode(data))
+    return vector
+
+
+def get_index_dir(repo=None) -> Path:
+    return git.get_aigit_dir(repo) / "index"
+
+
+def _blob_path(index_dir: Path, sha: str) -> Path:
+    return index_dir / "blobs" / sha[:2] / f"{sha}.json"
+
+
+def _identity() -> str:
+    from aigit.services.providers import get_provider
+
+    return f"{get_provider().identity()}:{get_config('embedding_model') or 'text-embedding-3-small'}"
+
+
+def _write_json(path: Path, data) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def load_manifest(repo=None) -> dict | None:
+    """Load the index manifest, or None if no index was built."""
+    try:
+        with open(get_index_dir(repo) / "manifest.json", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get("version") == INDEX_VERSION else None
+
+
+def list_indexable_files(repo) -> dict[str, str]:
+    """Map each indexable file at HEAD to its blob SHA, from one ls-tree call."""
+    try:
+        output = repo.git.ls_tree("-r", "-z", "-l", "--full-tree", "HEAD")
+    except Exception:
+        return {}  # No commits yet
+
+    files = {}
+    for entry in output.split("\0"):
+        meta, _, path = entry.partition("\t")
+        parts = meta.split()
+        if len(parts) != 4 or parts[1] != "blob" or parts[0] not in ("100644", "100755"):
+            continue
+        size = int(parts[3]) if parts[3].isdigit() else 0
+        if size and size <= MAX_FILE_BYTES and get_signal_rank(path) >= 2:
+            files[path] = parts[2]
+    return files
+
+
+def update_index(repo=None, on_progress: Callable[[int, int], None] = None) -> IndexStats:
+    """Bring the index up to date with HEAD, embedding only new blobs.
+
+    on_progress, if given, is called with (files done, files to embed).
+    """
+    repo = repo or git.get_repo()
+    index_dir = get_index_dir(repo)
+    identity = _identity()
+
+    manifest = load_manifest(repo)
+    if manifest is None or manifest.get("identity") != identity:
+        # New index, or vectors from another model: start over
+        shutil.rmtree(index_dir, ignore_errors=True)
+        manifest = {"files": {}, "chunks": {}}
+
+    files = list_indexable_files(repo)
+    stats = IndexStats(files=len(files))
+
+    paths = {}
+    for path, sha in files.items():
+        paths.setdefault(sha, path)
+    counts = {sha: n for sha, n in manifest.get("chunks", {}).items() if sha in paths}
+    pending = sorted(sha for sha in paths if not _blob_path(index_dir, sha).exists())
+
+    # Blobs stored by an interrupted update are reused, but need counting
+    for sha in paths:
+        if sha not in counts and sha not in pending:
+            counts[sha] = len(load_blob_chunks(repo, paths[sha], sha))
+
+    buffered: list[tuple[str, list[Chunk]]] = []
+    done = 0
+
+    def flush():
+        nonlocal done
+        chunks = [c for _, file_chunks in buffered for c in file_chunks]
+        vectors = iter(ai.embed([_embedding_input(c) for c in chunks]) if chunks else [])
+        for sha, file_chunks in buffered:
+            entries = [
+                {
+                    "name": c.name,
+                    "start": c.start,
+                    "end": c.end,
+                    "text": c.text,
+                    "vector": _encode_vector(_normalize(next(vectors))),
+                }
+                for c in file_chunks
+            ]
+            _write_json(_blob_path(index_dir, sha), entries)
+            counts[sha] = len(entries)
+            stats.embedded_files += 1
+            stats.embedded_chunks += len(entries)
+        done += len(buffered)
+        buffered.clear()
+        if on_progress:
+            on_progress(done, len(pending))
+
+    for sha, text in git.read_blobs(repo, pending):
+        buffered.append((sha, chunk_file(paths[sha], text) if text else []))
+        if sum(len(chunks) for _, chunks in buffered) >= EMBED_ROUND_CHUNKS:
+            flush()
+    if buffered:
+        flush()
+
+    # Drop blobs no longer referenced at HEAD
+    for sha in set(manifest["files"].values()) - set(paths):
+        try:
+            _blob_path(index_dir, sha).unlink()
+            stats.removed_files += 1
+        except OSError:
+            pass
+
+    _write_json(
+        index_dir / "manifest.json",
+        {
+            "version": INDEX_VERSION,
+            "identity": identity,
+            "head": repo.head.commit.hexsha,
+            "files": files,
+            "chunks": counts,
+        },
+    )
+    stats.chunks = sum(counts.get(sha, 0) for sha in files.values())
+    return stats
+
+
+def load_blob_chunks(repo, path: str, sha: str) -> list[Chunk]:
+    """Load the stored chunks of one blob, attributed to a path."""
+    try:
+        with open(_blob_path(get_index_dir(repo), sha), encoding="utf-8") as f:
+            entries = json.load(f)
+    except (OSError, ValueError):
+        return []
+
+    return [
+        Chunk(
+            path=path,
+            start=e["start"],
+            end=e["end"],
+            name=e["name"],
+            text=e["text"],
+            vector=_decode_vector(e["vector"]),
+        )
+        for e in entries
+    ]
+
+
+def load_chunks(repo=None) -> list[Chunk]:
+    """Load every chunk in the index."""
+    repo = repo or git.get_repo()
+    manifest = load_manifest(repo)
+    if manifest is None:
+        return []
+    return [c for path, sha in manifest["files"].items() for c in load_blob_chunks(repo, path, sha)]
+
+
+def _changed_ranges(diff: str) -> tuple[list[str], dict[str, list[tuple[int, int]]]]:
+    """Pick query hunks from a diff and collect the changed line ranges per file."""
+    queries = []
+    ranges: dict[str, list[tuple[int, int]]] = {}
+
+    hunks = []
+    for file in parse_diff(diff):
+        for hunk in file.hunks:
+            match = HUNK_HEADER_RE.match(hunk.header)
+            if match:
+                start = int(match.group(3))
+                count = int(match.group(4)) if match.group(4) is not None else 1
+                ranges.setdefault(file.path, []).append((start, start + max(count - 1, 0)))
+            hunks.append((hunk.additions + hunk.deletions, file.path, hunk))
+
+    # The largest hunks say the most about the change
+    for _, path, hunk in sorted(hunks, key=lambda h: -h[0])[:MAX_QUERY_HUNKS]:
+        queries.append(f"{path}\n{hunk.render()}"[:MAX_EMBED_CHARS])
+    return queries, ranges
+
+
+def _score(queries: list[array], chunks: list[Chunk]) -> list[float]:
+    """Best cosine similarity of each chunk to any query.
+
+    Uses numpy when installed; otherwise scores against the mean query,
+    which keeps pure-Python scoring to one pass over the index.
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        dims = len(queries[0])
+        mean = _normalize([sum(q[i] for q in queries) for i in range(dims)])
+        return [sum(a * b for a, b in zip(mean, c.vector)) for c in chunks]
+
+    matrix = np.frombuffer(b"".join(c.vector.tobytes() for c in chunks), dtype=np.float32)
+    matrix = matrix.reshape(len(chunks), -1)
+    query_matrix = np.array([list(q) for q in queries], dtype=np.float32)
+    return (query_matrix @ matrix.T).max(axis=0).tolist()
+
+
+def retrieve(diff: str, repo=None, top_k: int = None, max_tokens: int = None) -> list[Chunk]:
+    """Find the chunks most related to a diff, within a token budget.
+
+    Chunks overlapping the changed lines are skipped, since the diff
+    already shows them.
+    """
+    from aigit.tokens import count_tokens
+
+    top_k = top_k or int(get_config("context_top_k") or 8)
+    max_tokens = max_tokens or int(get_config("context_tokens") or 2000)
+
+    chunks = load_chunks(repo)
+    queries, ranges = _changed_ranges(diff)
+    if not chunks or not queries:
+        return []
+
+    def overlaps(chunk: Chunk) -> bool:
+        return any(start <= chunk.end and chunk.start <= end for start, end in ranges.get(chunk.path, []))
+
+    candidates = [c for c in chunks if not overlaps(c) and c.vector is not None]
+    if not candidates:
+        return []
+
+    query_vectors = [_normalize(v) for v in ai.embed(queries)]
+    scores = _score(query_vectors, candidates)
+    ranked = sorted(zip(scores, range(len(candidates))), reverse=True)
+
+    selected = []
+    used = 0
+    for _, i in ranked:
+        if len(selected) >= top_k:
+            break
+        size = count_tokens(candidates[i].text)
+        if used + size > max_tokens:
+            continue
+        selected.append(candidates[i])
+        used += size
+    return selected
+
+
+def format_context(chunks: list[Chunk]) -> str:
+    """Render retrieved chunks as fenced snippets."""
+    return "\n\n".join(f"{c.location} ({c.name}):\n```\n{c.text}\n```" for c in chunks)
+
+
+@metrics.timed("context")
+def get_related_context(diff: str, repo=None) -> str:
+    """Retrieve related code for a diff as prompt-ready text.
+
+    The index is brought up to date with HEAD first, which only embeds
+    files changed since the last update. Returns "" if no index was built.
+    """
+    repo = repo or git.get_repo()
+    manifest = load_manifest(repo)
+    if manifest is None:
+        return ""
+    if manifest.get("head") != repo.head.commit.hexsha:
+        update_index(repo)
+    return format_context(retrieve(diff, repo))
+
+
+def clear_index(repo=None) -> None:
+    """Delete the index."""
+    shutil.rmtree(get_index_dir(repo), ignore_errors=True)
@@ -0,0 +1,401 @@
+"""AI provider backends.
+
+Every backend implements complete() and stream() for a single user
+prompt, acomplete() for asyncio code and embed() for the semantic index.
+Select one with the `provider` config key. complete() and acomplete()
+take an optional JSON schema (see aigit.structured) for backends that can
+enforce it. chat() runs one turn of a conversation in which the model may
+call tools:
+
+- openai: the OpenAI API (default)
+- local: any OpenAI-compatible server, e.g. llama.cpp or Ollama, at `base_url`
+- stub: deterministic offline responses for tests and benchmarks
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from typing import TYPE_CHECKING
+
+from aigit import metrics
+from aigit.config import get_config, get_openai_api_key
+from aigit.services.http import get_async_http_client, get_http_client
+from aigit.services.ratelimit import get_scheduler
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI, OpenAI
+
+DEFAULT_LOCAL_BASE_URL = "http://localhost:11434/v1"
+
+# Dimensions of the stub provider's hashed bag-of-words embeddings
+STUB_EMBEDDING_DIMENSIONS = 256
+
+_clients: dict[tuple, "OpenAI"] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(base_url: str = None, api_key: str = None) -> "OpenAI":
+    """Get the process-wide OpenAI client for a base URL.
+
+    The client and its connection pool are reused by every generation in
+    the process, so connections stay alive between requests. Its own
+    retries are disabled; the rate-limit scheduler retries instead.
+    """
+    api_key = api_key or get_openai_api_key()
+    settings = (
+        base_url,
+        api_key,
+        get_config("http_pool_size"),
+        get_config("http_timeout"),
+        get_config("http2"),
+    )
+
+    with _clients_lock:
+        client = _clients.get(settings)
+        if client is None:
+            from openai import OpenAI
+
+            client = OpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                http_client=get_http_client(),
+                max_retries=0,
+            )
+            _clients[settings] = client
+
+    return client
+
+
+def get_async_client(base_url: str = None, api_key: str = None) -> "AsyncOpenAI":
+    """Get an AsyncOpenAI client for a base URL.
+
+    Clients share the running event loop's pooled HTTP client, so
+    connections are reused across coroutines.
+    """
+    from openai import AsyncOpenAI
+
+    return AsyncOpenAI(
+        api_key=api_key or get_openai_api_key(),
+        base_url=base_url,
+        http_client=get_async_http_client("openai"),
+        max_retries=0,
+    )
+
+
+class Provider(ABC):
+    """Base class for AI backends."""
+
+    name = "base"
+
+    def identity(self) -> str:
+        """Identify the backend for cache keys."""
+        return self.name
+
+    @abstractmethod
+    def complete(self, prompt: str, model: str, max_tokens: int, temperature: float, schema: dict = None) -> str:
+        """Generate a response to a single user prompt."""
+
+    def stream(self, prompt: str, model: str, max_tokens: int, temperature: float) -> Iterator[str]:
+        yield self.complete(prompt, model, max_tokens, temperature)
+
+    async def acomplete(
+        self, prompt: str, model: str, max_tokens: int, temperature: float, schema: dict = None
+    ) -> str:
+        import asyncio
+
+        return await asyncio.to_thread(self.complete, prompt, model, max_tokens, temperature, schema)
+
+    def chat(
+        self,
+        messages: list[dict],
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        tools: list[dict],
+        tool_choice: str = "auto",
+        schema: dict = None,
+    ) -> dict:
+        """Get the next assistant message, as a chat completions message dict.
+
+        Its `tool_calls` list the tools the model wants results from.
+        """
+        raise ValueError(f"The {self.name} provider does not support tool calls")
+
+    def embed(self, texts: list[str], model: str) -> list[list[float]]:
+        raise ValueError(f"The {self.name} provider does not support embeddings")
+
+
+class OpenAIProvider(Provider):
+    """The OpenAI chat completions API."""
+
+    name = "openai"
+    # Ask for token usage in the final chunk of a stream
+    stream_usage = True
+    # Enforce JSON schemas with response_format
+    json_schema = True
+
+    def get_client(self) -> "OpenAI":
+        return get_client()
+
+    def get_async_client(self) -> "AsyncOpenAI":
+        return get_async_client()
+
+    def _response_format(self, schema: dict = None) -> dict:
+        if not schema or not self.json_schema or not get_config("structured_outputs"):
+            return {}
+        return {"response_format": {"type": "json_schema", "json_schema": {**schema, "strict": True}}}
+
+    def complete(self, prompt: str, model: str, max_tokens: int, temperature: float, schema: dict = None) -> str:
+        # The raw response exposes the x-ratelimit-* headers for the scheduler
+        raw = self.get_client().chat.completions.with_raw_response.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=max_tokens,
+            temperature=temperature,
+            **self._response_format(schema),
+        )
+        get_scheduler().observe(raw.headers)
+        response = raw.parse()
+        metrics.observe_usage(response.usage)
+        return (response.choices[0].message.content or "").strip()
+
+    def stream(self, prompt: str, model: str, max_tokens: int, temperature: float) -> Iterator[str]:
+        raw = self.get_client().chat.completions.with_raw_response.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True,
+            **({"stream_options": {"include_usage": True}} if self.stream_usage else {}),
+        )
+        get_scheduler().observe(raw.headers)
+        stream = raw.parse()
+
+        try:
+            for chunk in stream:
+                if getattr(chunk, "usage", None):
+                    metrics.observe_usage(chunk.usage)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            stream.close()
+
+    async def acomplete(
+        self, prompt: str, model: str, max_tokens: int, temperature: float, schema: dict = None
+    ) -> str:
+        raw = await self.get_async_client().chat.completions.with_raw_response.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=max_tokens,
+            temperature=temperature,
+            **self._response_format(schema),
+        )
+        get_scheduler().observe(raw.headers)
+        response = raw.parse()
+        metrics.observe_usage(response.usage)
+        return (response.choices[0].message.content or "").strip()
+
+    def chat(
+        self,
+        messages: list[dict],
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        tools: list[dict],
+        tool_choice: str = "auto",
+        schema: dict = None,
+    ) -> dict:
+        raw = self.get_client().chat.completions.with_raw_response.create(
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            tools=tools,
+            tool_choice=tool_choice,
+            **self._response_format(schema),
+        )
+        get_scheduler().observe(raw.headers)
+        response = raw.parse()
+        metrics.observe_usage(response.usage)
+        message = response.choices[0].message
+        return {
+            "role": "assistant",
+            "content": message.content or "",
+            "tool_calls": [
+                {
+                    "id": call.id,
+                    "type": "function",
+                    "function": {"name": call.function.name, "arguments": call.function.arguments},
+                }
+                for call in message.tool_calls or []
+            ],
+        }
+
+    def embed(self, texts: list[str], model: str) -> list[list[float]]:
+        raw = self.get_client().embeddings.with_raw_response.create(model=model, input=texts)
+        get_scheduler().observe(raw.headers)
+        response = raw.parse()
+        metrics.observe_usage(response.usage)
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+
+class LocalProvider(OpenAIProvider):
+    """An OpenAI-compatible server such as llama.cpp or Ollama."""
+
+    name = "local"
+    # Not every OpenAI-compatible server accepts stream_options or
+    # json_schema response formats; prompts ask for JSON and it's repaired locally
+    stream_usage = False
+    json_schema = False
+
+    def __init__(self, base_url: str = None):
+        self.base_url = base_url or DEFAULT_LOCAL_BASE_URL
+
+    def identity(self) -> str:
+        return f"{self.name}:{self.base_url}"
+
+    def _api_key(self) -> str:
+        # Local servers usually ignore the key, but the client requires one
+        return os.environ.get("OPENAI_API_KEY") or get_config("openai_api_key") or "local"
+
+    def get_client(self) -> "OpenAI":
+        return get_client(base_url=self.base_url, api_key=self._api_key())
+
+    def get_async_client(self) -> "AsyncOpenAI":
+        return get_async_client(base_url=self.base_url, api_key=self._api_key())
+
+
+class StubProvider(Provider):
+    """Deterministic offline responses shaped like each prompt's expected format.
+
+    Responses depend only on the prompt, so runs are reproducible. Set
+    `stub_latency_ms` to simulate network latency.
+    """
+
+    name = "stub"
+
+    def complete(self, prompt: str, model: str, max_tokens: int, temperature: float, schema: dict = None) -> str:
+        latency = int(get_config("stub_latency_ms") or 0)
+        if latency:
+            time.sleep(latency / 1000)
+        return self.respond(prompt)
+
+    async def acomplete(
+        self, prompt: str, model: str, max_tokens: int, temperature: float, schema: dict = None
+    ) -> str:
+        import asyncio
+
+        latency = int(get_config("stub_latency_ms") or 0)
+        if latency:
+            await asyncio.sleep(latency / 1000)
+        return self.respond(prompt)
+
+    def stream(self, prompt: str, model: str, max_tokens: int, temperature: float) -> Iterator[str]:
+        text = self.complete(prompt, model, max_tokens, temperature)
+        for word in re.split(r"(?<=\s)", text):
+            yield word
+
+    def chat(
+        self,
+        messages: list[dict],
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        tools: list[dict],
+        tool_choice: str = "auto",
+        schema: dict = None,
+    ) -> dict:
+        """Read the three most changed files listed in the prompt, then answer."""
+        text = "\n".join(message.get("content") or "" for message in messages)
+        latency = int(get_config("stub_latency_ms") or 0)
+        if latency:
+            time.sleep(latency / 1000)
+
+        names = {tool["function"]["name"] for tool in tools}
+        read = any(message["role"] == "tool" for message in messages)
+        paths = re.findall(r"^(?:\d+|-)\t(?:\d+|-)\t(\S+)$", messages[0]["content"], re.M)[:3]
+        if tool_choice != "none" and "get_file_diff" in names and not read and paths:
+            calls = [
+                {
+                    "id": f"call_{i}",
+                    "type": "function",
+                    "function": {"name": "get_file_diff", "arguments": json.dumps({"path": path})},
+                }
+                for i, path in enumerate(paths, 1)
+            ]
+            return {"role": "assistant", "content": "", "tool_calls": calls}
+        return {"role": "assistant", "content": self.respond(text), "tool_calls": []}
+
+    def embed(self, texts: list[str], model: str) -> list[list[float]]:
+        """Hashed bag-of-words vectors: texts sharing identifiers score as similar."""
+        vectors = []
+        for text in texts:
+            vector = [0.0] * STUB_EMBEDDING_DIMENSIONS
+            for word in re.findall(r"[a-z0-9]+", text.lower().replace("_", " ")):
+                digest = hashlib.sha1(word.encode("utf-8")).digest()
+                vector[int.from_bytes(digest[:4], "big") % STUB_EMBEDDING_DIMENSIONS] += 1.0
+            vectors.append(vector)
+        return vectors
+
+    def respond(self, prompt: str) -> str:
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+        files = list(dict.fromkeys(re.findall(r"^diff --git a/\S+ b/(\S+)$", prompt, re.M)))
+        subject = files[0] if files else "changes"
+        file_list = "\n".join(f"- Update {f}" for f in files[:5]) or "- Update code"
+
+        if '"findings"' in prompt:
+            findings = [
+                {"severity": "INFO", "path": f, "line": 1, "issue": f"Stub finding {digest}", "suggestion": "No action needed"}
+                for f in files
+            ]
+            return json.dumps({"findings": findings})
+        if '"title"' in prompt:
+            return json.dumps({"title": f"Update {subject} ({digest})", "description": f"## Summary\n{file_list}"})
+        if "branch name" in prompt:
+            return json.dumps({"name": f"feature/stub-{digest}"})
+        if "## Key Changes" in prompt:
+            return f"## Summary\nStub explanation {digest}.\n\n## Key Changes\n{file_list}"
+        if "=== Commit 1 ===" in prompt:
+            groups = re.split(r"^=== Commit \d+ ===$", prompt, flags=re.M)[1:]
+            messages = []
+            for i, group in enumerate(groups, 1):
+                paths = re.findall(r"^diff --git a/\S+ b/(\S+)$", group, re.M)
+                messages.append(f"=== Commit {i} ===\nchore: update {paths[0] if paths else 'changes'}\n\nStub message {digest}-{i}.")
+            return "\n\n".join(messages)
+        if "commit message" in prompt:
+            return f"chore: update {subject}\n\nStub message {digest}."
+        return f"{file_list}\n- Stub response {digest}"
+
+
+_providers: dict[tuple, Provider] = {}
+
+
+def get_provider() -> Provider:
+    """Get the configured AI provider."""
+    name = (get_config("provider") or "openai").lower()
+    base_url = get_config("base_url") or None
+    settings = (name, base_url)
+
+    provider = _providers.get(settings)
+    if provider is not None:
+        return provider
+
+    if name == "openai":
+        provider = OpenAIProvider()
+    elif name == "local":
+        provider = LocalProvider(base_url)
+    elif name == "stub":
+        provider = StubProvider()
+    else:
+        raise ValueError(
+            f"Unknown provider: {name}\n"
+            "Set it with: aigit config set provider <openai|local|stub>"
+        )
+
+    _providers[settings] = provider
+    return provider
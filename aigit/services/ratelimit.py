@@ -0,0 +1,294 @@
+"""Rate-limit-aware scheduling for AI requests.
+
+Requests are admitted through two token buckets, requests per minute and
+tokens per minute. Their limits come from the `rpm_limit` and `tpm_limit`
+config keys, or are learned from the API's x-ratelimit-* response
+headers. 429 and 5xx responses and connection errors are retried with
+jittered exponential backoff.
+"""
+
+import random
+import re
+import threading
+import time
+from collections.abc import Awaitable, Callable, Iterator
+from dataclasses import dataclass
+
+from aigit.config import get_config
+
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 30.0
+RETRY_STATUS_CODES = (408, 409, 429, 500, 502, 503, 504)
+
+DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_duration(value: str) -> float | None:
+    """Parse a header duration such as "20ms", "1s" or "6m0s" into seconds."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = DURATION_RE.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def _header_int(headers, name: str) -> int | None:
+    try:
+        return int(headers.get(name))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """A bucket refilled continuously at `capacity` units per minute.
+
+    A capacity of 0 means no limit is known, so everything is admitted.
+    """
+
+    def __init__(self, capacity: int = 0):
+        self.capacity = capacity
+        self.level = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        rate = self.capacity / 60
+        self.level = min(self.capacity, self.level + (now - self.updated) * rate)
+        self.updated = now
+
+    def reserve(self, amount: int, now: float) -> float:
+        """Take `amount` units and return how long to wait before using them."""
+        if self.capacity <= 0:
+            return 0.0
+        self._refill(now)
+        # Reserving into debt keeps waiters in arrival order
+        self.level -= min(amount, self.capacity)
+        return max(0.0, -self.level / (self.capacity / 60))
+
+    def observe(self, limit: int | None, remaining: int | None, now: float) -> None:
+        """Sync with the server's view of this limit."""
+        if limit:
+            if self.capacity <= 0:
+                self.level = float(limit)
+            self.capacity = limit
+        if remaining is not None and self.capacity > 0:
+            self._refill(now)
+            self.level = min(self.level, remaining)
+
+
+@dataclass
+class SchedulerStats:
+    """Throttling and retry counts for one run."""
+
+    requests: int = 0
+    throttled: int = 0
+    wait_seconds: float = 0.0
+    rate_limited: int = 0
+    server_errors: int = 0
+    retries: int = 0
+
+    def summary(self) -> str:
+        parts = []
+        if self.throttled:
+            parts.append(f"{self.throttled} of {self.requests} requests throttled for {self.wait_seconds:.1f}s")
+        if self.retries:
+            parts.append(
+                f"{self.retries} retries ({self.rate_limited} rate-limited, "
+                f"{self.server_errors} server or connection errors)"
+            )
+        return ", ".join(parts)
+
+
+def _status_code(error: Exception) -> int | None:
+    return getattr(error, "status_code", None)
+
+
+def is_retryable(error: Exception) -> bool:
+    """Check whether a request error is worth retrying."""
+    if _status_code(error) in RETRY_STATUS_CODES:
+        return True
+    try:
+        from openai import APIConnectionError
+    except ImportError:
+        return False
+    return isinstance(error, APIConnectionError)
+
+
+def retry_delay(attempt: int, error: Exception) -> float:
+    """Backoff before retry number `attempt`, honoring Retry-After if sent."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+
+    retry_after = headers.get("retry-after-ms")
+    if retry_after:
+        delay = parse_duration(retry_after + "ms")
+    else:
+        delay = parse_duration(headers.get("retry-after", ""))
+    if delay is not None:
+        return min(delay, RETRY_MAX_DELAY)
+
+    # Full jitter spreads out retries from parallel aigit processes
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2**attempt))
+
+
+class Scheduler:
+    """Admits requests through RPM/TPM buckets and retries transient failures."""
+
+    def __init__(self, rpm: int = 0, tpm: int = 0, max_retries: int = 5):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_retries = max_retries
+        self.stats = SchedulerStats()
+        self._lock = threading.Lock()
+
+    def _reserve(self, cost: int) -> float:
+        with self._lock:
+            now = time.monotonic()
+            wait = max(self.requests.reserve(1, now), self.tokens.reserve(cost, now))
+            self.stats.requests += 1
+            if wait > 0:
+                self.stats.throttled += 1
+                self.stats.wait_seconds += wait
+        return wait
+
+    def admit(self, cost: int) -> None:
+        """Block until one request of `cost` tokens fits within the limits."""
+        wait = self._reserve(cost)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aadmit(self, cost: int) -> None:
+        """Like admit(), without blocking the event loop."""
+        import asyncio
+
+        wait = self._reserve(cost)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def observe(self, headers) -> None:
+        """Update the buckets from x-ratelimit-* response headers."""
+        if not headers:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self.requests.observe(
+                _header_int(headers, "x-ratelimit-limit-requests"),
+                _header_int(headers, "x-ratelimit-remaining-requests"),
+                now,
+            )
+            self.tokens.observe(
+                _header_int(headers, "x-ratelimit-limit-tokens"),
+                _header_int(headers, "x-ratelimit-remaining-tokens"),
+                now,
+            )
+
+    def _retry_delay(self, attempt: int, error: Exception) -> float | None:
+        """Record a retry and return its backoff, or None to give up."""
+        if attempt >= self.max_retries or not is_retryable(error):
+            return None
+
+        response = getattr(error, "response", None)
+        self.observe(getattr(response, "headers", None))
+        with self._lock:
+            self.stats.retries += 1
+            if _status_code(error) == 429:
+                self.stats.rate_limited += 1
+            else:
+                self.stats.server_errors += 1
+        return retry_delay(attempt, error)
+
+    def _should_retry(self, attempt: int, error: Exception) -> bool:
+        delay = self._retry_delay(attempt, error)
+        if delay is None:
+            return False
+        time.sleep(delay)
+        return True
+
+    def call(self, request: Callable[[], str], cost: int) -> str:
+        """Run a request once admitted, retrying transient failures."""
+        attempt = 0
+        while True:
+            self.admit(cost)
+            try:
+                return request()
+            except Exception as e:
+                if not self._should_retry(attempt, e):
+                    raise
+                attempt += 1
+
+    async def acall(self, request: Callable[[], Awaitable[str]], cost: int) -> str:
+        """Like call(), for a coroutine request."""
+        import asyncio
+
+        attempt = 0
+        while True:
+            await self.aadmit(cost)
+            try:
+                return await request()
+            except Exception as e:
+                delay = self._retry_delay(attempt, e)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    def stream(self, request: Callable[[], Iterator[str]], cost: int) -> Iterator[str]:
+        """Like call(), for a streamed response.
+
+        Failures are retried only until the first chunk arrives, so text
+        already yielded is never repeated.
+        """
+        attempt = 0
+        while True:
+            self.admit(cost)
+            try:
+                chunks = iter(request())
+                first = next(chunks, None)
+                break
+            except Exception as e:
+                if not self._should_retry(attempt, e):
+                    raise
+                attempt += 1
+
+        if first is not None:
+            yield first
+            yield from chunks
+
+
+_scheduler: Scheduler | None = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> Scheduler:
+    """Get the process-wide scheduler shared by all AI requests."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = Scheduler(
+                rpm=int(get_config("rpm_limit") or 0),
+                tpm=int(get_config("tpm_limit") or 0),
+                max_retries=max(int(get_config("max_retries") or 0), 0),
+            )
+    return _scheduler
+
+
+def reset_stats() -> None:
+    """Start counting throttling stats afresh, keeping the scheduler's limits."""
+    if _scheduler is not None:
+        _scheduler.stats = SchedulerStats()
+
+
+def report() -> None:
+    """Print throttling stats to stderr if any request was delayed or retried."""
+    if _scheduler is None:
+        return
+    summary = _scheduler.stats.summary()
+    if summary:
+        from rich.console import Console
+
+        Console(stderr=True).print(f"[dim]Rate limits: {summary}[/dim]")
@@ -0,0 +1,354 @@
+"""Code review engine: incremental per-hunk review of file groups in parallel."""
+
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from aigit import cache, structured
+from aigit.config import get_config
+from aigit.diff import HUNK_HEADER_RE, FileDiff, Hunk, pack_files, parse_diff, render_diff
+from aigit.services import ai, git
+
+SEVERITIES = ("CRITICAL", "WARNING", "INFO")
+
+# SEVERITY | path:line | issue | suggestion (suggestion optional)
+FINDING_RE = re.compile(
+    r"^\W*(CRITICAL|WARNING|INFO)\W*\|\s*([^|]*?)\s*\|\s*([^|]+?)\s*(?:\|\s*(.*?)\s*)?$",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class Finding:
+    """A single review finding anchored to a file and line."""
+
+    severity: str
+    path: str
+    line: int | None
+    issue: str
+    suggestion: str = ""
+
+    @property
+    def anchor(self) -> str:
+        return f"{self.path}:{self.line}" if self.line else self.path
+
+    def dedupe_key(self) -> tuple:
+        words = re.findall(r"[a-z0-9]+", self.issue.lower())
+        return (self.path, self.line, " ".join(words))
+
+
+def get_group_budget() -> int:
+    """Token budget for each group of files reviewed in one request."""
+    from aigit.tokens import get_diff_budget
+
+    configured = int(get_config("review_group_tokens") or 0)
+    budget = get_diff_budget()
+    return min(configured, budget) if configured > 0 else budget
+
+
+def _anchor_path(path: str, files: list[str]) -> str:
+    # Anchor to a reviewed file if the model shortened the path
+    if path not in files:
+        path = next((f for f in files if f.endswith(path) or path.endswith(f)), path)
+    return path
+
+
+def parse_findings(text: str, files: list[str]) -> list[Finding]:
+    """Parse findings from a JSON response, or from `SEVERITY | path:line | issue | suggestion` lines."""
+    data = structured.parse(text, structured.REVIEW_SCHEMA)
+    if data is not None:
+        findings = []
+        for item in data["findings"]:
+            if not item["issue"]:
+                continue
+            # Models sometimes put the line in the path (path:line)
+            path, _, line_no = item["path"].strip("`").rpartition(":")
+            if not path or not line_no.isdigit():
+                path, line_no = item["path"].strip("`"), ""
+            findings.append(
+                Finding(
+                    severity=item["severity"],
+                    path=_anchor_path(path, files),
+                    line=item["line"] or (int(line_no) if line_no else None),
+                    issue=item["issue"],
+                    suggestion=item["suggestion"],
+                )
+            )
+        return findings
+
+    findings = []
+    for line in text.splitlines():
+        match = FINDING_RE.match(line.strip())
+        if not match:
+            continue
+
+        severity, location, issue, suggestion = match.groups()
+        path, _, line_no = location.strip("`").rpartition(":")
+        if not path or not line_no.strip().isdigit():
+            path, line_no = location.strip("`"), ""
+
+        findings.append(
+            Finding(
+                severity=severity.upper(),
+                path=_anchor_path(path, files),
+                line=int(line_no) if line_no.strip().isdigit() else None,
+                issue=issue.strip(),
+                suggestion=(suggestion or "").strip(),
+            )
+        )
+
+    return findings
+
+
+def merge_findings(findings: list[Finding]) -> list[Finding]:
+    """Drop duplicate findings and order by severity, file and line."""
+    unique = {}
+    for finding in findings:
+        unique.setdefault(finding.dedupe_key(), finding)
+
+    return sorted(
+        unique.values(),
+        key=lambda f: (SEVERITIES.index(f.severity), f.path, f.line or 0),
+    )
+
+
+def _count(n: int, noun: str) -> str:
+    return f"{n} {noun}" if n == 1 else f"{n} {noun}s"
+
+
+def format_report(findings: list[Finding], files_reviewed: int) -> str:
+    """Render findings as a Markdown report grouped by file."""
+    if not findings:
+        return f"No issues found in {_count(files_reviewed, 'file')}."
+
+    counts = ", ".join(
+        f"{sum(1 for f in findings if f.severity == s)} {s.lower()}"
+        for s in SEVERITIES
+        if any(f.severity == s for f in findings)
+    )
+    lines = [f"**{_count(len(findings), 'finding')}** ({counts}) in {_count(files_reviewed, 'file')}", ""]
+
+    # Files appear in order of their most severe finding
+    by_file: dict[str, list[Finding]] = {}
+    for finding in findings:
+        by_file.setdefault(finding.path, []).append(finding)
+
+    for path, file_findings in by_file.items():
+        lines.append(f"### {path}")
+        for f in file_findings:
+            lines.append(f"- **{f.severity}** `{f.anchor}`: {f.issue}")
+            if f.suggestion:
+                lines.append(f"  - Suggestion: {f.suggestion}")
+        lines.append("")
+
+    return "\n".join(lines).strip()
+
+
+@dataclass
+class HunkRef:
+    """A reviewable unit: one hunk (or a hunk-less file change) and its cache key."""
+
+    key: str
+    file: FileDiff
+    hunk: Hunk | None
+    start: int
+    end: int
+
+    def contains(self, line: int) -> bool:
+        return self.start <= line <= self.end
+
+
+@dataclass
+class ReviewResult:
+    """Merged findings plus how much of the diff was served from the hunk store."""
+
+    findings: list[Finding] = field(default_factory=list)
+    files: int = 0
+    cached_hunks: int = 0
+    reviewed_hunks: int = 0
+    groups: int = 0
+    groups_done: int = 0
+
+    @property
+    def done(self) -> bool:
+        return self.groups_done >= self.groups
+
+
+def _hunk_range(hunk: Hunk) -> tuple[int, int]:
+    match = HUNK_HEADER_RE.match(hunk.header)
+    if not match:
+        return 0, 0
+    start = int(match.group(3))
+    count = int(match.group(4)) if match.group(4) is not None else 1
+    return start, start + max(count - 1, 0)
+
+
+def hunk_key(file: FileDiff, hunk: Hunk | None, identity: str) -> str:
+    """Hash a hunk's path and normalized content (line numbers excluded)."""
+    if hunk is None:
+        body = [line for line in file.header if not line.startswith("index ")]
+    else:
+        body = [line.rstrip() for line in hunk.lines]
+
+    digest = hashlib.sha256()
+    for part in (identity, file.path, *body):
+        digest.update(part.encode("utf-8", "replace"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def get_hunk_refs(files: list[FileDiff], identity: str) -> list[HunkRef]:
+    """Split file diffs into keyed hunk references."""
+    refs = []
+    for file in files:
+        if not file.hunks:
+            refs.append(HunkRef(hunk_key(file, None, identity), file, None, 0, 0))
+        for hunk in file.hunks:
+            start, end = _hunk_range(hunk)
+            refs.append(HunkRef(hunk_key(file, hunk, identity), file, hunk, start, end))
+    return refs
+
+
+def _store_path(key: str) -> Path:
+    return git.get_aigit_dir() / "review" / key[:2] / f"{key}.json"
+
+
+def load_hunk_findings(ref: HunkRef) -> list[Finding] | None:
+    """Load stored findings for a hunk, rebased to its current position."""
+    try:
+        with open(_store_path(ref.key), encoding="utf-8") as f:
+            entries = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    # Mark as recently used, so pruning evicts stale hunks first
+    try:
+        os.utime(_store_path(ref.key))
+    except OSError:
+        pass
+
+    findings = []
+    for entry in entries:
+        offset = entry.pop("offset", None)
+        line = ref.start + offset if offset is not None and ref.hunk is not None else None
+        findings.append(Finding(path=ref.file.path, line=line, **entry))
+    return findings
+
+
+def save_hunk_findings(ref: HunkRef, findings: list[Finding]) -> None:
+    """Store findings for a hunk, with lines relative to the hunk start."""
+    entries = [
+        {
+            "severity": f.severity,
+            "issue": f.issue,
+            "suggestion": f.suggestion,
+            "offset": f.line - ref.start if f.line is not None and ref.hunk is not None else None,
+        }
+        for f in findings
+    ]
+
+    path = _store_path(ref.key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(entries, f)
+    os.replace(tmp, path)
+
+    # Bounded by the same age and size limits as the response cache
+    cache.track_write(path.parents[1], path)
+
+
+def assign_findings(findings: list[Finding], refs: list[HunkRef]) -> dict[str, list[Finding]]:
+    """Attribute findings to the hunks they refer to, by file and line."""
+    assigned = {ref.key: [] for ref in refs}
+
+    for finding in findings:
+        candidates = [ref for ref in refs if ref.file.path == finding.path] or refs
+        ref = next((r for r in candidates if finding.line and r.contains(finding.line)), None)
+        if ref is None:
+            # Nearest hunk in the file, or the first one if there is no line
+            line = finding.line or 0
+            ref = min(candidates, key=lambda r: min(abs(r.start - line), abs(r.end - line)))
+        assigned[ref.key].append(finding)
+
+    return assigned
+
+
+def review_group(group: list[FileDiff]) -> list[Finding]:
+    """Review one group of file diffs."""
+    from aigit.prompts import get_file_review_prompt
+
+    files = list(dict.fromkeys(f.path for f in group))
+    diff = render_diff(group)
+    prompt = get_file_review_prompt(diff, files, ai.get_related_context(diff))
+    response = ai.generate(prompt, max_tokens=1024, schema=structured.REVIEW_SCHEMA)
+    return parse_findings(response, files)
+
+
+def review_diff(diff: str, on_update=None) -> ReviewResult:
+    """Review a diff incrementally and return merged findings.
+
+    Each hunk is keyed by a hash of its path and content. Hunks with stored
+    findings under .git/aigit/review are not sent to the model again; the
+    rest are packed into file groups and reviewed concurrently. on_update,
+    if given, is called with the partial result as each group finishes.
+    """
+    from aigit.services.providers import get_provider
+    from aigit.prompts import FILE_REVIEW_PROMPT
+
+    identity = "\0".join(
+        [get_provider().identity(), get_config("model") or "", FILE_REVIEW_PROMPT]
+    )
+    files = parse_diff(diff)
+    refs = get_hunk_refs(files, identity)
+
+    result = ReviewResult(files=len({f.path for f in files}))
+    pending = []
+    for ref in refs:
+        cached = load_hunk_findings(ref) if cache.is_enabled() else None
+        if cached is None:
+            pending.append(ref)
+        else:
+            result.findings.extend(cached)
+            result.cached_hunks += 1
+
+    result.findings = merge_findings(result.findings)
+
+    # Rebuild file diffs from the pending hunks only, then group them
+    pending_files = {}
+    for ref in pending:
+        file = pending_files.setdefault(
+            ref.key if ref.hunk is None else ref.file.path,
+            FileDiff(path=ref.file.path, old_path=ref.file.old_path, header=ref.file.header),
+        )
+        if ref.hunk is not None:
+            file.hunks.append(ref.hunk)
+    groups = pack_files(list(pending_files.values()), get_group_budget())
+    result.groups = len(groups)
+    if on_update:
+        on_update(result)
+
+    pool = ThreadPoolExecutor(max_workers=min(ai.get_max_workers(), len(groups) or 1))
+    futures = [pool.submit(review_group, group) for group in groups]
+    try:
+        for future in as_completed(futures):
+            result.findings = merge_findings(result.findings + future.result())
+            result.groups_done += 1
+            if on_update:
+                on_update(result)
+    finally:
+        # On Ctrl-C, don't wait for requests that are still in flight
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    # Attribute findings to hunks only once every group has finished
+    new_findings = [f for future in futures for f in future.result()]
+    assigned = assign_findings(new_findings, pending) if pending else {}
+    for ref in pending:
+        save_hunk_findings(ref, assigned.get(ref.key, []))
+
+    result.reviewed_hunks = len(pending)
+    return result
@@ -0,0 +1,372 @@
+"""Split staged changes into several logical commits.
+
+The staged patch is cut into units (single hunks, or whole files where a
+file can't be split) and clustered with local heuristics: hunks in the
+same function, code and the code that uses what it defines, imports and
+their users, and tests with the modules they test. The model names every
+group in one request. Each group is then committed in turn by applying its
+part of the patch to the index with `git apply --cached`.
+"""
+
+import os
+import re
+from dataclasses import dataclass, field
+
+from aigit.config import get_config
+from aigit.diff import HUNK_HEADER_RE, FileDiff, Hunk, parse_diff
+from aigit.services import ai, git
+
+# Most commits a split produces; the closest groups are merged beyond it
+DEFAULT_MAX_COMMITS = 6
+
+# A name defined on a line (def, class, function, const, ...)
+DEFINITION_RE = re.compile(
+    r"^\s*(?:export\s+)?(?:default\s+)?(?:pub(?:\([^)]*\))?\s+)?(?:async\s+)?(?:static\s+)?"
+    r"(?:def|class|function|func(?:\s*\([^)]*\))?|fn|interface|type|struct|enum|trait|const|let|var)\s+"
+    r"\*?([A-Za-z_]\w*)"
+)
+IMPORT_RE = re.compile(r"^\s*(?:import|from|#include|using|use|require)\b|\brequire\(")
+IDENTIFIER_RE = re.compile(r"[A-Za-z_]\w{3,}")
+
+# Identifiers too common to relate two changes
+STOP_WORDS = {
+    "self", "this", "None", "True", "False", "null", "true", "false", "return", "import", "from",
+    "class", "def", "async", "await", "const", "function", "static", "public", "private", "string",
+    "void", "else", "elif", "while", "yield", "with", "pass", "raise", "except", "assert", "lambda",
+    "print", "list", "dict", "int", "str", "bool", "type", "value", "values", "data", "name", "result",
+}
+
+# A name defined in more units than this doesn't link them (e.g. __init__)
+MAX_DEFINING_UNITS = 3
+
+TEST_NAME_RE = re.compile(r"^(?:test_)?(.+?)(?:_test|_spec|\.test|\.spec|Tests?)?$")
+
+
+@dataclass
+class Unit:
+    """A piece of the staged patch committed as a whole: a hunk, or a whole file."""
+
+    file: FileDiff
+    # Indexes into file.hunks
+    hunks: list[int]
+    order: int
+    scope: str = ""
+    defines: set[str] = field(default_factory=set)
+    uses: set[str] = field(default_factory=set)
+    imports: bool = False
+
+
+@dataclass
+class CommitGroup:
+    """Units committed together, with their generated message."""
+
+    units: list[Unit]
+    message: str = ""
+
+    @property
+    def paths(self) -> list[str]:
+        return list(dict.fromkeys(unit.file.path for unit in self.units))
+
+    @property
+    def additions(self) -> int:
+        return sum(unit.file.hunks[i].additions for unit in self.units for i in unit.hunks)
+
+    @property
+    def deletions(self) -> int:
+        return sum(unit.file.hunks[i].deletions for unit in self.units for i in unit.hunks)
+
+
+def _can_split(file: FileDiff) -> bool:
+    """Only plain modifications can be committed a hunk at a time."""
+    special = ("new file mode", "deleted file mode", "old mode", "rename from", "copy from")
+    return (
+        len(file.hunks) > 1
+        and not file.is_binary
+        and not any(line.startswith(special) for line in file.header)
+    )
+
+
+def _changed_lines(file: FileDiff, hunks: list[int]) -> list[str]:
+    return [line[1:] for i in hunks for line in file.hunks[i].lines if line[:1] in ("+", "-")]
+
+
+def _describe(unit: Unit) -> None:
+    """Fill in the names a unit defines and uses, its scope and whether it only imports."""
+    lines = _changed_lines(unit.file, unit.hunks)
+    for line in lines:
+        match = DEFINITION_RE.match(line)
+        if match:
+            unit.defines.add(match.group(1))
+        unit.uses.update(IDENTIFIER_RE.findall(line))
+    unit.uses -= STOP_WORDS
+    unit.imports = bool(lines) and all(IMPORT_RE.search(line) or not line.strip() for line in lines)
+
+    # The function or class the change is in: the last definition in the
+    # context above the first change, else the one git names in the header
+    if len(unit.hunks) == 1:
+        hunk = unit.file.hunks[unit.hunks[0]]
+        match = HUNK_HEADER_RE.match(hunk.header)
+        candidates = [match.group(5).strip() if match else ""]
+        for line in hunk.lines:
+            if line[:1] in ("+", "-"):
+                break
+            candidates.append(line[1:])
+        definitions = [m.group(1) for m in map(DEFINITION_RE.match, candidates) if m]
+        unit.scope = definitions[-1] if definitions else ""
+
+
+def make_units(files: list[FileDiff]) -> list[Unit]:
+    """Cut parsed file diffs into units, in patch order."""
+    units = []
+    for file in files:
+        groups = [[i] for i in range(len(file.hunks))] if _can_split(file) else [list(range(len(file.hunks)))]
+        for hunks in groups:
+            unit = Unit(file=file, hunks=hunks, order=len(units))
+            _describe(unit)
+            units.append(unit)
+    return units
+
+
+class _Clusters:
+    """Union-find over units."""
+
+    def __init__(self, count: int):
+        self.parent = list(range(count))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, a: int, b: int) -> None:
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            self.parent[max(a, b)] = min(a, b)
+
+    def groups(self) -> list[list[int]]:
+        result: dict[int, list[int]] = {}
+        for i in range(len(self.parent)):
+            result.setdefault(self.find(i), []).append(i)
+        return sorted(result.values(), key=lambda members: members[0])
+
+
+def _test_subject(path: str) -> str | None:
+    """The module a test file tests, by name (tests/test_foo.py -> foo), or None."""
+    name = os.path.basename(path).split(".", 1)[0]
+    parts = path.replace("\\", "/").split("/")
+    is_test = any(part in ("test", "tests", "spec", "__tests__") for part in parts[:-1]) or bool(
+        re.match(r"^test_|.*(_test|_spec|Tests?)$", name) or re.search(r"\.(test|spec)\.", os.path.basename(path))
+    )
+    if not is_test:
+        return None
+    match = TEST_NAME_RE.match(name)
+    return match.group(1) if match else name
+
+
+def _common_prefix(a: str, b: str) -> int:
+    """Number of leading directories two paths share."""
+    shared = 0
+    for x, y in zip(a.split("/")[:-1], b.split("/")[:-1]):
+        if x != y:
+            break
+        shared += 1
+    return shared
+
+
+def cluster(units: list[Unit], max_commits: int = DEFAULT_MAX_COMMITS) -> list[list[Unit]]:
+    """Group related units, returning at most max_commits groups in patch order."""
+    clusters = _Clusters(len(units))
+    by_file: dict[str, list[Unit]] = {}
+    for unit in units:
+        by_file.setdefault(unit.file.path, []).append(unit)
+
+    for same_file in by_file.values():
+        # Hunks in the same function, and hunks git couldn't place in one
+        by_scope: dict[str, Unit] = {}
+        for unit in same_file:
+            first = by_scope.setdefault(unit.scope, unit)
+            clusters.union(first.order, unit.order)
+
+        # Import changes go with the hunks that use what they import
+        for unit in same_file:
+            if not unit.imports:
+                continue
+            users = [other for other in same_file if not other.imports and unit.uses & other.uses]
+            for other in users or [u for u in same_file if not u.imports][:1]:
+                clusters.union(unit.order, other.order)
+
+    # Changes that define a name go with changes that use it
+    definers: dict[str, list[Unit]] = {}
+    for unit in units:
+        for name in unit.defines:
+            definers.setdefault(name, []).append(unit)
+    for name, defining in definers.items():
+        if len(defining) > MAX_DEFINING_UNITS or name in STOP_WORDS:
+            continue
+        for unit in units:
+            if name in unit.uses:
+                for definer in defining:
+                    clusters.union(definer.order, unit.order)
+
+    # Tests go with the modules they test
+    modules: dict[str, list[Unit]] = {}
+    for unit in units:
+        if _test_subject(unit.file.path) is None:
+            modules.setdefault(os.path.basename(unit.file.path).split(".", 1)[0], []).append(unit)
+    for unit in units:
+        subject = _test_subject(unit.file.path)
+        for module in modules.get(subject, []) if subject else []:
+            clusters.union(unit.order, module.order)
+
+    groups = [[units[i] for i in members] for members in clusters.groups()]
+
+    # Over the limit, fold the smallest group into the one nearest in the tree
+    while len(groups) > max(max_commits, 1):
+        smallest = min(range(len(groups)), key=lambda i: (len(groups[i]), -i))
+        path = groups[smallest][0].file.path
+        nearest = max(
+            (i for i in range(len(groups)) if i != smallest),
+            key=lambda i: (max(_common_prefix(path, unit.file.path) for unit in groups[i]), -len(groups[i])),
+        )
+        merged = sorted(groups[nearest] + groups[smallest], key=lambda unit: unit.order)
+        groups = [group for i, group in enumerate(groups) if i not in (smallest, nearest)] + [merged]
+        groups.sort(key=lambda members: members[0].order)
+
+    return groups
+
+
+def _hunk_start(header: str) -> tuple[int, int, int, str]:
+    """Parse a hunk header into (effective old line, old count, new count, section).
+
+    An empty side's start is the line before the hunk, so it's shifted to
+    where the change actually happens.
+    """
+    match = HUNK_HEADER_RE.match(header)
+    old_start, new_start = int(match.group(1)), int(match.group(3))
+    old_count = int(match.group(2)) if match.group(2) is not None else 1
+    new_count = int(match.group(4)) if match.group(4) is not None else 1
+    return old_start + (0 if old_count else 1), old_count, new_count, match.group(5)
+
+
+def _delta(hunk: Hunk) -> int:
+    return hunk.additions - hunk.deletions
+
+
+def build_patch(units: list[Unit], applied: dict[str, set[int]]) -> str:
+    """Render the patch for a group of units against the index with `applied` hunks.
+
+    Hunk headers are renumbered for the hunks of each file already
+    committed, so git applies them exactly where they belong.
+    """
+    by_file: dict[int, tuple[FileDiff, set[int]]] = {}
+    for unit in units:
+        by_file.setdefault(id(unit.file), (unit.file, set()))[1].update(unit.hunks)
+
+    parts = []
+    for file, hunks in sorted(by_file.values(), key=lambda item: min(u.order for u in units if u.file is item[0])):
+        if len(hunks) == len(file.hunks) and not applied.get(file.path):
+            parts.append(file.render())
+            continue
+
+        done = applied.get(file.path, set())
+        # The index line's blob hashes only hold for the whole file
+        header = [line for line in file.header if not line.startswith("index ")]
+        rendered = []
+        for i in sorted(hunks):
+            hunk = file.hunks[i]
+            old, old_count, new_count, section = _hunk_start(hunk.header)
+            old += sum(_delta(file.hunks[k]) for k in done if k < i)
+            new = old + sum(_delta(file.hunks[k]) for k in hunks if k < i)
+            old_start = old if old_count else old - 1
+            new_start = new if new_count else new - 1
+            rendered.append(Hunk(f"@@ -{old_start},{old_count} +{new_start},{new_count} @@{section}", hunk.lines))
+        parts.append("\n".join([*header, *(h.render() for h in rendered)]))
+
+    return "\n".join(parts) + "\n"
+
+
+def _prompt_diff(units: list[Unit], excluded: dict[str, str]) -> str:
+    """Diff text describing a group to the model, leaving excluded files out."""
+    parts = []
+    files = {id(unit.file): unit.file for unit in units}
+    for file in files.values():
+        hunks = [i for unit in units if unit.file is file for i in unit.hunks]
+        reason = excluded.get(file.path)
+        if reason:
+            additions = sum(file.hunks[i].additions for i in hunks)
+            deletions = sum(file.hunks[i].deletions for i in hunks)
+            parts.append(f"Excluded ({reason}): {file.path} (+{additions} -{deletions})")
+        elif file.is_binary:
+            parts.append(f"Binary file changed: {file.path}")
+        else:
+            parts.append("\n".join([*file.header, *(file.hunks[i].render() for i in sorted(hunks))]))
+    # The patch keeps non-UTF-8 bytes as surrogates, which can't be sent
+    return "\n".join(parts).encode("utf-8", "replace").decode("utf-8")
+
+
+def _fallback_message(group: CommitGroup) -> str:
+    paths = group.paths
+    names = ", ".join(os.path.basename(path) for path in paths[:3])
+    return f"Update {names}" + (f" and {len(paths) - 3} more" if len(paths) > 3 else "")
+
+
+def plan_split(repo=None, max_commits: int = DEFAULT_MAX_COMMITS) -> tuple[list[CommitGroup], dict[str, str]]:
+    """Cluster the staged changes into commit groups (not yet named).
+
+    Also returns the files prompts must leave out, by path.
+    """
+    repo = repo or git.get_repo()
+    patch, excluded = git.get_staged_patch(repo)
+    units = make_units(parse_diff(patch.rstrip("\n")))
+    return [CommitGroup(units=members) for members in cluster(units, max_commits)], excluded
+
+
+def name_groups(groups: list[CommitGroup], excluded: dict[str, str], hint: str = None) -> None:
+    """Generate every group's commit message in a single request."""
+    diffs = [_prompt_diff(group.units, excluded) for group in groups]
+    messages = ai.generate_split_commit_messages(diffs, get_config("conventional_commits"), hint)
+    for group, message in zip(groups, messages):
+        group.message = message or _fallback_message(group)
+
+
+def commit_groups(groups: list[CommitGroup], repo=None) -> list[str]:
+    """Commit each group in order, returning the short commit hashes.
+
+    The index is reset to HEAD and each group's patch applied to it in turn.
+    If any step fails, the branch and index are put back as they were and
+    ValueError is raised; the working tree is never touched. They are also
+    put back on Ctrl-C or any other error, which is then re-raised.
+
+    Each commit runs the repository's pre-commit and commit-msg hooks
+    against that commit's part of the staged changes, as if it had been
+    staged and committed by hand; a hook that rejects one of them rolls
+    back the whole split.
+    """
+    from git.exc import GitCommandError
+
+    repo = repo or git.get_repo()
+    original_head = git.get_head_sha(repo)
+    original_tree = git.write_tree(repo)
+    applied: dict[str, set[int]] = {}
+    hashes = []
+
+    try:
+        git.read_tree(original_head, repo)
+        for group in groups:
+            git.apply_cached(build_patch(group.units, applied), repo)
+            for unit in group.units:
+                applied.setdefault(unit.file.path, set()).update(unit.hunks)
+            hashes.append(git.commit(group.message, repo))
+
+        if git.write_tree(repo) != original_tree:
+            raise ValueError("The split commits don't add up to the staged changes")
+    except BaseException as e:
+        git.reset_soft(original_head, repo)
+        git.read_tree(original_tree, repo)
+        if not isinstance(e, (GitCommandError, ValueError)):
+            raise
+        detail = e.stderr.strip() if isinstance(e, GitCommandError) and e.stderr else str(e)
+        raise ValueError(f"Split commit failed, nothing was committed: {detail}")
+
+    return hashes
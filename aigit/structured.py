@@ -0,0 +1,195 @@
+"""JSON responses: schemas, parsing and local repair.
+
+Generators that need more than free text (PR title and description,
+branch names, review findings) ask for a JSON object. With the openai
+provider the schema is enforced through `response_format` (unless
+`structured_outputs` is off); every provider's response is then parsed
+and coerced to the schema here. Code fences, surrounding prose, trailing
+commas, responses cut off at the token limit, wrong types and missing
+fields are repaired locally instead of costing another request.
+"""
+
+import json
+import re
+
+
+def _object(properties: dict, name: str) -> dict:
+    """A strict JSON schema for an object with all of `properties` required."""
+    return {
+        "name": name,
+        "schema": {
+            "type": "object",
+            "properties": properties,
+            "required": list(properties),
+            "additionalProperties": False,
+        },
+    }
+
+
+PR_SCHEMA = _object(
+    {
+        "title": {"type": "string", "description": "PR title, max 72 characters"},
+        "description": {"type": "string", "description": "PR description in Markdown"},
+    },
+    "pull_request",
+)
+
+BRANCH_SCHEMA = _object(
+    {"name": {"type": "string", "description": "Branch name in type/short-description form"}},
+    "branch_name",
+)
+
+REVIEW_SCHEMA = _object(
+    {
+        "findings": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "severity": {"type": "string", "enum": ["CRITICAL", "WARNING", "INFO"]},
+                    "path": {"type": "string"},
+                    "line": {"type": ["integer", "null"], "description": "Line in the new version of the file"},
+                    "issue": {"type": "string"},
+                    "suggestion": {"type": "string"},
+                },
+                "required": ["severity", "path", "line", "issue", "suggestion"],
+                "additionalProperties": False,
+            },
+        }
+    },
+    "code_review",
+)
+
+FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)(?:```|$)", re.DOTALL | re.IGNORECASE)
+TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+
+
+def _close_truncated(text: str) -> str:
+    """Close the strings, arrays and objects left open by a cut-off response."""
+    stack = []
+    in_string = escaped = False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+
+    closed = text + ('"' if in_string else "")
+    # A dangling key, colon or comma can't be completed; drop it
+    closed = re.sub(r'(,\s*"[^"]*"\s*:?\s*|,\s*|:\s*)$', "", closed.rstrip())
+    return closed + "".join(reversed(stack))
+
+
+def extract_json(text: str) -> dict | None:
+    """Find the JSON object in a response, repairing it if needed; None if there is none."""
+    candidates = [text.strip()]
+    fenced = FENCE_RE.search(text)
+    if fenced:
+        candidates.append(fenced.group(1).strip())
+
+    for candidate in candidates:
+        start = candidate.find("{")
+        if start < 0:
+            continue
+        candidate = candidate[start:]
+        for attempt in (candidate, TRAILING_COMMA_RE.sub(r"\1", candidate)):
+            for repaired in (attempt, _close_truncated(attempt)):
+                try:
+                    value, _ = json.JSONDecoder().raw_decode(repaired)
+                except ValueError:
+                    continue
+                if isinstance(value, dict):
+                    return value
+    return None
+
+
+def _default(schema: dict):
+    types = schema.get("type")
+    types = types if isinstance(types, list) else [types]
+    if "null" in types:
+        return None
+    return {"string": "", "integer": 0, "array": [], "object": {}, "boolean": False}.get(types[0])
+
+
+def coerce(value, schema: dict):
+    """Coerce a parsed value to a schema, filling in what's missing.
+
+    Raises ValueError for values that can't be made to fit.
+    """
+    types = schema.get("type")
+    types = types if isinstance(types, list) else [types]
+
+    if value is None:
+        if "null" in types:
+            return None
+        return _default(schema)
+
+    if "object" in types:
+        if not isinstance(value, dict):
+            raise ValueError(f"expected an object, got {type(value).__name__}")
+        properties = schema.get("properties", {})
+        result = {}
+        for key, prop in properties.items():
+            # Models sometimes change the case of keys
+            found = next((v for k, v in value.items() if k.lower() == key.lower()), None)
+            result[key] = coerce(found, prop)
+        return result
+
+    if "array" in types:
+        items = value if isinstance(value, list) else [value]
+        result = []
+        for item in items:
+            try:
+                result.append(coerce(item, schema.get("items", {})))
+            except ValueError:
+                continue
+        return result
+
+    if "integer" in types:
+        if isinstance(value, bool):
+            raise ValueError("expected an integer")
+        if isinstance(value, (int, float)):
+            return int(value)
+        digits = re.search(r"\d+", str(value))
+        if digits:
+            return int(digits.group())
+        if "null" in types:
+            return None
+        raise ValueError(f"expected an integer, got {value!r}")
+
+    if "string" in types:
+        if isinstance(value, list):
+            value = "\n".join(str(item) for item in value)
+        elif not isinstance(value, str):
+            value = str(value)
+        enum = schema.get("enum")
+        if enum:
+            # Accept other cases and abbreviations such as "warn"
+            text = value.strip().upper()
+            match = next((option for option in enum if text and option.upper().startswith(text)), None)
+            if match is None:
+                raise ValueError(f"{value!r} is not one of {enum}")
+            return match
+        return value.strip()
+
+    return value
+
+
+def parse(text: str, schema: dict) -> dict | None:
+    """Parse a response against one of the schemas above; None if it has no usable JSON."""
+    data = extract_json(text)
+    if data is None:
+        return None
+    try:
+        return coerce(data, schema["schema"])
+    except ValueError:
+        return None
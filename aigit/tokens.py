@@ -0,0 +1,122 @@
+"""Local token counting and per-model budgets for aigit."""
+
+from functools import lru_cache
+
+from aigit.config import get_config
+
+# Context window sizes (in tokens), matched by longest model-name prefix
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-4o": 128000,
+    "gpt-4.1": 1000000,
+    "gpt-4-turbo": 128000,
+    "gpt-4": 8192,
+    "gpt-3.5-turbo": 16385,
+    "o1": 200000,
+    "o3": 200000,
+    "o4": 200000,
+}
+
+DEFAULT_CONTEXT_WINDOW = 8192
+
+# USD per million (input, output) tokens, matched by longest model-name prefix
+MODEL_PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4-turbo": (10.00, 30.00),
+    "gpt-4": (30.00, 60.00),
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "o1": (15.00, 60.00),
+    "o1-mini": (1.10, 4.40),
+    "o3": (2.00, 8.00),
+    "o3-mini": (1.10, 4.40),
+    "o4-mini": (1.10, 4.40),
+    "text-embedding-3-small": (0.02, 0.0),
+    "text-embedding-3-large": (0.13, 0.0),
+    "text-embedding-ada-002": (0.10, 0.0),
+}
+
+# Room left in the context window for the prompt template and the response
+PROMPT_RESERVE_TOKENS = 4096
+
+# Rough characters-per-token ratio used when tiktoken is not installed
+CHARS_PER_TOKEN = 4
+
+
+def _longest_prefix(model: str, table: dict) -> str | None:
+    best = None
+    for prefix in table:
+        if model.startswith(prefix) and (best is None or len(prefix) > len(best)):
+            best = prefix
+    return best
+
+
+def get_context_window(model: str = None) -> int:
+    """Get the context window size for a model."""
+    model = model or get_config("model") or "gpt-4o-mini"
+    best = _longest_prefix(model, MODEL_CONTEXT_WINDOWS)
+    return MODEL_CONTEXT_WINDOWS[best] if best else DEFAULT_CONTEXT_WINDOW
+
+
+def estimate_cost(model: str, input_tokens: int, output_tokens: int = 0) -> float | None:
+    """Estimate a request's cost in USD, or None if the model's price is unknown."""
+    best = _longest_prefix(model, MODEL_PRICES)
+    if best is None:
+        return None
+    input_price, output_price = MODEL_PRICES[best]
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+@lru_cache(maxsize=8)
+def _get_encoding(model: str):
+    """Get a tiktoken encoding for a model, or None if tiktoken is unavailable."""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def count_tokens(text: str, model: str = None) -> int:
+    """Count tokens in text for the given model."""
+    if not text:
+        return 0
+
+    encoding = _get_encoding(model or get_config("model") or "gpt-4o-mini")
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str = None) -> str:
+    """Truncate text so it fits in max_tokens."""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+
+    encoding = _get_encoding(model or get_config("model") or "gpt-4o-mini")
+    if encoding is None:
+        return text[: max_tokens * CHARS_PER_TOKEN]
+
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+
+
+def get_diff_budget(model: str = None) -> int:
+    """Get the maximum number of tokens a diff may use in a prompt."""
+    window = get_context_window(model) - PROMPT_RESERVE_TOKENS
+    configured = get_config("max_diff_tokens")
+
+    try:
+        configured = int(configured)
+    except (TypeError, ValueError):
+        configured = 0
+
+    if configured > 0:
+        return max(min(configured, window), 256)
+    return max(window, 256)
@@ -0,0 +1,139 @@
+"""A local stand-in for the GitHub REST API, for offline benchmarks.
+
+Serves just what `aigit pr` uses: repository lookup and pull request
+creation. Point aigit at it with `github_api_url`:
+
+    python benchmarks/fake_github.py --port 8765
+    AIGIT_GITHUB_API_URL=http://127.0.0.1:8765 aigit pr -y --no-open
+"""
+
+import argparse
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPO_PATH_RE = re.compile(r"^/repos/([^/]+)/([^/]+)(/pulls)?/?$")
+
+
+class FakeGitHub:
+    """Fake GitHub API server running in a background thread.
+
+    Use as a context manager; `url` is the API base URL and `pulls` lists
+    the pull requests created so far.
+    """
+
+    def __init__(self, port: int = 0, latency_ms: int = 0):
+        self.pulls: list[dict] = []
+        self.requests = 0
+        self.latency_ms = latency_ms
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "FakeGitHub":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def repo_json(self, owner: str, name: str) -> dict:
+        return {
+            "id": 1,
+            "name": name,
+            "full_name": f"{owner}/{name}",
+            "owner": {"login": owner},
+            "url": f"{self.url}/repos/{owner}/{name}",
+            "html_url": f"https://github.com/{owner}/{name}",
+            "default_branch": "main",
+        }
+
+    def create_pull(self, owner: str, name: str, payload: dict) -> dict:
+        with self._lock:
+            number = len(self.pulls) + 1
+            pull = {
+                "id": number,
+                "number": number,
+                "state": "open",
+                "title": payload.get("title", ""),
+                "body": payload.get("body", ""),
+                "draft": bool(payload.get("draft")),
+                "head": {"ref": payload.get("head")},
+                "base": {"ref": payload.get("base")},
+                "url": f"{self.url}/repos/{owner}/{name}/pulls/{number}",
+                "html_url": f"https://github.com/{owner}/{name}/pull/{number}",
+            }
+            self.pulls.append(pull)
+        return pull
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, data: dict) -> None:
+                body = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _route(self, method: str) -> None:
+                with fake._lock:
+                    fake.requests += 1
+                if fake.latency_ms:
+                    threading.Event().wait(fake.latency_ms / 1000)
+
+                match = REPO_PATH_RE.match(self.path.split("?", 1)[0])
+                if not match:
+                    self._send(404, {"message": "Not Found"})
+                    return
+
+                owner, name, pulls = match.groups()
+                if method == "GET" and not pulls:
+                    self._send(200, fake.repo_json(owner, name))
+                elif method == "POST" and pulls:
+                    length = int(self.headers.get("Content-Length") or 0)
+                    payload = json.loads(self.rfile.read(length) or b"{}")
+                    if not payload.get("title") or not payload.get("head") or not payload.get("base"):
+                        self._send(422, {"message": "Validation Failed"})
+                        return
+                    self._send(201, fake.create_pull(owner, name, payload))
+                else:
+                    self._send(404, {"message": "Not Found"})
+
+            def do_GET(self):
+                self._route("GET")
+
+            def do_POST(self):
+                self._route("POST")
+
+        return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=int, default=0, help="Delay added to every response")
+    options = parser.parse_args()
+
+    with FakeGitHub(options.port, options.latency_ms) as server:
+        print(f"Fake GitHub API at {server.url} (Ctrl+C to stop)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
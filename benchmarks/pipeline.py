@@ -0,0 +1,282 @@
+"""End-to-end benchmark of aigit commands, fully offline.
+
+Builds a synthetic repository (see synthetic_repo.py), then runs each
+command in a fresh interpreter against the stub AI provider and a local
+fake GitHub API (fake_github.py). For every case it reports the median
+total latency, git and prompt-building time (from aigit's own metrics),
+time spent in AI requests and peak memory. The repository is restored
+after every run, so runs are independent.
+
+    python benchmarks/pipeline.py
+    python benchmarks/pipeline.py --files 2000 --diff-mb 20 --json after.json
+    python benchmarks/pipeline.py --json after.json --compare before.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from fake_github import FakeGitHub  # noqa: E402
+from synthetic_repo import add_spec_arguments, build_repo, git, git_env, spec_from_options  # noqa: E402
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+RESULTS_VERSION = 1
+
+# Case name -> aigit arguments
+CASES = {
+    "startup": ["--help"],
+    "commit": ["commit", "-y"],
+    "branch": ["branch", "-y"],
+    "review": ["review"],
+    "explain": ["explain"],
+    "explain range": ["explain", "main..topic", "--output", os.devnull],
+    "pr": ["pr", "-y", "--no-open"],
+}
+
+# Measurements compared by --compare, with the smallest change that counts
+COMPARED = {"wall_ms": 20.0, "git_ms": 10.0, "prompt_ms": 10.0, "peak_rss_mb": 5.0}
+
+# Reports peak memory from inside the child, after aigit's own exit handlers
+RUNNER = """\
+import atexit, json, resource, sys
+def _report():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    sys.stderr.write("BENCH " + json.dumps({{"peak_rss_kb": peak // 1024 if sys.platform == "darwin" else peak}}) + "\\n")
+atexit.register(_report)
+from aigit.cli import app
+sys.argv[1:] = {args!r}
+app(prog_name="aigit")
+"""
+
+
+def _has_upstream(repo: Path) -> bool:
+    result = subprocess.run(
+        ["git", "rev-parse", "--abbrev-ref", "@{upstream}"], cwd=repo, env=git_env(), capture_output=True
+    )
+    return result.returncode == 0
+
+
+def snapshot(repo: Path) -> dict:
+    """Record the refs a case may change, to restore them afterwards."""
+    return {
+        "branch": git(repo, "symbolic-ref", "--short", "HEAD"),
+        "head": git(repo, "rev-parse", "HEAD"),
+        "refs": set(git(repo, "for-each-ref", "--format=%(refname)").split("\n")),
+        "upstream": _has_upstream(repo),
+    }
+
+
+def restore(repo: Path, state: dict) -> None:
+    """Undo commits, branches and pushes made by a case, keeping staged changes."""
+    git(repo, "checkout", "-q", state["branch"])
+    git(repo, "reset", "-q", "--soft", state["head"])
+
+    for ref in set(git(repo, "for-each-ref", "--format=%(refname)").split("\n")) - state["refs"]:
+        git(repo, "update-ref", "-d", ref)
+    if _has_upstream(repo) and not state["upstream"]:
+        git(repo, "branch", "--unset-upstream")
+
+    origin = repo.parent / f"{repo.name}-origin.git"
+    for ref in git(origin, "for-each-ref", "--format=%(refname)").split("\n"):
+        if ref and ref != "refs/heads/main":
+            git(origin, "update-ref", "-d", ref)
+
+    # Drop per-repo state (explanations, review findings, index) for cold runs
+    shutil.rmtree(Path(git(repo, "rev-parse", "--absolute-git-dir")) / "aigit", ignore_errors=True)
+
+
+def run_case(name: str, args: list[str], repo: Path, env: dict, runs: int) -> dict:
+    samples = []
+    exit_codes = set()
+    metrics_file = Path(env["AIGIT_METRICS_FILE"])
+
+    for _ in range(runs):
+        state = snapshot(repo)
+        metrics_file.unlink(missing_ok=True)
+
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-c", RUNNER.format(args=args)],
+            cwd=repo,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        wall = (time.perf_counter() - start) * 1000
+        restore(repo, state)
+
+        exit_codes.add(proc.returncode)
+        peak = next(
+            (json.loads(line[6:])["peak_rss_kb"] for line in proc.stderr.splitlines() if line.startswith("BENCH ")),
+            0,
+        )
+        run = {}
+        if metrics_file.exists():
+            lines = [json.loads(line) for line in metrics_file.read_text().splitlines() if line]
+            run = next((line for line in reversed(lines) if line.get("type") == "run"), {})
+            run["ai_ms"] = sum(line["latency"] for line in lines if line.get("type") == "request") * 1000
+
+        phases = run.get("phases", {})
+        samples.append(
+            {
+                "wall_ms": wall,
+                "git_ms": phases.get("git", 0.0) * 1000,
+                "prompt_ms": phases.get("prompt", 0.0) * 1000,
+                "ai_ms": run.get("ai_ms", 0.0),
+                "requests": run.get("requests", 0),
+                "peak_rss_mb": peak / 1024,
+            }
+        )
+        if proc.returncode != 0 and name != "startup":
+            sys.stderr.write(f"[{name}] exited with {proc.returncode}:\n{proc.stdout[-2000:]}{proc.stderr[-2000:]}\n")
+
+    result = {"case": name, "args": args, "runs": runs, "exit_codes": sorted(exit_codes)}
+    for key in samples[0]:
+        result[key] = round(statistics.median(sample[key] for sample in samples), 1)
+    return result
+
+
+# AIGIT_* variables passed through; other config from the environment would
+# skew the results
+ALLOWED_ENV = {
+    "provider",
+    "stub_latency_ms",
+    "cache",
+    "interactive",
+    "github_token",
+    "github_api_url",
+    "metrics_file",
+}
+
+
+def child_env(home: Path, github_url: str, options: argparse.Namespace) -> dict:
+    env = git_env(str(home))
+    env.update(
+        PYTHONPATH=os.pathsep.join(filter(None, [str(PROJECT_ROOT), os.environ.get("PYTHONPATH")])),
+        AIGIT_PROVIDER="stub",
+        AIGIT_STUB_LATENCY_MS=str(options.latency_ms),
+        AIGIT_CACHE="true" if options.cache else "false",
+        AIGIT_INTERACTIVE="false",
+        AIGIT_GITHUB_TOKEN="bench",
+        AIGIT_GITHUB_API_URL=github_url,
+        AIGIT_METRICS_FILE=str(home / "metrics.jsonl"),
+    )
+    for key in [k for k in env if k.startswith("AIGIT_") and k[6:].lower() not in ALLOWED_ENV]:
+        del env[key]
+    return env
+
+
+def git_version() -> str:
+    return subprocess.run(["git", "--version"], capture_output=True, text=True).stdout.strip()
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Describe measurements that got worse than the baseline by more than threshold."""
+    previous = {case["case"]: case for case in baseline.get("cases", [])}
+    regressions = []
+
+    print(f"\n{'case':<14} {'metric':<12} {'before':>9} {'after':>9} {'change':>8}")
+    for case in results["cases"]:
+        old = previous.get(case["case"])
+        if old is None:
+            continue
+        for metric, min_delta in COMPARED.items():
+            before, after = old.get(metric, 0.0), case.get(metric, 0.0)
+            if not before:
+                continue
+            change = (after - before) / before
+            worse = change > threshold and after - before > min_delta
+            flag = "  REGRESSION" if worse else ""
+            print(f"{case['case']:<14} {metric:<12} {before:>9} {after:>9} {change:>+8.0%}{flag}")
+            if worse:
+                regressions.append(f"{case['case']} {metric}: {before} -> {after} ({change:+.0%})")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_spec_arguments(parser)
+    parser.add_argument("--runs", type=int, default=3, help="Runs per case (median is reported)")
+    parser.add_argument("--latency-ms", type=int, default=0, help="Simulated latency per AI request")
+    parser.add_argument("--cache", action="store_true", help="Allow cached AI responses (warm runs)")
+    parser.add_argument("--json", metavar="PATH", help="Also write results to a JSON file")
+    parser.add_argument("--compare", metavar="PATH", help="Baseline JSON to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Relative slowdown that fails --compare")
+    parser.add_argument("--keep", action="store_true", help="Keep the synthetic repository and print its path")
+    parser.add_argument("cases", nargs="*", help=f"Cases to run (default: all of {', '.join(CASES)})")
+    options = parser.parse_args()
+
+    unknown = [name for name in options.cases if name not in CASES]
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(unknown)}")
+
+    spec = spec_from_options(options)
+    workdir = Path(tempfile.mkdtemp(prefix="aigit-bench-"))
+    try:
+        start = time.perf_counter()
+        repo = build_repo(str(workdir / "repo"), spec)
+        build_s = time.perf_counter() - start
+        home = workdir / "home"
+        home.mkdir()
+
+        with FakeGitHub() as github:
+            env = child_env(home, github.url, options)
+            cases = [run_case(name, CASES[name], repo, env, options.runs) for name in options.cases or CASES]
+            pulls = len(github.pulls)
+
+        results = {
+            "version": RESULTS_VERSION,
+            "python": sys.version.split()[0],
+            "git": git_version(),
+            "platform": platform.platform(),
+            "spec": spec.to_dict(),
+            "options": {"runs": options.runs, "latency_ms": options.latency_ms, "cache": options.cache},
+            "build_s": round(build_s, 2),
+            "pull_requests": pulls,
+            "cases": cases,
+        }
+    finally:
+        if options.keep:
+            print(f"Synthetic repository kept at {workdir / 'repo'}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"repo: {spec.to_dict()} (built in {results['build_s']}s)")
+    print(f"{'case':<14} {'wall ms':>9} {'git ms':>8} {'prompt ms':>10} {'ai ms':>8} {'reqs':>5} {'peak MB':>8}")
+    for case in cases:
+        failed = "" if case["exit_codes"] == [0] else f"  exit {case['exit_codes']}"
+        print(
+            f"{case['case']:<14} {case['wall_ms']:>9} {case['git_ms']:>8} {case['prompt_ms']:>10} "
+            f"{case['ai_ms']:>8} {case['requests']:>5} {case['peak_rss_mb']:>8}{failed}"
+        )
+
+    if options.json:
+        with open(options.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if options.compare:
+        with open(options.compare) as f:
+            baseline = json.load(f)
+        if baseline.get("spec") != results["spec"]:
+            print("\nWarning: the baseline was run with a different repository spec")
+        regressions = compare(results, baseline, options.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {options.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Startup benchmark for the aigit CLI.
+
+Runs each subcommand in a fresh interpreter with ``python -X importtime``
+and reports wall time, total import time and the heaviest imports.
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 10 --json startup.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Case name -> aigit arguments. Completion cases set the shell completion
+# environment variables the way bash does on a tab press.
+CASES = {
+    "help": ["--help"],
+    "config get": ["config", "get", "model"],
+    "complete": [],
+    "commit --help": ["commit", "--help"],
+    "branch --help": ["branch", "--help"],
+    "pr --help": ["pr", "--help"],
+    "review --help": ["review", "--help"],
+    "explain --help": ["explain", "--help"],
+}
+
+COMPLETION_ENV = {
+    "_AIGIT_COMPLETE": "complete_bash",
+    "COMP_WORDS": "aigit co",
+    "COMP_CWORD": "1",
+}
+
+RUNNER = "import sys; from aigit.cli import app; sys.argv[1:] = {args!r}; app(prog_name='aigit')"
+
+
+def parse_importtime(stderr: str) -> tuple[float, list[tuple[str, float]]]:
+    """Sum top-level cumulative import time (ms) and list top-level modules."""
+    top_level = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if cumulative.strip().isdigit() and not name.startswith("  "):
+            top_level.append((name.strip(), int(cumulative) / 1000))
+
+    return sum(ms for _, ms in top_level), sorted(top_level, key=lambda x: -x[1])
+
+
+def run_case(name: str, args: list[str], runs: int) -> dict:
+    env = dict(os.environ)
+    if name == "complete":
+        env.update(COMPLETION_ENV)
+
+    walls, imports = [], []
+    heaviest = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", RUNNER.format(args=args)],
+            capture_output=True,
+            text=True,
+            env=env,
+        )
+        walls.append((time.perf_counter() - start) * 1000)
+        total, heaviest = parse_importtime(proc.stderr)
+        imports.append(total)
+
+    return {
+        "case": name,
+        "wall_ms": round(statistics.median(walls), 1),
+        "import_ms": round(statistics.median(imports), 1),
+        "heaviest": [[mod, round(ms, 1)] for mod, ms in heaviest[:5]],
+    }
+
+
+def baseline_ms(runs: int) -> float:
+    """Median wall time of a bare interpreter, for reference."""
+    walls = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+        walls.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(walls), 1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="Runs per case (median is reported)")
+    parser.add_argument("--json", metavar="PATH", help="Also write results to a JSON file")
+    parser.add_argument("cases", nargs="*", help=f"Cases to run (default: all of {', '.join(CASES)})")
+    options = parser.parse_args()
+
+    results = {
+        "python": sys.version.split()[0],
+        "interpreter_ms": baseline_ms(options.runs),
+        "cases": [run_case(name, CASES[name], options.runs) for name in options.cases or CASES],
+    }
+
+    print(f"{'case':<16} {'wall ms':>9} {'import ms':>10}  heaviest imports")
+    print(f"{'(interpreter)':<16} {results['interpreter_ms']:>9}")
+    for case in results["cases"]:
+        heaviest = ", ".join(f"{mod} {ms}" for mod, ms in case["heaviest"][:3])
+        print(f"{case['case']:<16} {case['wall_ms']:>9} {case['import_ms']:>10}  {heaviest}")
+
+    if options.json:
+        with open(options.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
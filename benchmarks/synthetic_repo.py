@@ -0,0 +1,204 @@
+"""Build reproducible synthetic git repositories for benchmarks.
+
+The repository has a `main` branch with `files` Python modules and a
+checked-out `topic` branch with `commits` commits on top of it, plus
+staged changes of about `diff_mb` megabytes spread over `changed_files`
+files with `hunks` hunks each. `origin` points at a GitHub URL that git
+rewrites to a local bare repository, so pushes work offline while aigit
+still sees a GitHub remote. The same spec and seed always produce the
+same content and commit SHAs.
+
+    python benchmarks/synthetic_repo.py /tmp/bench-repo --files 500 --diff-mb 5
+"""
+
+import argparse
+import os
+import random
+import subprocess
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+REMOTE_URL = "https://github.com/aigit-bench/synthetic.git"
+
+# Lines per module on main
+BASE_LINES = 200
+
+# Files changed by each commit on the topic branch
+FILES_PER_COMMIT = 3
+
+# Lines inserted per hunk in topic branch commits
+COMMIT_HUNK_LINES = 6
+
+# Fixed timestamps keep commit SHAs stable across builds
+EPOCH = 1_700_000_000
+
+
+@dataclass
+class RepoSpec:
+    """Size of a synthetic repository."""
+
+    files: int = 200
+    hunks: int = 4
+    diff_mb: float = 1.0
+    commits: int = 20
+    changed_files: int = 50
+    seed: int = 0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def git_env(home: str = None) -> dict:
+    """Environment for git that ignores the user's global and system config."""
+    env = dict(os.environ)
+    env.update(
+        GIT_CONFIG_NOSYSTEM="1",
+        GIT_CONFIG_GLOBAL=os.devnull,
+        GIT_AUTHOR_NAME="aigit bench",
+        GIT_AUTHOR_EMAIL="bench@example.com",
+        GIT_COMMITTER_NAME="aigit bench",
+        GIT_COMMITTER_EMAIL="bench@example.com",
+    )
+    if home:
+        env["HOME"] = home
+    return env
+
+
+def git(path: Path, *args: str, env: dict = None) -> str:
+    result = subprocess.run(
+        ["git", *args],
+        cwd=path,
+        env=env or git_env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return result.stdout.strip()
+
+
+def _module_path(n: int) -> str:
+    return f"src/pkg{n // 50}/module_{n}.py"
+
+
+def _base_module(n: int, rng: random.Random) -> list[str]:
+    lines = [f'"""Synthetic module {n}."""', ""]
+    k = 0
+    while len(lines) < BASE_LINES:
+        lines += [
+            "",
+            f"def compute_{n}_{k}(value, scale={rng.randint(1, 9)}):",
+            f'    """Return value adjusted by step {k}."""',
+            f"    result = value * scale + {rng.randint(0, 999)}",
+            "    return result",
+        ]
+        k += 1
+    return lines
+
+
+def _new_lines(count: int, tag: str, rng: random.Random) -> list[str]:
+    return [
+        f"    adjusted_{tag}_{i} = compute_{rng.randint(0, 999)}(adjusted_{tag}_{i - 1}, {rng.randint(0, 9999)})"
+        for i in range(count)
+    ]
+
+
+def _insert_hunks(lines: list[str], hunks: int, per_hunk: int, tag: str, rng: random.Random) -> list[str]:
+    """Insert `hunks` blocks of new lines, spread far enough apart to stay separate hunks."""
+    step = max(len(lines) // (hunks + 1), 8)
+    result = list(lines)
+    for h in reversed(range(1, hunks + 1)):
+        at = min(h * step, len(result))
+        result[at:at] = _new_lines(per_hunk, f"{tag}_{h}", rng)
+    return result
+
+
+def _write(root: Path, relative: str, lines: list[str]) -> None:
+    path = root / relative
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def build_repo(path: str, spec: RepoSpec) -> Path:
+    """Create the synthetic repository at path, which must not exist yet."""
+    root = Path(path)
+    root.mkdir(parents=True)
+    rng = random.Random(spec.seed)
+
+    def commit(message: str, index: int) -> None:
+        env = git_env()
+        env["GIT_AUTHOR_DATE"] = env["GIT_COMMITTER_DATE"] = f"{EPOCH + index * 60} +0000"
+        git(root, "add", "-A")
+        git(root, "commit", "-q", "-m", message, env=env)
+
+    git(root, "init", "-q", "-b", "main")
+    git(root, "config", "user.name", "aigit bench")
+    git(root, "config", "user.email", "bench@example.com")
+    git(root, "config", "commit.gpgsign", "false")
+
+    modules = {n: _base_module(n, rng) for n in range(spec.files)}
+    for n, lines in modules.items():
+        _write(root, _module_path(n), lines)
+    _write(root, "README.md", ["# Synthetic benchmark repository"])
+    commit("Initial commit", 0)
+
+    # Pushes to the GitHub URL land in a local bare repository
+    origin = root.parent / f"{root.name}-origin.git"
+    git(root.parent, "init", "-q", "--bare", str(origin))
+    git(root, "remote", "add", "origin", REMOTE_URL)
+    git(root, "config", f"url.{origin.as_posix()}.insteadOf", REMOTE_URL)
+    git(root, "push", "-q", "origin", "main")
+
+    git(root, "checkout", "-q", "-b", "topic")
+    for i in range(spec.commits):
+        for n in rng.sample(range(spec.files), min(FILES_PER_COMMIT, spec.files)):
+            modules[n] = _insert_hunks(modules[n], spec.hunks, COMMIT_HUNK_LINES, f"c{i}", rng)
+            _write(root, _module_path(n), modules[n])
+        commit(f"Change {i + 1} of the synthetic topic", i + 1)
+
+    # Staged changes sized to about diff_mb
+    changed = rng.sample(range(spec.files), min(spec.changed_files, spec.files))
+    line_bytes = len(_new_lines(2, "staged_0_0", random.Random(0))[1]) + 2
+    per_hunk = max(int(spec.diff_mb * 1_000_000 / (len(changed) * spec.hunks * line_bytes)), 1)
+    for n in changed:
+        modules[n] = _insert_hunks(modules[n], spec.hunks, per_hunk, f"s{n}", rng)
+        _write(root, _module_path(n), modules[n])
+    git(root, "add", "-A")
+
+    return root
+
+
+def add_spec_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = RepoSpec()
+    parser.add_argument("--files", type=int, default=defaults.files, help="Modules in the repository")
+    parser.add_argument("--hunks", type=int, default=defaults.hunks, help="Hunks per changed file")
+    parser.add_argument("--diff-mb", type=float, default=defaults.diff_mb, help="Size of the staged diff")
+    parser.add_argument("--commits", type=int, default=defaults.commits, help="Commits on the topic branch")
+    parser.add_argument(
+        "--changed-files", type=int, default=defaults.changed_files, help="Files in the staged diff"
+    )
+    parser.add_argument("--seed", type=int, default=defaults.seed, help="Random seed for file content")
+
+
+def spec_from_options(options: argparse.Namespace) -> RepoSpec:
+    return RepoSpec(
+        files=options.files,
+        hunks=options.hunks,
+        diff_mb=options.diff_mb,
+        commits=options.commits,
+        changed_files=options.changed_files,
+        seed=options.seed,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", help="Directory to create")
+    add_spec_arguments(parser)
+    options = parser.parse_args()
+
+    root = build_repo(options.path, spec_from_options(options))
+    print(f"Built {root} ({git(root, 'rev-list', '--count', 'HEAD')} commits)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Shared fixtures: every test gets its own config and cache directories."""
+
+import os
+import subprocess
+
+import pytest
+
+from aigit import cache, config
+
+
+@pytest.fixture(autouse=True)
+def isolated_config(tmp_path, monkeypatch):
+    """Point the global config and cache at a temporary directory and clear AIGIT_* variables."""
+    for name in list(os.environ):
+        if name.startswith(config.ENV_PREFIX):
+            monkeypatch.delenv(name)
+    monkeypatch.setattr(config, "CONFIG_DIR", tmp_path / "config")
+    monkeypatch.setattr(config, "CONFIG_FILE", tmp_path / "config" / "config.toml")
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path / "config" / "cache")
+    monkeypatch.chdir(tmp_path)
+    config.invalidate_config()
+    yield tmp_path
+    config.invalidate_config()
+
+
+def run_git(cwd, *args: str) -> str:
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout
+
+
+@pytest.fixture
+def git_repo(tmp_path, monkeypatch):
+    """An empty repository with one commit, as the working directory."""
+    for name in ("AUTHOR", "COMMITTER"):
+        monkeypatch.setenv(f"GIT_{name}_NAME", "Test")
+        monkeypatch.setenv(f"GIT_{name}_EMAIL", "test@example.com")
+    path = tmp_path / "repo"
+    path.mkdir()
+    run_git(path, "init", "-q")
+    (path / "README.md").write_text("# Test\n", encoding="utf-8")
+    run_git(path, "add", ".")
+    run_git(path, "commit", "-q", "-m", "Initial commit")
+    monkeypatch.chdir(path)
+    return path
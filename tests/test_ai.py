@@ -0,0 +1,212 @@
+"""Tests for the AI service."""
+
+import asyncio
+
+import pytest
+
+from aigit import cache, config
+from aigit.services import ai, providers
+
+
+class Recorder(providers.Provider):
+    """Answers every prompt with a numbered reply and records the prompts."""
+
+    name = "recorder"
+
+    def __init__(self, reply: str = "Summary"):
+        self.reply = reply
+        self.prompts = []
+
+    def complete(self, prompt, model, max_tokens, temperature, schema=None):
+        self.prompts.append(prompt)
+        return f"{self.reply} {len(self.prompts)}"
+
+
+@pytest.fixture
+def recorder(monkeypatch):
+    provider = Recorder()
+    monkeypatch.setattr(ai, "get_provider", lambda: provider)
+    config.set_config("cache", "false")
+    return provider
+
+
+def make_diff(files: int, lines: int = 100) -> str:
+    parts = []
+    for i in range(files):
+        body = "".join(f"+line {n} of a file that grew\n" for n in range(lines))
+        parts.append(
+            f"diff --git a/f{i}.py b/f{i}.py\n--- a/f{i}.py\n+++ b/f{i}.py\n@@ -0,0 +1,{lines} @@\n{body}"
+        )
+    return "".join(parts)
+
+
+def test_small_diff_is_explained_in_one_request(recorder):
+    config.set_config("max_diff_tokens", "4000")
+
+    ai.generate_explanation(make_diff(1, 10))
+
+    assert len(recorder.prompts) == 1
+    assert "part 1 of" not in recorder.prompts[0]
+
+
+def test_large_diff_is_summarized_in_parts(recorder):
+    config.set_config("max_diff_tokens", "1000")
+
+    ai.generate_explanation(make_diff(4))
+
+    *chunks, final = recorder.prompts
+    assert len(chunks) > 1
+    assert all(f"of {len(chunks)} of a larger git diff" in prompt for prompt in chunks)
+    assert "summarized in parts" in final
+    for i in range(1, len(chunks) + 1):
+        assert f"Summary {i}" in final
+
+
+def test_map_reduce_off_sends_one_fitted_prompt(recorder):
+    config.set_config("max_diff_tokens", "1000")
+    config.set_config("map_reduce", "false")
+
+    ai.generate_explanation(make_diff(4))
+
+    assert len(recorder.prompts) == 1
+    assert "summarized in parts" not in recorder.prompts[0]
+
+
+def test_summaries_are_merged_until_they_fit(recorder):
+    config.set_config("max_diff_tokens", "256")
+    # Summaries as large as the budget force reduce rounds
+    recorder.reply = "word " * 250
+
+    summaries = ai.summarize_diff(make_diff(6))
+
+    assert any("Merge the following summaries" in prompt for prompt in recorder.prompts)
+    assert ai._get_combine_prompts(summaries) == []
+
+
+def test_stream_is_cached_only_when_complete(monkeypatch):
+    monkeypatch.setenv("AIGIT_PROVIDER", "stub")
+    config.invalidate_config()
+    prompt = "Explain this change"
+
+    stream = ai.generate_stream(prompt)
+    first = next(stream)
+    stream.close()
+    assert cache.get(ai._cache_key(ai.get_provider(), "gpt-4o-mini", prompt, 1024)) is None
+
+    chunks = list(ai.generate_stream(prompt))
+    assert chunks[0] == first
+    assert len(chunks) > 1
+
+    # A cached response comes back whole
+    assert list(ai.generate_stream(prompt)) == ["".join(chunks).strip()]
+
+
+def test_async_generation_matches_sync(monkeypatch):
+    monkeypatch.setenv("AIGIT_PROVIDER", "stub")
+    config.invalidate_config()
+    config.set_config("cache", "false")
+    config.set_config("max_diff_tokens", "1000")
+    small, large = make_diff(1, 10), make_diff(4)
+
+    async def collect():
+        return (
+            await ai.agenerate_commit_message(small),
+            await ai.agenerate_branch_name(small),
+            await ai.agenerate_pr(large, "main", "feature", ["f0.py"]),
+            await ai.agenerate_explanation(large),
+            await ai.asummarize_diff(large),
+        )
+
+    expected = (
+        ai.generate_commit_message(small),
+        ai.generate_branch_name(small),
+        ai.generate_pr(large, "main", "feature", ["f0.py"]),
+        ai.generate_explanation(large),
+        ai.summarize_diff(large),
+    )
+    assert asyncio.run(collect()) == expected
+
+
+class ToolCaller(Recorder):
+    """Calls the echo tool whenever it may, and answers only when it must."""
+
+    name = "tool-caller"
+
+    def __init__(self, obey: bool = True):
+        super().__init__()
+        self.obey = obey
+        self.turns = []
+
+    def chat(self, messages, model, max_tokens, temperature, tools, tool_choice="auto", schema=None):
+        self.turns.append((tool_choice, list(messages)))
+        if tool_choice == "none" and self.obey:
+            return {"role": "assistant", "content": "Answer", "tool_calls": []}
+        call = {
+            "id": f"call_{len(self.turns)}",
+            "type": "function",
+            "function": {"name": "echo", "arguments": '{"text": "hi"}'},
+        }
+        return {"role": "assistant", "content": "", "tool_calls": [call]}
+
+
+ECHO = ai.Tool(
+    name="echo",
+    description="Echo text back.",
+    parameters={"type": "object", "properties": {"text": {"type": "string"}}, "required": ["text"]},
+    run=lambda text: text,
+)
+
+
+def test_tool_rounds_are_capped(monkeypatch):
+    provider = ToolCaller()
+    monkeypatch.setattr(ai, "get_provider", lambda: provider)
+
+    assert ai.generate_with_tools("Write a PR", [ECHO]) == "Answer"
+
+    choices = [choice for choice, _ in provider.turns]
+    assert choices == ["auto"] * ai.MAX_TOOL_ROUNDS + ["none"]
+    tool_results = [m["content"] for m in provider.turns[-1][1] if m["role"] == "tool"]
+    assert tool_results == ["hi"] * ai.MAX_TOOL_ROUNDS
+
+
+def test_model_that_never_answers_is_an_error(monkeypatch):
+    provider = ToolCaller(obey=False)
+    monkeypatch.setattr(ai, "get_provider", lambda: provider)
+
+    with pytest.raises(ValueError, match="kept calling tools"):
+        ai.generate_with_tools("Write a PR", [ECHO])
+    assert len(provider.turns) == ai.MAX_TOOL_ROUNDS + 1
+
+
+def test_bad_tool_calls_are_reported_to_the_model():
+    tools = {"echo": ECHO}
+
+    def call(name, arguments):
+        return ai._run_tool(tools, {"function": {"name": name, "arguments": arguments}})
+
+    assert call("echo", '{"text": "hi"}') == "hi"
+    assert call("missing", "{}") == "Error: unknown tool missing"
+    assert call("echo", '{"words": "hi"}').startswith("Error: ")
+    assert call("echo", "not json").startswith("Error: ")
+
+
+def test_pr_with_tools_reads_diffs_on_demand(monkeypatch):
+    monkeypatch.setenv("AIGIT_PROVIDER", "stub")
+    config.invalidate_config()
+    config.set_config("pr_tools", "true")
+    diff = make_diff(4)
+    prompts = []
+    chat = providers.StubProvider.chat
+
+    def record(self, messages, *args, **kwargs):
+        prompts.append(messages[0]["content"])
+        return chat(self, messages, *args, **kwargs)
+
+    monkeypatch.setattr(providers.StubProvider, "chat", record)
+
+    pr = ai.generate_pr(diff, "main", "feature", ["f0.py"], ["Add files"])
+
+    assert pr.title
+    assert len(prompts) == 2
+    assert "+line 0" not in prompts[0]
+    assert "100\t0\tf0.py" in prompts[0]
@@ -0,0 +1,74 @@
+"""Tests for the on-disk response cache."""
+
+import os
+import time
+
+from aigit import cache, config
+
+
+def fill(count: int, size: int = 1000, start: int = 0) -> list[str]:
+    keys = [cache.make_key(n=i) for i in range(start, start + count)]
+    for key in keys:
+        cache.put(key, "x" * size)
+    return keys
+
+
+def test_put_and_get():
+    key = cache.make_key(prompt="hello")
+    cache.put(key, "world")
+
+    assert cache.get(key) == "world"
+    assert cache.get(cache.make_key(prompt="other")) is None
+
+
+def test_disabled_cache_stores_nothing():
+    cache.disable()
+    try:
+        key = cache.make_key(prompt="hello")
+        cache.put(key, "world")
+        assert cache.stats()["entries"] == 0
+    finally:
+        cache.enable()
+
+
+def test_writes_only_scan_the_cache_occasionally(monkeypatch):
+    monkeypatch.setattr(cache, "PRUNE_PROBABILITY", 0)
+    cache._sizes.clear()
+    scans = []
+    original = cache.prune
+    monkeypatch.setattr(cache, "prune", lambda directory=None: (scans.append(directory), original(directory)))
+
+    fill(50)
+
+    # The first write establishes the running total; the rest only add to it
+    assert len(scans) == 1
+
+
+def test_size_limit_evicts_least_recently_used(monkeypatch):
+    config.set_config("cache_max_mb", "1")
+    monkeypatch.setattr(cache, "PRUNE_PROBABILITY", 0)
+    cache._sizes.clear()
+
+    keys = fill(3, size=300_000)
+    now = time.time()
+    for key, age in zip(keys, (0, 30, 20)):
+        os.utime(cache._entry_path(key), (now - age, now - age))
+    keys += fill(1, size=300_000, start=3)
+
+    assert cache.stats()["size_bytes"] <= 1024 * 1024
+    # keys[0] was used most recently, keys[1] least
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[2]) is not None
+
+
+def test_prune_evicts_expired_entries():
+    config.set_config("cache_max_age_days", "1")
+    (key,) = fill(1)
+    path = cache._entry_path(key)
+    stale = time.time() - 2 * 86400
+    os.utime(path, (stale, stale))
+
+    cache.prune()
+
+    assert not path.exists()
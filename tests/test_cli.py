@@ -0,0 +1,67 @@
+"""Tests for the command-line entry point and its lazy loading."""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from aigit.cli import app
+
+PACKAGE_ROOT = Path(__file__).resolve().parents[1]
+
+
+def imported_modules(args: list[str], env: dict = None) -> set[str]:
+    """Run aigit in a fresh interpreter and return the modules it imported."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "aigit.client", *args],
+        env={**os.environ, "PYTHONPATH": str(PACKAGE_ROOT), "AIGIT_NO_DAEMON": "1", **(env or {})},
+        capture_output=True,
+        text=True,
+    )
+    lines = [line.split("|")[-1].strip() for line in result.stderr.splitlines() if line.startswith("import time:")]
+    return set(lines)
+
+
+@pytest.mark.parametrize(
+    "args, env",
+    [
+        (["config", "get", "model"], {}),
+        ([], {"_AIGIT_COMPLETE": "complete_bash", "COMP_WORDS": "aigit co", "COMP_CWORD": "1"}),
+    ],
+)
+def test_fast_paths_skip_heavy_imports(args, env):
+    modules = imported_modules(args, env)
+
+    assert "aigit.cli" in modules
+    assert not {"rich", "aigit.metrics", "aigit.services.git", "socket"} & modules
+
+
+def test_completion_lists_commands():
+    result = subprocess.run(
+        [sys.executable, "-m", "aigit.client"],
+        env={
+            **os.environ,
+            "PYTHONPATH": str(PACKAGE_ROOT),
+            "_AIGIT_COMPLETE": "complete_bash",
+            "COMP_WORDS": "aigit co",
+            "COMP_CWORD": "1",
+        },
+        capture_output=True,
+        text=True,
+    )
+    assert "commit" in result.stdout
+    assert "config" in result.stdout
+
+
+def test_config_set_and_get():
+    runner = CliRunner()
+
+    assert runner.invoke(app, ["config", "set", "max_workers", "8"]).exit_code == 0
+    result = runner.invoke(app, ["config", "get", "max_workers"])
+
+    assert result.exit_code == 0
+    assert result.output.strip() == "max_workers = 8"
+    assert "Key not found" in runner.invoke(app, ["config", "get", "nope"]).output
@@ -0,0 +1,95 @@
+"""Tests for config layering and value coercion."""
+
+import pytest
+
+from aigit import config
+
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+
+
+def test_layers_later_sources_win(tmp_path, monkeypatch):
+    (tmp_path / ".git").mkdir()
+    write(config.CONFIG_FILE, 'model = "global"\nmax_workers = 2\n')
+    write(tmp_path / ".aigit.toml", 'model = "local"\n')
+    monkeypatch.setenv("AIGIT_MAX_WORKERS", "8")
+
+    assert config.get_config("model") == "local"
+    assert config.get_config("max_workers") == 8
+    assert config.get_config("map_reduce") is True
+
+
+def test_local_config_cannot_change_endpoints_or_credentials(tmp_path):
+    (tmp_path / ".git").mkdir()
+    write(config.CONFIG_FILE, 'github_api_url = "https://github.example.com/api/v3"\n')
+    write(
+        tmp_path / ".aigit.toml",
+        'provider = "local"\nbase_url = "http://attacker"\nopenai_api_key = "x"\n'
+        'github_api_url = "http://attacker"\nmetrics_file = "/tmp/leak"\nmodel = "gpt-4o"\n',
+    )
+
+    assert config.get_config("provider") == "openai"
+    assert config.get_config("base_url") == ""
+    assert config.get_config("openai_api_key") == ""
+    assert config.get_config("github_api_url") == "https://github.example.com/api/v3"
+    assert config.get_config("metrics_file") == ""
+    assert config.get_config("model") == "gpt-4o"
+
+
+def test_local_config_search_stops_at_repo_root(tmp_path, monkeypatch):
+    write(tmp_path / ".aigit.toml", 'model = "outside"\n')
+    repo = tmp_path / "repo"
+    (repo / ".git").mkdir(parents=True)
+    (repo / "src").mkdir()
+    monkeypatch.chdir(repo / "src")
+
+    assert config.find_local_config() is None
+
+
+@pytest.mark.parametrize(
+    "key, value, expected",
+    [
+        ("cache", "yes", True),
+        ("cache", "Off", False),
+        ("max_workers", "3", 3),
+        ("max_diff_mb", "0.5", 0.5),
+        ("max_diff_mb", "2", 2.0),
+        ("model", "gpt-4o", "gpt-4o"),
+    ],
+)
+def test_coerce(key, value, expected):
+    assert config._coerce(key, value) == expected
+
+
+@pytest.mark.parametrize("key, value", [("cache", "maybe"), ("max_workers", "many"), ("max_diff_mb", "big")])
+def test_coerce_rejects_invalid_values(key, value):
+    with pytest.raises(ValueError, match=key):
+        config._coerce(key, value)
+
+
+def test_set_config_writes_the_global_file():
+    config.set_config("max_diff_mb", "0.5")
+
+    assert config.load_global_config()["max_diff_mb"] == 0.5
+    assert config.get_config("max_diff_mb") == 0.5
+
+
+def test_invalid_env_values_are_reported(monkeypatch, capsys):
+    monkeypatch.setenv("AIGIT_MAX_WORKERS", "lots")
+
+    assert config.get_config("max_workers") == config.DEFAULT_CONFIG["max_workers"]
+    assert "AIGIT_MAX_WORKERS" in capsys.readouterr().err
+
+
+def test_control_variables_are_not_config(monkeypatch):
+    monkeypatch.setenv("AIGIT_IN_HOOK", "1")
+    monkeypatch.setenv("AIGIT_NO_DAEMON", "1")
+    monkeypatch.setenv("AIGIT_DAEMON_SOCKET", "/tmp/aigit.sock")
+    monkeypatch.setenv("AIGIT_MODEL", "gpt-4o")
+
+    merged = config.load_config()
+
+    assert merged["model"] == "gpt-4o"
+    assert not {"in_hook", "no_daemon", "daemon_socket"} & set(merged)
@@ -0,0 +1,52 @@
+"""Tests for the command daemon."""
+
+import os
+import threading
+import time
+
+from aigit import __version__, cli, daemon
+from aigit.client import PROTOCOL_VERSION, connect, send
+
+
+def test_client_disconnect_interrupts_the_command(tmp_path, monkeypatch):
+    monkeypatch.setattr(daemon, "DISCONNECT_POLL", 0.05)
+    started, interrupted = threading.Event(), threading.Event()
+
+    def slow_command(args, prog_name):
+        started.set()
+        try:
+            while True:
+                time.sleep(0.01)
+        except KeyboardInterrupt:
+            interrupted.set()
+            raise
+
+    monkeypatch.setattr(cli, "app", slow_command)
+    path = str(tmp_path / "aigit.sock")
+    server = daemon._Server(path, idle_timeout=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        sock = connect(path)
+        send(
+            sock,
+            {
+                "op": "run",
+                "protocol": PROTOCOL_VERSION,
+                "version": __version__,
+                "argv": ["review"],
+                "cwd": os.getcwd(),
+                "env": dict(os.environ),
+                "tty": {},
+            },
+        )
+        assert started.wait(5)
+        sock.close()
+
+        assert interrupted.wait(5)
+        deadline = time.monotonic() + 5
+        while server.run_lock.locked() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert not server.run_lock.locked()
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,130 @@
+"""Tests for diff parsing, compaction and chunking."""
+
+import pytest
+
+from aigit import diff as diff_module
+from aigit.diff import (
+    Hunk,
+    is_whitespace_only,
+    iter_file_diffs,
+    parse_diff,
+    parse_diff_header,
+    render_diff,
+    unquote_path,
+)
+from aigit.services import git
+from conftest import run_git
+
+QUOTED_DIFF = """diff --git "a/caf\\303\\251.py" "b/caf\\303\\251.py"
+new file mode 100644
+index 0000000..45b983b
+--- /dev/null
++++ "b/caf\\303\\251.py"
+@@ -0,0 +1 @@
++hi
+diff --git a/main.py b/main.py
+index 587be6b..aee5fdc 100644
+--- a/main.py
++++ b/main.py
+@@ -1 +1,2 @@
+ x
++y"""
+
+
+@pytest.mark.parametrize(
+    "quoted, path",
+    [
+        ('"caf\\303\\251.py"', "café.py"),
+        ('"q\\"uote\\\\d.py"', 'q"uote\\d.py'),
+        ('"tab\\there.py"', "tab\there.py"),
+        ("plain.py", "plain.py"),
+    ],
+)
+def test_unquote_path(quoted, path):
+    assert unquote_path(quoted) == path
+
+
+def test_parse_diff_header():
+    assert parse_diff_header("diff --git a/x.py b/y.py") == ("x.py", "y.py")
+    assert parse_diff_header('diff --git "a/caf\\303\\251.py" "b/d/caf\\303\\251.py"') == ("café.py", "d/café.py")
+    assert parse_diff_header("index 123..456") is None
+
+
+def test_quoted_paths_start_their_own_file():
+    files = parse_diff(QUOTED_DIFF)
+
+    assert [f.path for f in files] == ["café.py", "main.py"]
+    assert files[0].additions == 1 and files[1].additions == 1
+    assert render_diff(files) == QUOTED_DIFF
+
+
+def test_paths_with_spaces_drop_the_trailing_tab():
+    diff = (
+        "diff --git a/with space.py b/with space.py\nindex 587be6b..aee5fdc 100644\n"
+        "--- a/with space.py\t\n+++ b/with space.py\t\n@@ -1 +1,2 @@\n x\n+more"
+    )
+
+    (file,) = parse_diff(diff)
+
+    assert file.path == "with space.py"
+    assert file.old_path == "with space.py"
+    assert file.stat() == "with space.py (+1 -0)"
+
+
+def test_truncated_file_still_finds_the_next_quoted_header():
+    files = list(iter_file_diffs(QUOTED_DIFF.split("\n"), max_file_chars=10))
+
+    assert [f.path for f in files] == ["café.py", "main.py"]
+    assert files[0].truncated
+
+
+def test_staged_diff_keeps_non_ascii_and_special_paths(git_repo):
+    (git_repo / "café.py").write_text("x = 1\n", encoding="utf-8")
+    (git_repo / 'q"uote.py').write_text("y = 2\n", encoding="utf-8")
+    (git_repo / "main.py").write_text("z = 3\n", encoding="utf-8")
+    run_git(git_repo, "add", ".")
+
+    snapshot = git.get_staged_snapshot()
+
+    assert sorted(stat.path for stat in snapshot.stats) == ["café.py", "main.py", 'q"uote.py']
+    assert sorted(f.path for f in parse_diff(snapshot.patch)) == ["café.py", "main.py", 'q"uote.py']
+
+
+def test_quoted_rename_in_numstat(git_repo):
+    (git_repo / "café.py").write_text("x = 1\n" * 20, encoding="utf-8")
+    run_git(git_repo, "add", ".")
+    run_git(git_repo, "commit", "-q", "-m", "Add café")
+    run_git(git_repo, "mv", "café.py", "renamé.py")
+
+    stats = git.get_staged_snapshot().stats
+
+    assert [(stat.old_path, stat.path) for stat in stats] == [("café.py", "renamé.py")]
+
+
+def test_compact_diff_counts_tokens_of_short_non_ascii_diffs(monkeypatch):
+    # Byte-level tokenizers can spend several tokens on one character
+    monkeypatch.setattr(diff_module, "count_tokens", lambda text, model=None: len(text.encode("utf-8")))
+    patch = "diff --git a/emoji.txt b/emoji.txt\n--- a/emoji.txt\n+++ b/emoji.txt\n@@ -1 +1 @@\n-\U0001f600\n+" + "\U0001f389" * 40 + "\n"
+    assert len(patch) < 200 < len(patch.encode("utf-8"))
+
+    assert diff_module.compact_diff(patch, 200) != patch
+    assert diff_module.compact_diff(patch, 1000) == patch
+
+
+@pytest.mark.parametrize(
+    "removed, added, expected",
+    [
+        (["x = 1  "], ["x = 1"], True),
+        (["x  =  1"], ["x = 1"], True),
+        (["x = 1"], ["x = 1", ""], True),
+        (["    return x"], ["        return x"], False),
+        (["key: value"], ["  key: value"], False),
+        (["\treturn x"], ["    return x"], False),
+        (["a b"], ["ab"], False),
+        (["return x"], ["returnx"], False),
+        (["a = 1", "b = 2"], ["a = 1 b = 2"], False),
+    ],
+)
+def test_is_whitespace_only(removed, added, expected):
+    hunk = Hunk("@@ -1 +1 @@", [" ctx", *(f"-{line}" for line in removed), *(f"+{line}" for line in added)])
+    assert is_whitespace_only(hunk) is expected
@@ -0,0 +1,19 @@
+"""Tests for the batch explanation store."""
+
+from aigit import config
+from aigit.services import explain, git
+
+
+def test_stored_explanations_are_keyed_by_model(git_repo, monkeypatch):
+    monkeypatch.setenv("AIGIT_PROVIDER", "stub")
+    config.invalidate_config()
+    repo = git.get_repo()
+    commit = git.CommitInfo(sha="a" * 40, author="Test", date="2024-01-01", subject="Add things")
+    explain.save_explanation(repo, explain.CommitExplanation(**vars(commit), explanation="Adds things."))
+
+    stored = explain.load_explanation(repo, commit)
+    assert stored.explanation == "Adds things."
+    assert stored.cached
+
+    config.set_config("model", "another-model")
+    assert explain.load_explanation(repo, commit) is None
@@ -0,0 +1,128 @@
+"""Tests for reading diffs from git."""
+
+import asyncio
+
+from aigit.diff import parse_diff
+from aigit.services import git
+from conftest import run_git
+
+
+def stage_vendored(repo, count: int) -> None:
+    (repo / "vendor").mkdir()
+    for i in range(count):
+        (repo / "vendor" / f"module_{i:04d}_with_a_rather_long_name.js").write_text(f"v{i}\n", encoding="utf-8")
+    (repo / "app.py").write_text("print('app')\n", encoding="utf-8")
+    run_git(repo, "add", ".")
+
+
+def test_excluded_files_are_summarized(git_repo):
+    stage_vendored(git_repo, 3)
+
+    files = list(git.iter_diff(None, "--staged"))
+
+    assert [f.path for f in files if f.summary is None] == ["app.py"]
+    assert sum(1 for f in files if f.summary and f.summary.startswith("Excluded")) == 3
+
+
+def test_exclusions_past_the_pathspec_limit_are_dropped_while_parsing(git_repo, monkeypatch):
+    monkeypatch.setattr(git, "MAX_PATHSPEC_CHARS", 200)
+    stage_vendored(git_repo, 40)
+
+    specs = git._exclude_pathspecs(
+        git.get_staged_snapshot().stats, {f"vendor/module_{i:04d}_with_a_rather_long_name.js": "generated" for i in range(40)}
+    )
+    assert 1 < len(specs) < 41
+
+    git.invalidate()
+    patch = git.get_staged_diff()
+    assert [f.path for f in parse_diff(patch) if f.summary is None] == ["app.py"]
+    assert "v39" not in patch
+
+    async_patch = asyncio.run(git.aget_staged_diff())
+    assert "v39" not in async_patch
+    assert "+print('app')" in async_patch
+
+
+def test_thousands_of_excluded_files(git_repo):
+    stage_vendored(git_repo, 3000)
+
+    patch = git.get_staged_diff()
+
+    assert "+print('app')" in patch
+    assert "+v2999" not in patch
+
+
+def test_snapshots_are_memoized_until_the_index_changes(git_repo):
+    (git_repo / "app.py").write_text("print('app')\n", encoding="utf-8")
+    run_git(git_repo, "add", "app.py")
+
+    snapshot = git.get_staged_snapshot()
+    assert git.get_staged_snapshot() is snapshot
+    assert snapshot.files == ["app.py"]
+
+    # Staged outside aigit: the index signature changes
+    (git_repo / "lib.py").write_text("x = 1\n", encoding="utf-8")
+    run_git(git_repo, "add", "lib.py")
+    assert git.get_staged_snapshot().files == ["app.py", "lib.py"]
+
+
+def test_change_checks_reuse_the_status_call(git_repo, monkeypatch):
+    (git_repo / "app.py").write_text("print('app')\n", encoding="utf-8")
+    run_git(git_repo, "add", "app.py")
+    (git_repo / "README.md").write_text("# Changed\n", encoding="utf-8")
+
+    status = git.get_status()
+    assert (status.staged, status.unstaged) == (["app.py"], ["README.md"])
+
+    def fail(*args):
+        raise AssertionError("git diff --quiet should not run")
+
+    monkeypatch.setattr(git, "_diff_is_empty", fail)
+    assert git.has_staged_changes()
+    assert git.has_unstaged_changes()
+    assert git.has_any_changes()
+
+
+def test_commit_invalidates_memoized_results(git_repo):
+    (git_repo / "app.py").write_text("print('app')\n", encoding="utf-8")
+    run_git(git_repo, "add", "app.py")
+    assert git.get_status().staged == ["app.py"]
+
+    git.commit("Add app")
+
+    assert git.get_status().staged == []
+    assert not git.has_staged_changes()
+    assert git.get_staged_snapshot().patch == ""
+
+
+def test_async_helpers_match_the_sync_ones(git_repo):
+    run_git(git_repo, "branch", "-M", "main")
+    run_git(git_repo, "checkout", "-q", "-b", "feature")
+    (git_repo / "app.py").write_text("print('app')\n", encoding="utf-8")
+    run_git(git_repo, "add", "app.py")
+    run_git(git_repo, "commit", "-q", "-m", "Add app")
+    (git_repo / "app.py").write_text("print('app 2')\n", encoding="utf-8")
+    (git_repo / "README.md").write_text("# Staged\n", encoding="utf-8")
+    run_git(git_repo, "add", "README.md")
+
+    async def collect():
+        return (
+            await git.aget_staged_diff(),
+            await git.aget_unstaged_diff(),
+            await git.aget_branch_diff(),
+            await git.aget_commit_diff(),
+            await git.aget_default_branch(),
+            await git.aget_current_branch(),
+            await git.aget_changed_files(),
+        )
+
+    expected = (
+        git.get_staged_diff(),
+        git.get_unstaged_diff(),
+        git.get_branch_diff(),
+        git.get_commit_diff(),
+        "main",
+        "feature",
+        ["app.py"],
+    )
+    assert asyncio.run(collect()) == expected
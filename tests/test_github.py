@@ -0,0 +1,18 @@
+"""Tests for the GitHub service."""
+
+import pytest
+
+from aigit import config
+from aigit.services import github
+
+
+def test_client_is_shared_until_settings_change(monkeypatch):
+    pytest.importorskip("github")
+    monkeypatch.setattr(github, "_clients", {})
+    monkeypatch.setenv("GITHUB_TOKEN", "ghp_test")
+
+    client = github.get_client()
+    assert github.get_client() is client
+
+    config.set_config("github_api_url", "https://github.example.com/api/v3")
+    assert github.get_client() is not client
@@ -0,0 +1,87 @@
+"""Tests for the git hooks."""
+
+import shlex
+import sys
+import time
+from pathlib import Path
+
+from aigit.services import hooks
+from conftest import run_git
+
+
+def wait_for(path, timeout: float = 5.0) -> str:
+    deadline = time.monotonic() + timeout
+    while not path.exists() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return path.read_text() if path.exists() else ""
+
+
+def test_pregenerate_hook_does_not_fire_inside_a_hook(git_repo, monkeypatch):
+    log = git_repo.parent / "hook.log"
+    # Stands in for aigit: records that it ran and whether it was marked as a hook
+    command = f"sh -c {shlex.quote(f'echo ${hooks.HOOK_ENV} >> {log}')} sh"
+    monkeypatch.setattr(hooks, "_aigit_command", lambda: command)
+    hooks.install(pregenerate=True)
+
+    (git_repo / "a.txt").write_text("a\n")
+    monkeypatch.setenv(hooks.HOOK_ENV, "1")
+    run_git(git_repo, "add", "a.txt")
+    time.sleep(0.3)
+    assert not log.exists()
+
+    monkeypatch.delenv(hooks.HOOK_ENV)
+    (git_repo / "b.txt").write_text("b\n")
+    run_git(git_repo, "add", "b.txt")
+    assert wait_for(log).split() == ["1"]
+
+
+VERBOSE_MESSAGE_FILE = """
+# Please enter the commit message for your changes. Lines starting
+# with '#' will be ignored, and an empty message aborts the commit.
+#
+# Changes to be committed:
+#\tmodified:   app.py
+#
+# ------------------------ >8 ------------------------
+# Do not modify or remove the line above.
+# Everything below it will be ignored.
+diff --git a/app.py b/app.py
+--- a/app.py
++++ b/app.py
+@@ -1 +1 @@
+-print(1)
++print(2)
+"""
+
+
+def test_verbose_diff_below_scissors_is_not_a_message(tmp_path):
+    path = tmp_path / "COMMIT_EDITMSG"
+    path.write_text(VERBOSE_MESSAGE_FILE)
+    assert not hooks.has_message(str(path))
+
+    hooks.write_message(str(path), "Print 2 instead of 1")
+
+    text = path.read_text()
+    assert text.startswith("Print 2 instead of 1\n\n# Please enter")
+    assert text.index("Print 2") < text.index(">8") < text.index("diff --git")
+
+
+def test_template_above_scissors_is_kept(tmp_path):
+    path = tmp_path / "COMMIT_EDITMSG"
+    path.write_text("Ticket: ABC-1\n" + VERBOSE_MESSAGE_FILE)
+    assert hooks.has_message(str(path))
+
+
+def test_commit_verbose_gets_a_generated_message(git_repo, monkeypatch):
+    monkeypatch.setattr(hooks, "_aigit_command", lambda: f"{shlex.quote(sys.executable)} -m aigit.client")
+    hooks.install()
+    monkeypatch.setenv("PYTHONPATH", str(Path(hooks.__file__).parents[2]))
+    monkeypatch.setenv("HOME", str(git_repo.parent))
+    monkeypatch.setenv("AIGIT_PROVIDER", "stub")
+    monkeypatch.setenv("AIGIT_NO_DAEMON", "1")
+
+    (git_repo / "app.py").write_text("print(1)\n")
+    run_git(git_repo, "add", "app.py")
+    run_git(git_repo, "-c", "core.editor=true", "commit", "-q", "-v")
+
+    assert run_git(git_repo, "log", "-1", "--format=%s").strip() not in ("", "Initial commit")
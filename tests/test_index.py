@@ -0,0 +1,83 @@
+"""Tests for the semantic index."""
+
+import pytest
+
+from aigit import config
+from aigit.services import index
+from conftest import run_git
+
+BILLING = '''def compute_invoice_total(invoice):
+    return sum(line.amount for line in invoice.lines)
+
+
+def format_invoice_total(invoice):
+    return f"{compute_invoice_total(invoice):.2f}"
+'''
+
+LOGGING = '''def configure_logger(level):
+    import logging
+
+    logging.basicConfig(level=level)
+'''
+
+QUERY_DIFF = """diff --git a/report.py b/report.py
+--- a/report.py
++++ b/report.py
+@@ -0,0 +1,2 @@
++def invoice_report(invoice):
++    return compute_invoice_total(invoice)
+"""
+
+
+@pytest.fixture
+def indexed_repo(git_repo, monkeypatch):
+    monkeypatch.setenv("AIGIT_PROVIDER", "stub")
+    config.invalidate_config()
+    (git_repo / "billing.py").write_text(BILLING, encoding="utf-8")
+    (git_repo / "log.py").write_text(LOGGING, encoding="utf-8")
+    run_git(git_repo, "add", ".")
+    run_git(git_repo, "commit", "-q", "-m", "Add billing and logging")
+    return git_repo
+
+
+def test_update_embeds_only_changed_files(indexed_repo):
+    stats = index.update_index()
+    assert stats.embedded_files == stats.files == 3
+    chunks = stats.chunks
+
+    assert index.update_index().embedded_files == 0
+
+    (indexed_repo / "log.py").write_text(LOGGING + "\n\ndef silence():\n    pass\n", encoding="utf-8")
+    run_git(indexed_repo, "commit", "-q", "-am", "Add silence")
+    stats = index.update_index()
+    assert (stats.embedded_files, stats.removed_files, stats.chunks) == (1, 1, chunks + 1)
+
+
+def test_related_chunks_are_retrieved_for_a_diff(indexed_repo):
+    index.update_index()
+
+    chunks = index.retrieve(QUERY_DIFF, top_k=2)
+
+    assert {c.name for c in chunks} == {"compute_invoice_total", "format_invoice_total"}
+    assert "billing.py:1-2 (compute_invoice_total)" in index.format_context(chunks)
+
+
+def test_changed_lines_are_not_returned_as_context(indexed_repo):
+    index.update_index()
+    diff = QUERY_DIFF.replace("report.py", "billing.py")
+
+    chunks = index.retrieve(diff)
+
+    assert "compute_invoice_total" not in [c.name for c in chunks]
+
+
+def test_context_needs_a_built_index_and_follows_head(indexed_repo):
+    assert index.get_related_context(QUERY_DIFF) == ""
+
+    index.update_index()
+    (indexed_repo / "tax.py").write_text("def invoice_tax(invoice):\n    return 0\n", encoding="utf-8")
+    run_git(indexed_repo, "add", "tax.py")
+    run_git(indexed_repo, "commit", "-q", "-m", "Add tax")
+
+    assert "compute_invoice_total" in index.get_related_context(QUERY_DIFF)
+    assert "tax.py" in index.load_manifest()["files"]
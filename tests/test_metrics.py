@@ -0,0 +1,76 @@
+"""Tests for run metrics and the JSON Lines sink."""
+
+import json
+
+import pytest
+
+from aigit import config, metrics
+from aigit.services import ai
+
+
+@pytest.fixture(autouse=True)
+def fresh_run(monkeypatch):
+    monkeypatch.setenv("AIGIT_PROVIDER", "stub")
+    config.invalidate_config()
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def read_lines(path) -> list[dict]:
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_run_is_appended_to_the_metrics_file(tmp_path):
+    path = tmp_path / "metrics" / "runs.jsonl"
+    config.set_config("metrics_file", str(path))
+    metrics.start_run("commit")
+
+    ai.generate("Summarize this change")
+    ai.generate("Summarize this change")
+    metrics.report()
+
+    *requests, run = read_lines(path)
+    assert [r["cache"] for r in requests] == ["miss", "hit"]
+    assert all(r["type"] == "request" and r["command"] == "commit" for r in requests)
+    assert requests[0]["input_tokens"] > 0 and not requests[0]["usage_reported"]
+    assert requests[1]["cost"] == 0.0
+    assert (run["type"], run["requests"], run["cache_hits"]) == ("run", 2, 1)
+    assert run["input_tokens"] == requests[0]["input_tokens"]
+
+    metrics.reset()
+    ai.generate("Another change")
+    metrics.report()
+    assert len(read_lines(path)) == 5
+
+
+def test_nothing_is_written_unless_enabled(tmp_path):
+    ai.generate("Summarize this change")
+    metrics.report()
+
+    (call,) = metrics.get_calls()
+    assert call.input_tokens is None
+    assert not list(tmp_path.rglob("*.jsonl"))
+
+
+def test_failed_requests_record_the_error():
+    with pytest.raises(TimeoutError):
+        with metrics.track("generate", "stub", "m", "prompt"):
+            raise TimeoutError
+
+    assert metrics.get_calls()[0].error == "TimeoutError"
+
+
+def test_nested_phases_are_counted_once():
+    @metrics.timed("git")
+    def outer():
+        inner()
+
+    @metrics.timed("git")
+    def inner():
+        pass
+
+    outer()
+
+    assert len(metrics._phases) == 1
+    assert set(metrics.phase_totals()) == {"git"}
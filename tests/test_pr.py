@@ -0,0 +1,97 @@
+"""Tests for pushing a PR branch early and rolling the push back."""
+
+import pytest
+from git.exc import GitCommandError
+from typer.testing import CliRunner
+
+from aigit import config
+from aigit.cli import app
+from aigit.services import git
+from conftest import run_git
+
+
+@pytest.fixture
+def origin(git_repo):
+    """A bare origin for git_repo, with its default branch pushed, and a feature branch checked out."""
+    path = git_repo.parent / "origin.git"
+    run_git(git_repo.parent, "init", "-q", "--bare", str(path))
+    run_git(git_repo, "remote", "add", "origin", str(path))
+    run_git(git_repo, "push", "-q", "origin", "HEAD")
+    run_git(git_repo, "checkout", "-q", "-b", "feature")
+    commit_file(git_repo, "feature.py", "FEATURE = 1\n")
+    return path
+
+
+def commit_file(repo, name: str, text: str) -> str:
+    (repo / name).write_text(text, encoding="utf-8")
+    run_git(repo, "add", name)
+    run_git(repo, "commit", "-q", "-m", f"Change {name}")
+    return run_git(repo, "rev-parse", "HEAD").strip()
+
+
+def remote_sha(origin, branch: str = "feature") -> str | None:
+    output = run_git(origin, "for-each-ref", "--format=%(objectname)", f"refs/heads/{branch}").strip()
+    return output or None
+
+
+def test_rollback_deletes_a_created_branch(git_repo, origin):
+    result = git.push_branch()
+    assert result.created
+    assert remote_sha(origin) == result.new_sha
+
+    git.rollback_push(result)
+
+    assert remote_sha(origin) is None
+
+
+def test_rollback_restores_an_updated_branch(git_repo, origin):
+    old = run_git(git_repo, "rev-parse", "HEAD").strip()
+    run_git(git_repo, "push", "-q", "-u", "origin", "feature")
+    new = commit_file(git_repo, "feature.py", "FEATURE = 2\n")
+
+    result = git.push_branch()
+    assert not result.created
+    assert (result.old_sha, result.new_sha) == (old, new)
+
+    git.rollback_push(result)
+
+    assert remote_sha(origin) == old
+
+
+def test_rollback_leaves_commits_pushed_by_others(git_repo, origin):
+    result = git.push_branch()
+    # Someone else pushes on top of our push
+    other = commit_file(git_repo, "other.py", "OTHER = 1\n")
+    run_git(git_repo, "push", "-q", "origin", "feature")
+
+    with pytest.raises(GitCommandError):
+        git.rollback_push(result)
+
+    assert remote_sha(origin) == other
+
+
+def test_cancelled_pr_rolls_back_the_early_push(git_repo, origin, monkeypatch):
+    monkeypatch.setenv("AIGIT_PROVIDER", "stub")
+    monkeypatch.setenv("AIGIT_EARLY_PUSH", "true")
+    monkeypatch.setenv("AIGIT_CACHE", "false")
+    config.invalidate_config()
+    base = run_git(git_repo, "rev-parse", "--abbrev-ref", "@{-1}").strip()
+
+    result = CliRunner().invoke(app, ["pr", "--base", base, "--no-open"], input="n\n")
+
+    assert result.exit_code == 0, result.output
+    assert "cancelled" in result.output
+    assert remote_sha(origin) is None
+
+
+def test_pr_does_not_push_before_confirmation_by_default(git_repo, origin, monkeypatch):
+    monkeypatch.setenv("AIGIT_PROVIDER", "stub")
+    monkeypatch.setenv("AIGIT_CACHE", "false")
+    config.invalidate_config()
+    base = run_git(git_repo, "rev-parse", "--abbrev-ref", "@{-1}").strip()
+
+    result = CliRunner().invoke(app, ["pr", "--base", base, "--no-open"], input="n\n")
+
+    assert result.exit_code == 0, result.output
+    assert remote_sha(origin) is None
+    assert "Pushing" not in result.output
@@ -0,0 +1,68 @@
+"""Tests for the AI provider backends."""
+
+import asyncio
+
+import pytest
+
+from aigit import config
+from aigit.services import providers
+
+
+def test_backends_must_implement_complete():
+    class Incomplete(providers.Provider):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_stream_and_acomplete_fall_back_to_complete():
+    class Echo(providers.Provider):
+        name = "echo"
+
+        def complete(self, prompt, model, max_tokens, temperature, schema=None):
+            return prompt.upper()
+
+    echo = Echo()
+    assert list(echo.stream("hi", "m", 10, 0)) == ["HI"]
+    assert asyncio.run(echo.acomplete("hi", "m", 10, 0)) == "HI"
+    with pytest.raises(ValueError, match="tool calls"):
+        echo.chat([], "m", 10, 0, tools=[])
+
+
+def test_get_provider_follows_config(monkeypatch):
+    monkeypatch.setenv("AIGIT_PROVIDER", "stub")
+    config.invalidate_config()
+    assert isinstance(providers.get_provider(), providers.StubProvider)
+
+    monkeypatch.setenv("AIGIT_PROVIDER", "local")
+    monkeypatch.setenv("AIGIT_BASE_URL", "http://localhost:8080/v1")
+    config.invalidate_config()
+    provider = providers.get_provider()
+    assert isinstance(provider, providers.LocalProvider)
+    assert provider.identity() == "local:http://localhost:8080/v1"
+
+
+def test_unknown_provider_is_rejected(monkeypatch):
+    monkeypatch.setenv("AIGIT_PROVIDER", "nope")
+    config.invalidate_config()
+    with pytest.raises(ValueError):
+        providers.get_provider()
+
+
+def test_stub_responses_are_deterministic():
+    stub = providers.StubProvider()
+    assert stub.complete("Write a commit message", "m", 100, 0) == stub.complete("Write a commit message", "m", 100, 0)
+
+
+def test_openai_clients_are_pooled_per_settings(monkeypatch):
+    pytest.importorskip("openai")
+    monkeypatch.setattr(providers, "_clients", {})
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+
+    client = providers.get_client()
+    assert providers.get_client() is client
+    assert providers.get_client(base_url="http://localhost:8080/v1") is not client
+
+    config.set_config("http_pool_size", "2")
+    assert providers.get_client() is not client
@@ -0,0 +1,156 @@
+"""Tests for rate-limit scheduling and retries."""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from aigit.services import ratelimit
+
+
+class APIError(Exception):
+    def __init__(self, status_code: int, headers: dict = None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers=headers or {})
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record sleeps instead of waiting."""
+    recorded = []
+    monkeypatch.setattr(ratelimit.time, "sleep", recorded.append)
+    return recorded
+
+
+@pytest.mark.parametrize(
+    "value, seconds",
+    [("20ms", 0.02), ("1s", 1.0), ("6m0s", 360.0), ("1h2m", 3720.0), ("2.5", 2.5), ("", None), ("soon", None)],
+)
+def test_parse_duration(value, seconds):
+    assert ratelimit.parse_duration(value) == seconds
+
+
+def test_bucket_admits_capacity_then_waits_for_refill():
+    bucket = ratelimit.TokenBucket(60)
+
+    assert all(bucket.reserve(1, now=bucket.updated) == 0 for _ in range(60))
+    # One unit per second at 60 per minute
+    assert bucket.reserve(1, now=bucket.updated) == pytest.approx(1.0)
+    assert bucket.reserve(1, now=bucket.updated) == pytest.approx(2.0)
+
+
+def test_unlimited_bucket_never_waits():
+    assert ratelimit.TokenBucket(0).reserve(10**9, now=0) == 0
+
+
+def test_bucket_follows_server_headers():
+    bucket = ratelimit.TokenBucket(0)
+    bucket.observe(limit=600, remaining=0, now=bucket.updated)
+
+    assert bucket.capacity == 600
+    assert bucket.reserve(10, now=bucket.updated) == pytest.approx(1.0)
+
+
+def test_retry_delay_honors_retry_after():
+    assert ratelimit.retry_delay(0, APIError(429, {"retry-after": "2"})) == 2.0
+    assert ratelimit.retry_delay(0, APIError(429, {"retry-after-ms": "250"})) == 0.25
+    assert ratelimit.retry_delay(0, APIError(429, {"retry-after": "3600"})) == ratelimit.RETRY_MAX_DELAY
+
+
+def test_backoff_is_jittered_and_capped():
+    for attempt in range(12):
+        delay = ratelimit.retry_delay(attempt, APIError(503))
+        assert 0 <= delay <= min(ratelimit.RETRY_MAX_DELAY, ratelimit.RETRY_BASE_DELAY * 2**attempt)
+
+
+def test_call_retries_transient_errors(sleeps):
+    scheduler = ratelimit.Scheduler(max_retries=3)
+    errors = [APIError(429, {"retry-after": "1"}), APIError(502)]
+
+    def request():
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+
+    assert scheduler.call(request, cost=10) == "ok"
+    assert scheduler.stats.retries == 2
+    assert scheduler.stats.rate_limited == 1
+    assert scheduler.stats.server_errors == 1
+    assert sleeps[0] == 1.0
+
+
+def test_call_gives_up_after_max_retries(sleeps):
+    scheduler = ratelimit.Scheduler(max_retries=2)
+    calls = []
+
+    def request():
+        calls.append(1)
+        raise APIError(500)
+
+    with pytest.raises(APIError):
+        scheduler.call(request, cost=10)
+    assert len(calls) == 3
+
+
+def test_call_does_not_retry_client_errors(sleeps):
+    scheduler = ratelimit.Scheduler(max_retries=5)
+
+    with pytest.raises(APIError):
+        scheduler.call(lambda: (_ for _ in ()).throw(APIError(400)), cost=10)
+    assert scheduler.stats.retries == 0
+    assert sleeps == []
+
+
+def test_stream_retries_only_before_the_first_chunk(sleeps):
+    scheduler = ratelimit.Scheduler(max_retries=3)
+    attempts = []
+
+    def request():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise APIError(503)
+        yield "a"
+        yield "b"
+
+    assert "".join(scheduler.stream(request, cost=10)) == "ab"
+    assert len(attempts) == 2
+
+    def fails_midway():
+        yield "a"
+        raise APIError(503)
+
+    chunks = scheduler.stream(fails_midway, cost=10)
+    assert next(chunks) == "a"
+    with pytest.raises(APIError):
+        next(chunks)
+
+
+def test_tpm_limit_throttles_large_requests(sleeps):
+    scheduler = ratelimit.Scheduler(tpm=600)
+
+    scheduler.admit(600)
+    scheduler.admit(60)
+
+    assert scheduler.stats.throttled == 1
+    assert sleeps == [pytest.approx(6.0, abs=0.1)]
+    assert "1 of 2 requests throttled" in scheduler.stats.summary()
+
+
+def test_acall_retries(monkeypatch):
+    delays = []
+
+    async def no_sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(asyncio, "sleep", no_sleep)
+    scheduler = ratelimit.Scheduler(max_retries=2)
+    errors = [APIError(429, {"retry-after": "1"})]
+
+    async def request():
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+
+    assert asyncio.run(scheduler.acall(request, cost=10)) == "ok"
+    assert delays == [1.0]
@@ -0,0 +1,35 @@
+"""Tests for the terminal rendering helpers."""
+
+import io
+
+from rich.console import Console
+
+from aigit.render import render_stream
+
+
+def make_console() -> tuple[Console, io.StringIO]:
+    output = io.StringIO()
+    return Console(file=output, width=80), output
+
+
+def test_stream_is_rendered_once_complete():
+    console, output = make_console()
+
+    text, completed = render_stream(console, iter(["Adds ", "a flag. "]), "Explanation", markdown=False)
+
+    assert (text, completed) == ("Adds a flag.", True)
+    assert "Adds a flag." in output.getvalue()
+    assert "first token" in output.getvalue()
+
+
+def test_interrupted_stream_keeps_partial_text():
+    def chunks():
+        yield "Adds "
+        raise KeyboardInterrupt
+
+    console, output = make_console()
+
+    text, completed = render_stream(console, chunks(), "Explanation", markdown=False)
+
+    assert (text, completed) == ("Adds", False)
+    assert "cancelled after" in output.getvalue()
@@ -0,0 +1,57 @@
+"""Tests for the incremental review store."""
+
+import os
+import time
+
+from aigit import cache, config
+from aigit.diff import parse_diff
+from aigit.services import review
+
+PATCH = """diff --git a/app.py b/app.py
+--- a/app.py
++++ b/app.py
+@@ -1,2 +1,2 @@
+ import os
+-print(1)
++print(2)
+"""
+
+
+def make_refs(count: int) -> list[review.HunkRef]:
+    files = parse_diff(PATCH)
+    return [review.get_hunk_refs(files, f"identity-{i}")[0] for i in range(count)]
+
+
+def test_findings_round_trip(git_repo):
+    (ref,) = make_refs(1)
+    finding = review.Finding("WARNING", "app.py", ref.start + 1, "Debug print", "Remove it")
+
+    review.save_hunk_findings(ref, [finding])
+
+    assert review.load_hunk_findings(ref) == [finding]
+
+
+def test_store_is_pruned_like_the_cache(git_repo, monkeypatch):
+    config.set_config("cache_max_age_days", "1")
+    monkeypatch.setattr(cache, "PRUNE_PROBABILITY", 0)
+    cache._sizes.clear()
+
+    stale, fresh = make_refs(2)
+    review.save_hunk_findings(stale, [])
+    old = time.time() - 2 * 86400
+    os.utime(review._store_path(stale.key), (old, old))
+    cache._sizes.clear()
+
+    review.save_hunk_findings(fresh, [])
+
+    assert review.load_hunk_findings(stale) is None
+    assert review.load_hunk_findings(fresh) == []
+
+
+def test_report_pluralizes_counts():
+    finding = review.Finding("INFO", "app.py", 2, "Unused import", "")
+
+    assert review.format_report([], 1) == "No issues found in 1 file."
+    assert review.format_report([], 3) == "No issues found in 3 files."
+    assert review.format_report([finding], 1).startswith("**1 finding** (1 info) in 1 file\n")
+    assert review.format_report([finding, finding], 2).startswith("**2 findings** (2 info) in 2 files\n")
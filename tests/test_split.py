@@ -0,0 +1,184 @@
+"""Tests for splitting staged changes into several commits."""
+
+import pytest
+
+from aigit.diff import parse_diff
+from aigit.services import git, split
+from conftest import run_git
+
+
+def numbered(count: int, prefix: str = "line") -> str:
+    return "".join(f"{prefix} {i}\n" for i in range(1, count + 1))
+
+
+@pytest.fixture
+def stub_provider(monkeypatch):
+    monkeypatch.setenv("AIGIT_PROVIDER", "stub")
+    monkeypatch.setenv("AIGIT_CACHE", "false")
+
+
+def split_staged(max_commits: int = split.DEFAULT_MAX_COMMITS) -> list[split.CommitGroup]:
+    groups, excluded = split.plan_split(max_commits=max_commits)
+    split.name_groups(groups, excluded)
+    split.commit_groups(groups)
+    return groups
+
+
+def test_build_patch_renumbers_hunks_after_earlier_ones():
+    diff = """diff --git a/a.txt b/a.txt
+index 1111111..2222222 100644
+--- a/a.txt
++++ b/a.txt
+@@ -2,3 +2,5 @@ head
+ two
++new 1
++new 2
+ three
+ four
+@@ -20,3 +22,3 @@ tail
+ twenty
+-twenty-one
++21
+ twenty-two"""
+    units = split.make_units(parse_diff(diff))
+    assert len(units) == 2
+
+    # The second hunk alone, with the first not applied yet, starts 2 lines earlier
+    patch = split.build_patch([units[1]], {})
+    assert "@@ -20,3 +20,3 @@ tail" in patch
+    assert not any(line.startswith("index ") for line in patch.splitlines())
+
+    # ...and where the diff says once the first is in
+    patch = split.build_patch([units[1]], {"a.txt": {0}})
+    assert "@@ -22,3 +22,3 @@ tail" in patch
+
+
+def test_cluster_respects_max_commits():
+    diff = "\n".join(
+        f"diff --git a/m{i}.py b/m{i}.py\nnew file mode 100644\n--- /dev/null\n+++ b/m{i}.py\n@@ -0,0 +1 @@\n+x{i} = {i}"
+        for i in range(8)
+    )
+    units = split.make_units(parse_diff(diff))
+
+    groups = split.cluster(units, max_commits=3)
+
+    assert len(groups) == 3
+    assert sorted(unit.order for group in groups for unit in group) == list(range(8))
+
+
+def test_cluster_keeps_tests_with_their_module():
+    diff = "\n".join(
+        f"diff --git a/{path} b/{path}\nnew file mode 100644\n--- /dev/null\n+++ b/{path}\n@@ -0,0 +1 @@\n+{line}"
+        for path, line in [
+            ("pkg/parser.py", "def parse_header(): pass"),
+            ("docs/guide.md", "# Guide"),
+            ("tests/test_parser.py", "def test_parse(): assert parse_header()"),
+        ]
+    )
+    units = split.make_units(parse_diff(diff))
+
+    groups = split.cluster(units)
+
+    paths = [sorted(unit.file.path for unit in group) for group in groups]
+    assert ["pkg/parser.py", "tests/test_parser.py"] in paths
+
+
+def test_split_commits_add_up_to_the_staged_tree(git_repo, stub_provider):
+    (git_repo / "big.txt").write_text(numbered(60), encoding="utf-8")
+    run_git(git_repo, "add", ".")
+    run_git(git_repo, "commit", "-q", "-m", "Add big.txt")
+
+    lines = numbered(60).splitlines(keepends=True)
+    lines[2] = "def first():\n"
+    lines[40:40] = ["def second():\n", "    pass\n"]
+    (git_repo / "big.txt").write_text("".join(lines), encoding="utf-8")
+    (git_repo / "new.py").write_text("VALUE = 1\n", encoding="utf-8")
+    run_git(git_repo, "add", ".")
+    staged = git.write_tree()
+
+    groups = split_staged()
+
+    assert len(groups) > 1
+    assert run_git(git_repo, "rev-parse", "HEAD^{tree}").strip() == staged
+    assert run_git(git_repo, "status", "--porcelain") == ""
+
+
+def test_split_with_non_ascii_and_space_paths(git_repo, stub_provider):
+    (git_repo / "main.py").write_text("def a():\n    return 1\n", encoding="utf-8")
+    run_git(git_repo, "add", ".")
+    run_git(git_repo, "commit", "-q", "-m", "Add main.py")
+
+    (git_repo / "café.py").write_text("def cafe():\n    return 2\n", encoding="utf-8")
+    (git_repo / "main.py").write_text("def a():\n    return 1\n\ndef b():\n    return 3\n", encoding="utf-8")
+    (git_repo / "docs").mkdir()
+    (git_repo / "docs" / "read me.md").write_text("# Docs\n", encoding="utf-8")
+    run_git(git_repo, "add", ".")
+    staged = git.write_tree()
+
+    groups = split_staged()
+
+    assert sorted(path for group in groups for path in group.paths) == ["café.py", "docs/read me.md", "main.py"]
+    assert run_git(git_repo, "rev-parse", "HEAD^{tree}").strip() == staged
+    assert run_git(git_repo, "status", "--porcelain") == ""
+
+
+def test_failed_split_leaves_branch_and_index_alone(git_repo, stub_provider):
+    (git_repo / "a.py").write_text("A = 1\n", encoding="utf-8")
+    run_git(git_repo, "add", ".")
+    head = git.get_head_sha()
+    staged = git.write_tree()
+
+    groups, _ = split.plan_split()
+    groups[0].message = "Broken"
+    groups[0].units[0].file.hunks[0].lines[0] = "+something else"
+
+    with pytest.raises(ValueError, match="nothing was committed"):
+        split.commit_groups(groups)
+
+    assert git.get_head_sha() == head
+    assert git.write_tree() == staged
+
+
+def test_interrupted_split_restores_branch_and_index(git_repo, stub_provider, monkeypatch):
+    (git_repo / "a.py").write_text("A = 1\n", encoding="utf-8")
+    (git_repo / "b.txt").write_text("notes\n", encoding="utf-8")
+    run_git(git_repo, "add", ".")
+    head = git.get_head_sha()
+    staged = git.write_tree()
+
+    groups, _ = split.plan_split(max_commits=2)
+    assert len(groups) == 2
+    for group in groups:
+        group.message = "Part"
+    commit = git.commit
+    calls = []
+
+    def interrupted_commit(message, repo=None):
+        calls.append(message)
+        if len(calls) == 2:
+            raise KeyboardInterrupt
+        return commit(message, repo)
+
+    monkeypatch.setattr(git, "commit", interrupted_commit)
+    with pytest.raises(KeyboardInterrupt):
+        split.commit_groups(groups)
+
+    assert git.get_head_sha() == head
+    assert git.write_tree() == staged
+
+
+def test_split_commits_run_commit_hooks(git_repo, stub_provider):
+    hook = git_repo / ".git" / "hooks" / "commit-msg"
+    hook.write_text("#!/bin/sh\ngrep -q Rejected \"$1\" && exit 1\nexit 0\n", encoding="utf-8")
+    hook.chmod(0o755)
+    (git_repo / "a.py").write_text("A = 1\n", encoding="utf-8")
+    (git_repo / "b.txt").write_text("notes\n", encoding="utf-8")
+    run_git(git_repo, "add", ".")
+    head = git.get_head_sha()
+
+    groups, _ = split.plan_split(max_commits=2)
+    groups[0].message, groups[1].message = "Fine", "Rejected"
+
+    with pytest.raises(ValueError, match="nothing was committed"):
+        split.commit_groups(groups)
+    assert git.get_head_sha() == head
@@ -0,0 +1,99 @@
+"""Tests for parsing and repairing JSON responses."""
+
+import pytest
+
+from aigit import structured
+from aigit.services import ai, review
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        '{"name": "feat/login"}',
+        'Sure! Here it is:\n```json\n{"name": "feat/login"}\n```\nAnything else?',
+        '```\n{"name": "feat/login",}\n```',
+        '{"name": "feat/login"',
+        'The branch: {"name": "feat/lo',
+    ],
+)
+def test_extract_json_repairs_common_damage(text):
+    data = structured.extract_json(text)
+    assert data is not None
+    assert data["name"].startswith("feat/lo")
+
+
+def test_extract_json_without_an_object():
+    assert structured.extract_json("feat/login") is None
+    assert structured.extract_json("[1, 2]") is None
+
+
+def test_truncated_response_drops_dangling_key():
+    assert structured.extract_json('{"title": "Add login", "descrip') == {"title": "Add login"}
+
+
+@pytest.mark.parametrize(
+    "value, schema, expected",
+    [
+        ("warn", {"type": "string", "enum": ["CRITICAL", "WARNING", "INFO"]}, "WARNING"),
+        ("critical", {"type": "string", "enum": ["CRITICAL", "WARNING", "INFO"]}, "CRITICAL"),
+        ("line 42", {"type": ["integer", "null"]}, 42),
+        (12.0, {"type": "integer"}, 12),
+        ("n/a", {"type": ["integer", "null"]}, None),
+        (["a", "b"], {"type": "string"}, "a\nb"),
+        (None, {"type": "string"}, ""),
+        ({"x": 1}, {"type": "array", "items": {"type": "object", "properties": {}}}, [{}]),
+    ],
+)
+def test_coerce(value, schema, expected):
+    assert structured.coerce(value, schema) == expected
+
+
+@pytest.mark.parametrize(
+    "value, schema",
+    [
+        ("maybe", {"type": "string", "enum": ["CRITICAL", "WARNING", "INFO"]}),
+        (True, {"type": "integer"}),
+        ("none", {"type": "integer"}),
+        ("text", {"type": "object", "properties": {}}),
+    ],
+)
+def test_coerce_rejects_values_that_do_not_fit(value, schema):
+    with pytest.raises(ValueError):
+        structured.coerce(value, schema)
+
+
+def test_parse_fills_missing_fields_and_matches_key_case():
+    assert structured.parse('{"Title": "Add login"}', structured.PR_SCHEMA) == {
+        "title": "Add login",
+        "description": "",
+    }
+
+
+def test_parse_pr_json_and_plain_text():
+    assert ai.parse_pr('{"title": "Add login", "description": "Adds a form."}') == ("Add login", "Adds a form.")
+    title, description = ai.parse_pr("TITLE: Add login\nDESCRIPTION:\nAdds a form.")
+    assert title == "Add login"
+    assert "Adds a form." in description
+
+
+def test_parse_branch_name_json_and_plain_text():
+    assert ai.parse_branch_name('{"name": "feat/add-login"}') == "feat/add-login"
+    assert ai.parse_branch_name("feat/add-login\n") == "feat/add-login"
+
+
+def test_parse_findings_skips_invalid_items():
+    response = """{"findings": [
+        {"severity": "warn", "path": "app.py:12", "line": null, "issue": "Debug print", "suggestion": "Remove it"},
+        {"severity": "bogus", "path": "app.py", "line": 3, "issue": "Skipped", "suggestion": ""},
+        {"severity": "INFO", "path": "app.py", "line": 4, "issue": "", "suggestion": ""}
+    ]}"""
+
+    findings = review.parse_findings(response, ["app.py"])
+
+    assert [(f.severity, f.path, f.line, f.issue) for f in findings] == [("WARNING", "app.py", 12, "Debug print")]
+
+
+def test_parse_findings_falls_back_to_lines():
+    findings = review.parse_findings("CRITICAL | app.py:7 | SQL injection | Use parameters", ["app.py"])
+
+    assert [(f.severity, f.path, f.line) for f in findings] == [("CRITICAL", "app.py", 7)]